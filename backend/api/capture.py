@@ -0,0 +1,206 @@
+"""
+Captura opcional do tráfego de /v1/query em JSONL, para replay de carga
+(benchmarks/replay.py) e simulação de cache (benchmarks/cache_sim.py).
+
+Cada linha: {"ts", "query", "session_id", "status", "latency_ms",
+"cached", "response_bytes", "tools"}, onde "tools" lista as chamadas de
+tools da resposta como [tool, input]. Queries são anonimizadas (e-mails,
+CPF/CNPJ, telefones e números de cartão) e o session_id é trocado por um
+hash com salt, que preserva o agrupamento por sessão sem expor o id
+original.
+
+Configuração:
+- CAPTURE_ENABLED: liga a captura (padrão: false)
+- CAPTURE_FILE: arquivo de saída (padrão: logs/capture.jsonl)
+- CAPTURE_SAMPLE_RATE: fração das requisições capturadas (padrão: 1.0)
+- CAPTURE_SALT: salt do hash de session_id
+"""
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+CAPTURE_PATH = "/v1/query"
+
+# Separadores opcionais: "11987654321" e "12345678901" também são
+# mascarados. O telefone vem antes do CPF (um celular sem pontuação,
+# DDD + 9 + 8 dígitos, também tem 11 dígitos) e do cartão (com +55)
+_PATTERNS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"\b\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}\b"), "<cnpj>"),
+    (
+        re.compile(
+            r"(?<!\d)(?:\+55\s?)?(?:\(\d{2}\)|\d{2})\s?"
+            r"(?:9?\d{4}[- ]\d{4}|9\d{8})(?!\d)"
+        ),
+        "<telefone>"
+    ),
+    (re.compile(r"(?<!\d)\d{3}\.?\d{3}\.?\d{3}-?\d{2}(?!\d)"), "<cpf>"),
+    (re.compile(r"\b(?:\d[ -]?){13,19}\b"), "<cartao>"),
+]
+
+
+def anonymize(text: str) -> str:
+    """
+    Mascara dados pessoais na query. Números comuns (ex: contas da
+    calculadora) são mantidos para que o replay reproduza a carga.
+    """
+    for pattern, replacement in _PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def hash_session(session_id: Optional[str], salt: str) -> Optional[str]:
+    if not session_id:
+        return None
+    return hashlib.sha256(f"{salt}:{session_id}".encode()).hexdigest()[:16]
+
+
+def read_capture(path: str) -> Iterator[Dict[str, Any]]:
+    """Lê um arquivo de captura linha a linha, ignorando linhas inválidas."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and record.get("query"):
+                yield record
+
+
+class CaptureWriter:
+    """Acrescenta registros ao arquivo de captura (thread-safe)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CaptureMiddleware:
+    """
+    Middleware ASGI que registra as chamadas de POST /v1/query.
+
+    O corpo da requisição e da resposta é observado enquanto passa,
+    sem alterar o fluxo da aplicação.
+    """
+
+    def __init__(
+        self,
+        app,
+        path: Optional[str] = None,
+        sample_rate: Optional[float] = None,
+        salt: Optional[str] = None,
+    ):
+        self.app = app
+        self.writer = CaptureWriter(
+            path or os.getenv("CAPTURE_FILE", "logs/capture.jsonl")
+        )
+        self.sample_rate = (
+            sample_rate if sample_rate is not None
+            else float(os.getenv("CAPTURE_SAMPLE_RATE", 1.0))
+        )
+        self.salt = salt if salt is not None else os.getenv(
+            "CAPTURE_SALT", ""
+        )
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] != CAPTURE_PATH
+            or random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        ts = time.time()
+        start = time.perf_counter()
+        request_body = bytearray()
+        response_body = bytearray()
+        status = {"code": 500}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                request_body.extend(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response_body.extend(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            self._record(
+                ts, start, bytes(request_body), bytes(response_body),
+                status["code"]
+            )
+
+    def _record(
+        self,
+        ts: float,
+        start: float,
+        request_body: bytes,
+        response_body: bytes,
+        status: int,
+    ) -> None:
+        try:
+            request = json.loads(request_body or b"{}")
+            query = request.get("query")
+            if not isinstance(query, str):
+                return
+
+            response = {}
+            if status == 200 and response_body:
+                response = json.loads(response_body)
+
+            self.writer.write({
+                "ts": round(ts, 3),
+                "query": anonymize(query),
+                "session_id": hash_session(
+                    request.get("session_id"), self.salt
+                ),
+                "status": status,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+                "cached": bool(response.get("cached")),
+                "response_bytes": len(response_body),
+                # Entradas das tools repetem trechos da query (ex:
+                # search_documents): passam pela mesma anonimização
+                "tools": [
+                    [step.get("tool"), anonymize(str(step.get("input", "")))]
+                    for step in response.get("intermediate_steps") or []
+                ],
+            })
+        except Exception as e:
+            # Captura nunca deve derrubar a requisição
+            logger.warning(f"Falha ao capturar requisição: {e}")
@@ -0,0 +1,100 @@
+"""
+Endpoints de diagnóstico (/debug): profiler por amostragem e rastreio de
+alocações. Só respondem com DEBUG_ENDPOINTS_TOKEN definido e o mesmo
+valor no header X-Debug-Token (ver backend.utils.profiling).
+"""
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from backend.utils.profiling import (
+    DEBUG_TOKEN_HEADER, AllocationTracker, ProfilerBusy, debug_status,
+    profile
+)
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+async def require_debug_token(request: Request) -> None:
+    status = debug_status(request.headers.get(DEBUG_TOKEN_HEADER))
+    if status == 404:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if status == 403:
+        raise HTTPException(status_code=403, detail="Token inválido")
+
+
+router = APIRouter(
+    prefix="/debug",
+    dependencies=[Depends(require_debug_token)],
+    include_in_schema=False,
+)
+
+_tracker: Optional[AllocationTracker] = None
+
+
+def get_tracker() -> AllocationTracker:
+    """
+    Tracker de alocações do processo. Conta as mensagens LangGraph/
+    LangChain vivas (as que agent.ainvoke produz e que continuam
+    referenciadas depois da requisição); langchain_core só é importado
+    aqui, no primeiro uso.
+    """
+    global _tracker
+    if _tracker is None:
+        from langchain_core.messages import BaseMessage
+
+        _tracker = AllocationTracker(retained={"messages": BaseMessage})
+    return _tracker
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def cpu_profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(10, ge=1),
+    idle: bool = False,
+) -> PlainTextResponse:
+    """
+    Amostra as pilhas do processo por `seconds` segundos e devolve o
+    profile no formato collapsed (pronto para flamegraph.pl/speedscope).
+    """
+    try:
+        profiler = await profile(seconds, interval_ms / 1000, idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info(
+        f"Profile concluído: {profiler.samples} amostras, "
+        f"{len(profiler.stacks)} pilhas"
+    )
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"X-Profile-Samples": str(profiler.samples)},
+    )
+
+
+@router.get("/allocations")
+async def allocations(
+    limit: int = Query(20, ge=1, le=500),
+    key_type: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    include: Optional[str] = None,
+):
+    """
+    Snapshot do tracemalloc (ligado na primeira chamada) com os maiores
+    sítios de alocação, a diferença para o snapshot anterior e as
+    mensagens LangGraph ainda vivas. `include` filtra por padrão de
+    arquivo em qualquer frame (ex: *langgraph*).
+    """
+    # Percorre o heap inteiro (segundos em processos grandes): em uma
+    # thread, para o event loop seguir atendendo
+    return await asyncio.to_thread(
+        get_tracker().snapshot, limit, key_type, include
+    )
+
+
+@router.delete("/allocations")
+async def stop_allocations():
+    """Desliga o tracemalloc e descarta o snapshot de referência."""
+    get_tracker().stop()
+    return {"tracing": False}
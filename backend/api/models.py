@@ -5,6 +5,9 @@ from typing import List, Dict, Any, Optional
 class QueryRequest(BaseModel):
     """Request para processar uma query do usuário."""
     query: str = Field(..., description="Pergunta do usuário")
+    session_id: Optional[str] = Field(
+        None, description="Sessão de conversa para perguntas de continuação"
+    )
 
 
 class IntermediateStep(BaseModel):
@@ -22,3 +25,8 @@ class QueryResponse(BaseModel):
     intermediate_steps: List[IntermediateStep] = []
     tools_used: List[str] = []
     error: Optional[str] = None
+    usage: Optional[Dict[str, Any]] = None
+    prompt_variant: Optional[str] = None
+    route: Optional[str] = None
+    session_id: Optional[str] = None
+    cached: bool = False
@@ -1,7 +1,18 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from backend.api.debug import require_debug_token
 from backend.api.models import QueryRequest, QueryResponse
 from backend.core.agent import AIAssistant
-from backend.utils.cache import cache
+from backend.core.memory import (
+    ConversationMemory, new_session_id, valid_session_id
+)
+from backend.core.prefetch import PREFETCH_TOOLS
+from backend.core.prompts import PROMPTS
+from backend.core.router import ROUTES
+from backend.utils.cache import METRIC_WINDOWS, cache
+from backend.utils.deadline import (
+    DEADLINE_HEADER, ClientDisconnected, cancel_on_disconnect,
+    deadline_scope, parse_timeout
+)
 
 router = APIRouter(prefix="/v1")
 
@@ -18,30 +29,227 @@ async def get_agent() -> AIAssistant:
 
 
 @router.post("/query", response_model=QueryResponse)
-async def process_query(request: QueryRequest) -> QueryResponse:
+async def process_query(
+    request: QueryRequest, http_request: Request
+) -> QueryResponse:
     """
     Processa uma query do usuário
 
     O agente decide automaticamente se deve usar o MCP da calculadora,do clima ou responder diretamente
+
+    O prazo vem do header X-Request-Timeout (segundos) ou de
+    REQUEST_TIMEOUT_SECONDS; o processamento é cancelado quando ele
+    termina ou quando o cliente desconecta.
+
+    session_id, se informado, deve ter sido emitido por POST /v1/sessions.
     """
+    if request.session_id and not valid_session_id(request.session_id):
+        raise HTTPException(status_code=404, detail="Sessão inválida")
     try:
         agent = await get_agent()
-        result = await agent.process_query(request.query)
+        timeout = parse_timeout(http_request.headers.get(DEADLINE_HEADER))
+        with deadline_scope(timeout):
+            result = await cancel_on_disconnect(
+                agent.process_query(
+                    request.query, session_id=request.session_id
+                ),
+                http_request.is_disconnected,
+            )
         return QueryResponse(**result)
+    except ClientDisconnected:
+        cache.increment_metric("client_disconnects")
+        # 499: convenção do nginx para cliente que fechou a conexão
+        raise HTTPException(status_code=499, detail="Cliente desconectado")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/sessions")
+async def create_session():
+    """
+    Emite um id de sessão de conversa (aleatório e assinado). O id é um
+    token ao portador: quem o tiver lê e apaga a sessão, então o cliente
+    não deve compartilhá-lo.
+    """
+    return {"session_id": new_session_id()}
+
+
+@router.delete("/sessions/{session_id}")
+async def clear_session(session_id: str):
+    """Apaga o histórico de uma sessão de conversa."""
+    if not valid_session_id(session_id):
+        raise HTTPException(status_code=404, detail="Sessão inválida")
+    deleted = ConversationMemory().clear(session_id)
+    return {"session_id": session_id, "deleted": deleted}
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "AI Assistant Backend"}
 
 
+@router.post(
+    "/cache/{namespace}/invalidate",
+    dependencies=[Depends(require_debug_token)],
+)
+async def invalidate_cache(namespace: str):
+    """
+    Invalida todas as entradas de um namespace do cache
+    (ex: llm_query, weather) incrementando sua geração.
+
+    Exige o header X-Debug-Token (DEBUG_ENDPOINTS_TOKEN), como os
+    endpoints /debug.
+    """
+    generation = cache.invalidate_namespace(namespace)
+    return {"namespace": namespace, "generation": generation}
+
+
+def _session_metrics() -> dict:
+    """Tamanho do contexto enviado por turno nas sessões."""
+    turns = cache.get_metric("session_turns")
+    context_tokens = cache.get_metric("session_context_tokens")
+    return {
+        "turns": turns,
+        "context_tokens": context_tokens,
+        "avg_context_tokens_per_turn": (
+            round(context_tokens / turns, 1) if turns else 0
+        ),
+    }
+
+
+def _executor_metrics() -> dict:
+    """Tarefas das tools no MCP Server, por pool de execução."""
+    metrics = {}
+    for pool in ("process", "thread"):
+        tasks = cache.get_metric(f"executor_tasks:{pool}")
+        total_ms = cache.get_metric(f"executor_task_ms:{pool}")
+        metrics[pool] = {
+            "tasks": tasks,
+            "timeouts": cache.get_metric(f"executor_timeout:{pool}"),
+            "expired": cache.get_metric(f"executor_expired:{pool}"),
+            "failed": cache.get_metric(f"executor_failed:{pool}"),
+            "avg_ms": round(total_ms / tasks, 1) if tasks else 0,
+        }
+    return metrics
+
+
+def _route_metrics() -> dict:
+    """Latência e custo por rota de modelo (fast/strong)."""
+    metrics = {}
+    for route in ROUTES:
+        requests = cache.get_metric(f"route_requests:{route}")
+        latency_ms = cache.get_metric(f"route_latency_ms:{route}")
+        cost = cache.get_metric(f"route_cost_micro_usd:{route}") / 1e6
+        metrics[route] = {
+            "requests": requests,
+            "avg_latency_ms": round(latency_ms / requests, 1)
+            if requests else 0,
+            "cost_usd": round(cost, 6),
+            "avg_cost_usd": round(cost / requests, 6) if requests else 0,
+        }
+    metrics["escalations"] = cache.get_metric("route_escalations")
+    return metrics
+
+
+def _prefetch_metrics() -> dict:
+    """Precisão do prefetch especulativo e taxa de chamadas desperdiçadas."""
+    metrics = {}
+    for tool in PREFETCH_TOOLS:
+        candidates = cache.get_metric(f"prefetch_candidates:{tool}")
+        hits = cache.get_metric(f"prefetch_hits:{tool}")
+        fetches = cache.get_metric(f"prefetch_fetches:{tool}")
+        wasted = cache.get_metric(f"prefetch_wasted:{tool}")
+        metrics[tool] = {
+            "candidates": candidates,
+            "hits": hits,
+            "fetches": fetches,
+            "wasted": wasted,
+            "precision": _ratio(hits, candidates),
+            "wasted_fetch_rate": _ratio(wasted, fetches),
+            "coalesced_calls": cache.get_metric(
+                f"cache_coalesced_tool:{tool}"),
+        }
+    return metrics
+
+
+PREWARM_HIT_METRICS = {
+    "weather": ("cache_hit_weather", "cache_miss_weather"),
+    "llm_query": ("cache_hit_llm", "cache_miss_llm"),
+}
+
+
+def _prewarm_metrics() -> dict:
+    """
+    Renovações do pré-aquecimento e o efeito na taxa de acerto: o
+    primeiro hit em cada entrada pré-aquecida teria sido miss sem ele.
+    """
+    metrics = {}
+    for namespace, (hit_name, miss_name) in PREWARM_HIT_METRICS.items():
+        hits = cache.get_metric(hit_name)
+        total = hits + cache.get_metric(miss_name)
+        prewarm_hits = cache.get_metric(f"prewarm_hit:{namespace}")
+        hit_ratio = _ratio(hits, total)
+        without = _ratio(hits - prewarm_hits, total)
+        metrics[namespace] = {
+            "refreshes": cache.get_metric(f"prewarm_refresh:{namespace}"),
+            "failed": cache.get_metric(f"prewarm_failed:{namespace}"),
+            "budget_exhausted": cache.get_metric(
+                f"prewarm_budget_exhausted:{namespace}"),
+            "prewarmed_hits": prewarm_hits,
+            "hit_ratio": hit_ratio,
+            "hit_ratio_without_prewarm": without,
+            "hit_ratio_change": round(hit_ratio - without, 4),
+        }
+    metrics["rate_limited"] = cache.get_metric("prewarm_rate_limited")
+    return metrics
+
+
+WINDOWED_METRICS = [
+    "queries",
+    "query_errors",
+    "cache_hit_llm",
+    "cache_miss_llm",
+    "tool_usage:calculator",
+    "tool_usage:get_weather",
+]
+
+
+def _ratio(part: int, total: int) -> float:
+    return round(part / total, 4) if total else 0.0
+
+
+def _window_metrics() -> dict:
+    """QPS, hit rate e uso de tools nas últimas janelas (1m/5m/1h)."""
+    counts = cache.get_windowed_metrics(WINDOWED_METRICS)
+    windows = {}
+    for window, seconds in METRIC_WINDOWS.items():
+        def count(name):
+            return counts[name][window]
+
+        hits, misses = count("cache_hit_llm"), count("cache_miss_llm")
+        windows[window] = {
+            "queries": count("queries"),
+            "qps": round(count("queries") / seconds, 3),
+            "error_rate": _ratio(count("query_errors"), count("queries")),
+            "cache_hit_ratio_llm": _ratio(hits, hits + misses),
+            "tools_usage": {
+                "calculator": count("tool_usage:calculator"),
+                "weather": count("tool_usage:get_weather"),
+            },
+        }
+    return windows
+
+
 @router.get("/metrics")
 async def get_metrics():
-    """Retorna métricas de uso do sistema."""
+    """
+    Retorna métricas de uso do sistema: totais acumulados e, em
+    "windows", taxas das últimas janelas.
+    """
     return {
+        "windows": _window_metrics(),
+
         "cache": {
             "llm": {
                 "hits": cache.get_metric("cache_hit_llm"),
@@ -56,5 +264,38 @@ async def get_metrics():
         "tools_usage": {
             "calculator": cache.get_metric("tool_usage:calculator"),
             "weather": cache.get_metric("tool_usage:get_weather")
+        },
+
+        "sessions": _session_metrics(),
+
+        "executors": _executor_metrics(),
+
+        "routes": _route_metrics(),
+
+        "prefetch": _prefetch_metrics(),
+
+        "prewarm": _prewarm_metrics(),
+
+        "tokens": {
+            "by_path": {
+                path: {
+                    "requests": cache.get_metric(f"requests_path:{path}"),
+                    "prompt": cache.get_metric(f"tokens_prompt:{path}"),
+                    "completion": cache.get_metric(
+                        f"tokens_completion:{path}"),
+                }
+                for path in cache.get_metric_labels("token_paths")
+            },
+            "by_prompt_variant": {
+                variant: {
+                    "requests": cache.get_metric(
+                        f"prompt_variant:{variant}"),
+                    "prompt": cache.get_metric(
+                        f"tokens_prompt_variant:{variant}"),
+                    "completion": cache.get_metric(
+                        f"tokens_completion_variant:{variant}"),
+                }
+                for variant in PROMPTS
+            }
         }
     }
@@ -1,27 +1,122 @@
 import os
-from typing import Dict, Any, List
-
+import json
+import time
+import asyncio
+import hashlib
+from datetime import timedelta
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
+
+import mcp.types as mcp_types
 from fastmcp import Client
-from langchain_openai import ChatOpenAI
-from langchain_core.tools import Tool
-from langgraph.prebuilt import create_react_agent
-
-from backend.core.prompts import SYSTEM_PROMPT
+from fastmcp.exceptions import ToolError
+
+from backend.core.memory import ConversationMemory
+from backend.core.prefetch import (
+    ToolPrefetcher, current_prefetch, mark_prefetch_used
+)
+from backend.core.prewarm import record_access, refreshing
+from backend.core.prompts import PROMPTS
+from backend.core.router import FAST, STRONG, ModelRouter, validate_answer
+from backend.core.tokens import extract_usage, tool_path
+from backend.core.tool_cache import ToolResultCache
 from backend.utils.logger import setup_logger
 from backend.utils.cache import cache
+from backend.utils.deadline import (
+    DEADLINE_META_KEY, DeadlineExceeded, get_deadline, remaining,
+    run_with_deadline
+)
+
+# langchain_openai, langgraph e openai somam ~1s de import: são
+# importados no primeiro uso (initialize), não no import do backend
+if TYPE_CHECKING:
+    from langchain_core.tools import Tool
+
+# Folga (s) sobre o prazo ao aguardar a resposta do MCP Server
+MCP_DEADLINE_GRACE = 0.5
+# Cache negativo de requisições rejeitadas pela OpenAI (erro 400)
+LLM_NEGATIVE_TTL = int(os.getenv("LLM_NEGATIVE_TTL_SECONDS", 300))
+
+
+MCP_TRANSPORTS = ("http", "inprocess")
+
+
+def intermediate_steps(messages: List[Any]) -> List[Dict[str, str]]:
+    """
+    Passos do agente ({"tool", "input", "output"}) a partir das
+    tool_calls das AIMessages e das ToolMessages correspondentes.
+    """
+    outputs = {
+        msg.tool_call_id: str(msg.content)
+        for msg in messages if getattr(msg, "tool_call_id", None)
+    }
+    steps = []
+    for msg in messages:
+        for call in getattr(msg, "tool_calls", None) or []:
+            args = call.get("args") or {}
+            # Tools de um argumento (Tool do LangChain): {"__arg1": ...}
+            if len(args) == 1:
+                tool_input = str(next(iter(args.values())))
+            else:
+                tool_input = json.dumps(args, ensure_ascii=False)
+            steps.append({
+                "tool": call.get("name", "unknown"),
+                "input": tool_input,
+                "output": outputs.get(call.get("id"), ""),
+            })
+    return steps
+
+
+def _openai_bad_request() -> Tuple[type, ...]:
+    import openai
+
+    return (openai.BadRequestError,)
+
+
+def create_mcp_client(transport: Optional[str] = None) -> Client:
+    """
+    Cliente MCP conforme MCP_TRANSPORT:
+
+    - http (padrão): streamable HTTP em MCP_SERVER_URL + /mcp, para o
+      MCP Server em outro processo/container
+    - inprocess: transporte em memória do FastMCP direto na instância
+      `mcp` de mcp_server.server, quando backend e tools rodam no mesmo
+      processo (sem HTTP nem servidor em 8001). As tools continuam nos
+      pools de mcp_server.executors, agora criados neste processo
+    """
+    transport = (transport or os.getenv("MCP_TRANSPORT", "http")).lower()
+    if transport not in MCP_TRANSPORTS:
+        raise ValueError(
+            f"MCP_TRANSPORT inválido: {transport} "
+            f"(use {' ou '.join(MCP_TRANSPORTS)})"
+        )
+    if transport == "inprocess":
+        from mcp_server.server import mcp
+
+        return Client(mcp)
+    url = os.getenv("MCP_SERVER_URL", "http://127.0.0.1:8001").rstrip("/")
+    return Client(f"{url}/mcp")
 
 
 class AIAssistant:
     """Agente principal que decide quando usar ferramentas via MCP."""
 
     def __init__(self):
-        self._mcp_client = Client("http://127.0.0.1:8001/mcp")
+        self.mcp_transport = os.getenv("MCP_TRANSPORT", "http").lower()
+        self._mcp_client = create_mcp_client(self.mcp_transport)
 
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.openai_model_name = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self.openai_model_temperature = float(
             os.getenv("OPENAI_MODEL_TEMPERATURE", "0")
         )
+        self.cache_ttl = int(os.getenv("CACHE_TTL_SECONDS", 86400))
+        self.cache_nonzero_temperature = os.getenv(
+            "CACHE_NONZERO_TEMPERATURE", "false"
+        ).lower() in ("true", "1", "yes")
+        self.prompt_variant = os.getenv("PROMPT_VARIANT", "full").lower()
+        self.prompt_ab_compact_ratio = float(
+            os.getenv("PROMPT_AB_COMPACT_RATIO", "0.5")
+        )
 
         if not self.openai_api_key:
             raise ValueError("OPENAI_API_KEY não configurada no .env")
@@ -33,16 +128,39 @@ class AIAssistant:
         )
         self.logger = setup_logger(__name__, debug=self.debug)
 
-        self.tools: List[Tool] = []
+        self.tools: List["Tool"] = []
+        self.tools_text = ""
+        self._tool_input_names: Dict[str, str] = {}
         self.agent = None
+        self.llm = None
+
+        self.router = None
+        if os.getenv("MODEL_ROUTING_ENABLED", "false").lower() in (
+            "true", "1", "yes"
+        ):
+            self.router = ModelRouter(
+                temperature=self.openai_model_temperature
+            )
+
+        self.memory = ConversationMemory(model=self.openai_model_name)
+        self.tool_cache = ToolResultCache()
+        self.prefetcher = ToolPrefetcher(self.tool_cache)
+        self._background_tasks = set()
+        self._summarizing: set = set()
 
     async def initialize(self):
         """
         Inicializa agente LangGraph conectando ao MCP Server.
         Carrega ferramentas disponíveis
         """
+        from langchain_openai import ChatOpenAI
+        from langgraph.prebuilt import create_react_agent
+
         try:
-            self.logger.info("Inicializando agente LangGraph + MCP Server")
+            self.logger.info(
+                f"Inicializando agente LangGraph + MCP Server "
+                f"(transporte: {self.mcp_transport})"
+            )
 
             self.llm = ChatOpenAI(
                 model=self.openai_model_name,
@@ -64,7 +182,13 @@ class AIAssistant:
             if not self.tools:
                 raise RuntimeError("Nenhuma tool disponível no MCP Server!")
 
+            self.tools_text = "\n".join(
+                f"{tool.name}: {tool.description}" for tool in self.tools
+            )
+
             self.agent = create_react_agent(self.llm, self.tools)
+            if self.router:
+                self.router.build(self.tools)
 
             self.logger.info("Agente LangGraph inicializado com sucesso")
 
@@ -75,7 +199,87 @@ class AIAssistant:
             )
             raise
 
-    def _create_langchain_tool(self, mcp_tool) -> Tool:
+    def _build_tool_arguments(
+        self, tool_name: str, expression: str
+    ) -> Dict[str, Any]:
+        """Converte o argumento textual do agente nos argumentos da tool."""
+        if tool_name == "calculator":
+            return {"expression": expression}
+
+        if tool_name == "get_weather":
+            if "," in expression:
+                city, country = expression.split(",", 1)
+                return {"city": city.strip(), "country_code": country.strip()}
+            return {"city": expression.strip(), "country_code": "BR"}
+
+        input_name = self._tool_input_names.get(tool_name, "expression")
+        return {input_name: expression}
+
+    def _parse_tool_result(self, result) -> Any:
+        """
+        Extrai o conteúdo da resposta MCP (lista de TextContent com o
+        dict da tool serializado em JSON).
+        """
+        if isinstance(result, list) and result:
+            text = getattr(result[0], "text", None)
+            if text is not None:
+                try:
+                    return json.loads(text)
+                except ValueError:
+                    return text
+        return result
+
+    def _format_tool_result(self, expression: str, result: Any) -> str:
+        if isinstance(result, dict):
+            if "formatted" in result:
+                return result["formatted"]
+            if "result" in result:
+                return f"{expression} = {result['result']}"
+            if "error" in result:
+                return f"Erro: {result['error']}"
+            return str(result)
+
+        return str(result)
+
+    async def _call_mcp_tool(
+        self, tool_name: str, arguments: Dict[str, Any]
+    ) -> Any:
+        """
+        Executa a tool no MCP Server.
+
+        O prazo da requisição vai no `_meta` da chamada e limita a espera
+        pela resposta. A espera tem uma folga sobre o prazo para receber
+        o erro de timeout que o próprio servidor devolve ao esgotá-lo.
+        """
+        meta = None
+        read_timeout = None
+        deadline = get_deadline()
+        if deadline is not None:
+            left = remaining()
+            if left <= 0:
+                raise DeadlineExceeded()
+            meta = mcp_types.RequestParams.Meta(
+                **{DEADLINE_META_KEY: deadline}
+            )
+            read_timeout = timedelta(seconds=left + MCP_DEADLINE_GRACE)
+
+        request = mcp_types.ClientRequest(mcp_types.CallToolRequest(
+            method="tools/call",
+            params=mcp_types.CallToolRequestParams(
+                name=tool_name, arguments=arguments, _meta=meta
+            ),
+        ))
+        async with self._mcp_client:
+            result = await self._mcp_client.session.send_request(
+                request,
+                mcp_types.CallToolResult,
+                request_read_timeout_seconds=read_timeout,
+            )
+        if result.isError:
+            raise ToolError(self._parse_tool_result(result.content))
+        return self._parse_tool_result(result.content)
+
+    def _create_langchain_tool(self, mcp_tool) -> "Tool":
         """
         Converte ferramenta MCP para LangChain Tool.
         Args:
@@ -84,6 +288,13 @@ class AIAssistant:
         tool_name = mcp_tool.name
         tool_description = mcp_tool.description or f"Ferramenta {tool_name}"
 
+        schema = getattr(mcp_tool, "inputSchema", None) or {}
+        input_names = schema.get("required") or list(
+            schema.get("properties", {})
+        )
+        if input_names:
+            self._tool_input_names[tool_name] = input_names[0]
+
         async def tool_func(expression: str) -> str:
             try:
                 self.logger.debug(
@@ -91,45 +302,39 @@ class AIAssistant:
                     f"{expression}"
                 )
 
-                if tool_name == "calculator":
-                    arguments = {"expression": expression}
-                elif tool_name == "get_weather":
-                    if "," in expression:
-                        city, country = expression.split(",", 1)
-                        arguments = {"city": city.strip(
-                        ), "country_code": country.strip()}
-                    else:
-                        arguments = {"city": expression.strip(),
-                                     "country_code": "BR"}
-                else:
-                    arguments = {"expression": expression}
-
-                async with self._mcp_client:
-                    result = await self._mcp_client.call_tool(
-                        tool_name,
-                        arguments=arguments
-                    )
+                arguments = self._build_tool_arguments(tool_name, expression)
+                mark_prefetch_used(tool_name, arguments)
+                if tool_name == "get_weather":
+                    record_access("weather", "{city},{country_code}".format(
+                        **arguments
+                    ))
+                start = time.perf_counter()
+                result = await self.tool_cache.call(
+                    tool_name, arguments, self._call_mcp_tool
+                )
+                self.logger.info(
+                    f"Tool executada: {tool_name}",
+                    extra={
+                        "tool_name": tool_name,
+                        "duration_ms": round(
+                            (time.perf_counter() - start) * 1000, 1
+                        ),
+                    }
+                )
 
                 self.logger.debug(
                     f"Resultado MCP ({tool_name}): {result}"
                 )
 
-                if isinstance(result, dict):
-                    if "formatted" in result:
-                        return result["formatted"]
-                    if "result" in result:
-                        return f"{expression} = {result['result']}"
-                    if "error" in result:
-                        return f"Erro: {result['error']}"
-                    return str(result)
-
-                return str(result)
+                return self._format_tool_result(expression, result)
 
             except Exception as e:
                 error_msg = f"Erro ao executar tool {tool_name}: {str(e)}"
                 self.logger.error(error_msg, exc_info=True)
                 return error_msg
 
+        from langchain_core.tools import Tool
+
         return Tool(
             name=tool_name,
             description=tool_description,
@@ -137,92 +342,216 @@ class AIAssistant:
             coroutine=tool_func
         )
 
-    async def process_query(self, query: str) -> Dict[str, Any]:
+    def _select_prompt(self, query: str) -> str:
+        """
+        Escolhe a variante do system prompt ("full" ou "compact").
+
+        PROMPT_VARIANT=full|compact fixa a variante. Com PROMPT_VARIANT=ab
+        a escolha é determinística pelo hash da query: a mesma pergunta
+        cai sempre no mesmo braço (e na mesma entrada de cache).
+        """
+        if self.prompt_variant in PROMPTS:
+            return self.prompt_variant
+
+        if self.prompt_variant == "ab":
+            bucket = int(
+                hashlib.sha256(query.encode()).hexdigest()[:8], 16
+            ) / 0xFFFFFFFF
+            if bucket < self.prompt_ab_compact_ratio:
+                return "compact"
+
+        return "full"
+
+    def _cache_params(
+        self, prompt_variant: str = "full", model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Parâmetros que definem o namespace do cache de respostas.
+
+        Mudar modelo, temperatura ou prompt gera chaves novas, então
+        respostas antigas nunca são servidas para outra configuração.
+        """
+        return {
+            "model": model or self.openai_model_name,
+            "temperature": self.openai_model_temperature,
+            "prompt": hashlib.sha256(
+                PROMPTS[prompt_variant].encode()
+            ).hexdigest()[:12],
+        }
+
+    def _record_usage(
+        self,
+        usage: Dict[str, Any],
+        tools_used: List[str],
+        prompt_variant: str
+    ) -> None:
+        """Registra tokens por caminho de tools e por variante de prompt."""
+        path = tool_path(tools_used)
+        cache.track_metric_label("token_paths", path)
+        cache.increment_metrics({
+            f"requests_path:{path}": 1,
+            f"tokens_prompt:{path}": usage["prompt_tokens"],
+            f"tokens_completion:{path}": usage["completion_tokens"],
+            f"prompt_variant:{prompt_variant}": 1,
+            f"tokens_prompt_variant:{prompt_variant}": usage[
+                "prompt_tokens"],
+            f"tokens_completion_variant:{prompt_variant}": usage[
+                "completion_tokens"],
+        })
+
+    async def _invoke_agent(
+        self, messages: List[Tuple[str, str]], route: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], str, Optional[str]]:
+        """
+        Executa o agente e retorna (resultado, modelo, rota).
+
+        Com roteamento habilitado, a query vai para o agente da rota
+        classificada; se a resposta do modelo rápido não passar na
+        validação, é refeita no modelo forte.
+        """
+        if not self.router:
+            result = await self.agent.ainvoke({"messages": messages})
+            return result, self.openai_model_name, None
+
+        while True:
+            model = self.router.models[route]
+            start = time.perf_counter()
+            result = await self.router.agents[route].ainvoke(
+                {"messages": messages}
+            )
+            latency_ms = (time.perf_counter() - start) * 1000
+            if not refreshing.get():
+                self.router.record(route, latency_ms, extract_usage(
+                    result.get("messages", []),
+                    model=model,
+                    tools_text=self.tools_text,
+                    start=len(messages),
+                ))
+
+            if route == FAST and not validate_answer(
+                result["messages"][-1].content
+            ):
+                self.logger.info(
+                    "Resposta do modelo rápido reprovada, escalonando "
+                    "para o modelo forte"
+                )
+                if not refreshing.get():
+                    self.router.record_escalation()
+                route = STRONG
+                continue
+
+            self.logger.info(
+                f"Rota {route} ({model}) em {latency_ms:.0f}ms"
+            )
+            return result, model, route
+
+    def _finish_prefetch(self, prefetch) -> None:
+        """
+        Registra as métricas do prefetch quando as chamadas especulativas
+        terminarem, sem atrasar a resposta por causa delas.
+        """
+        self._background_tasks.add(prefetch.task)
+        prefetch.task.add_done_callback(self._background_tasks.discard)
+        prefetch.task.add_done_callback(lambda _: prefetch.record())
+
+    def _is_cacheable(self) -> bool:
+        """
+        Respostas com temperatura > 0 não são determinísticas e só são
+        cacheadas com CACHE_NONZERO_TEMPERATURE habilitado.
+        """
+        return (
+            self.openai_model_temperature == 0
+            or self.cache_nonzero_temperature
+        )
+
+    def _remember(self, session_id: str, query: str, response: str):
+        """
+        Grava o turno na sessão e agenda o resumo fora do caminho da
+        requisição quando as mensagens guardadas estouram o orçamento.
+        """
+        session = self.memory.append(session_id, query, response)
+
+        # Um resumo por sessão de cada vez: turnos concorrentes não
+        # disparam chamadas duplicadas ao LLM que se sobrescrevem
+        if (
+            self.llm
+            and session_id not in self._summarizing
+            and self.memory.needs_summary(session)
+        ):
+            self._summarizing.add(session_id)
+            task = asyncio.create_task(
+                self.memory.summarize(session_id, self.llm)
+            )
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+            task.add_done_callback(
+                lambda _: self._summarizing.discard(session_id)
+            )
+
+    async def process_query(
+        self, query: str, session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Processa query do usuário.
         Reinicializa agente se necessário.
         Args:
             query: Pergunta do usuário
+            session_id: Sessão de conversa (opcional). Quando informada,
+                o resumo e as mensagens recentes vão como contexto.
 
         """
+        cache.increment_metric("queries")
         try:
             if not self.agent:
                 await self.initialize()
 
-            cache_ttl = int(os.getenv("CACHE_TTL_SECONDS", 600))
-            cache_key = cache._make_key("llm_query", query)
-            cached_response = cache.get(cache_key)
-
-            if cached_response:
-                self.logger.info("Resposta retornada do cache")
-                cache.increment_metric("cache_hit_llm")
-                return cached_response
-
-            cache.increment_metric("cache_miss_llm")
-
-            self.logger.info(f"Processando query do usuário: {query}")
+            context: List[Tuple[str, str]] = []
+            if session_id:
+                session = self.memory.load(session_id)
+                context, context_tokens = self.memory.build_context(session)
+                cache.increment_metrics({
+                    "session_turns": 1,
+                    "session_context_tokens": context_tokens,
+                })
+                self.logger.info(
+                    f"Contexto da sessão: {len(context)} mensagens, "
+                    f"{context_tokens} tokens"
+                )
+            elif self._is_cacheable():
+                record_access("llm_query", query)
 
-            result = await self.agent.ainvoke(
-                {
-                    "messages": [
-                        ("system", SYSTEM_PROMPT),
-                        ("user", query)
-                    ]
-                }
+            response_data = await run_with_deadline(
+                self._answer(query, context)
             )
 
-            tools_used = []
-
-            if "messages" in result:
-                tool_calls = [
-                    msg for msg in result["messages"]
-                    if hasattr(msg, 'tool_calls') and msg.tool_calls
-                ]
-
-                if tool_calls:
-                    tools_used = []
-                    for msg in tool_calls:
-                        if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                            for tc in msg.tool_calls:
-                                if isinstance(tc, dict):
-                                    tool_name = tc.get('name', 'unknown')
-                                else:
-                                    tool_name = getattr(tc, 'name', str(tc))
-                                tools_used.append(tool_name)
-
-                    if tools_used:
-                        self.logger.info(
-                            f"Tools utilizadas: {', '.join(tools_used)}"
-                        )
-                        for tool_name in tools_used:
-                            cache.increment_metric(f"tool_usage:{tool_name}")
-                else:
-                    self.logger.info(
-                        "Nenhuma tool utilizada (resposta direta do LLM)"
-                    )
+            if session_id:
+                response_data = {**response_data, "session_id": session_id}
+                self._remember(session_id, query, response_data["response"])
 
-            self.logger.info("Resposta gerada com sucesso")
+            return response_data
 
-            response = result.get("output") or result.get("messages")[
-                -1].content
+        except DeadlineExceeded as e:
+            self.logger.warning(
+                f"Prazo esgotado ao processar query: {query}"
+            )
+            cache.increment_metrics({
+                "query_errors": 1,
+                "deadline_exceeded": 1,
+            })
 
-            response_data = {
-                "success": True,
+            return {
+                "success": False,
                 "query": query,
-                "response": response,
-                "tools_used": tools_used,
-                "intermediate_steps": []
+                "response": None,
+                "error": str(e),
             }
 
-            cache.set(cache_key, response_data, ttl=cache_ttl)
-
-            return response_data
-
         except Exception as e:
             self.logger.error(
                 f"Erro ao processar query: {str(e)}",
                 exc_info=True
             )
+            cache.increment_metric("query_errors")
 
             return {
                 "success": False,
@@ -230,3 +559,162 @@ class AIAssistant:
                 "response": None,
                 "error": str(e),
             }
+
+    def _initial_route(
+        self, query: str
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Rota e modelo iniciais da query (None sem roteamento)."""
+        if not self.router:
+            return None, None
+        route = self.router.classify(query)
+        return route, self.router.models[route]
+
+    def _answer_cache_key(
+        self, query: str, context: List[Tuple[str, str]]
+    ) -> Optional[str]:
+        """
+        Chave do cache de respostas, ou None se as respostas não são
+        cacheáveis. A chave usa o modelo da rota inicial, conhecida antes
+        da chamada ao LLM.
+        """
+        if not self._is_cacheable():
+            return None
+
+        cache_data = query
+        if context:
+            digest = self.memory.context_digest(context)
+            cache_data = f"{query}\n{digest}"
+
+        _, model = self._initial_route(query)
+        return cache.make_namespaced_key(
+            "llm_query", cache_data,
+            **self._cache_params(self._select_prompt(query), model)
+        )
+
+    def response_cache_key(self, query: str) -> Optional[str]:
+        """Chave do cache de uma query sem sessão (pré-aquecimento)."""
+        return self._answer_cache_key(query, [])
+
+    async def refresh_answer(self, query: str) -> Dict[str, Any]:
+        """
+        Gera de novo a resposta de uma query sem sessão e substitui a
+        entrada do cache (pré-aquecimento), sem registrar métricas de
+        uso (tools, tokens, rotas, prefetch).
+        """
+        token = refreshing.set(True)
+        try:
+            return await AIAssistant._answer.refresh(self, query, [])
+        finally:
+            refreshing.reset(token)
+
+    @cache.cached(
+        "llm_query",
+        key=lambda self, query, context: self._answer_cache_key(
+            query, context
+        ),
+        ttl=lambda self, *args: self.cache_ttl,
+        error_ttl=LLM_NEGATIVE_TTL,
+        negative_exceptions=_openai_bad_request,
+        metric="llm",
+        on_hit=lambda response: {**response, "cached": True},
+    )
+    async def _answer(
+        self, query: str, context: List[Tuple[str, str]]
+    ) -> Dict[str, Any]:
+        """
+        Responde a query (com contexto de sessão opcional). Respostas são
+        cacheadas pelo @cached; requisições rejeitadas pela OpenAI (400)
+        entram no cache negativo por LLM_NEGATIVE_TTL_SECONDS.
+        """
+        prompt_variant = self._select_prompt(query)
+        route, model = self._initial_route(query)
+
+        self.logger.info(f"Processando query do usuário: {query}")
+
+        messages = [
+            ("system", PROMPTS[prompt_variant]),
+            *context,
+            ("user", query)
+        ]
+        # Aquece o cache de tools enquanto o LLM decide qual chamar (não
+        # na renovação do pré-aquecimento)
+        prefetch = None if refreshing.get() else self.prefetcher.start(
+            query, self._call_mcp_tool,
+            tool_names=[tool.name for tool in self.tools],
+        )
+        token = current_prefetch.set(prefetch)
+        try:
+            result, model, route = await self._invoke_agent(
+                messages, route
+            )
+        finally:
+            current_prefetch.reset(token)
+            if prefetch:
+                self._finish_prefetch(prefetch)
+
+        tools_used = []
+
+        if "messages" in result:
+            tool_calls = [
+                msg for msg in result["messages"]
+                if hasattr(msg, 'tool_calls') and msg.tool_calls
+            ]
+
+            if tool_calls:
+                tools_used = []
+                for msg in tool_calls:
+                    if hasattr(msg, 'tool_calls') and msg.tool_calls:
+                        for tc in msg.tool_calls:
+                            if isinstance(tc, dict):
+                                tool_name = tc.get('name', 'unknown')
+                            else:
+                                tool_name = getattr(tc, 'name', str(tc))
+                            tools_used.append(tool_name)
+
+                if tools_used:
+                    self.logger.info(
+                        f"Tools utilizadas: {', '.join(tools_used)}"
+                    )
+                    if not refreshing.get():
+                        for tool_name in tools_used:
+                            cache.increment_metric(
+                                f"tool_usage:{tool_name}"
+                            )
+            else:
+                self.logger.info(
+                    "Nenhuma tool utilizada (resposta direta do LLM)"
+                )
+
+        self.logger.info("Resposta gerada com sucesso")
+
+        response = result.get("output") or result.get("messages")[
+            -1].content
+
+        usage = extract_usage(
+            result.get("messages", []),
+            model=model,
+            tools_text=self.tools_text,
+            start=len(messages),
+        )
+        if not refreshing.get():
+            self._record_usage(usage, tools_used, prompt_variant)
+        self.logger.info(
+            f"Tokens: prompt={usage['prompt_tokens']} "
+            f"completion={usage['completion_tokens']} "
+            f"(prompt={prompt_variant})"
+        )
+
+        response_data = {
+            "success": True,
+            "query": query,
+            "response": response,
+            "tools_used": tools_used,
+            "intermediate_steps": intermediate_steps(
+                result.get("messages", [])
+            ),
+            "usage": usage,
+            "prompt_variant": prompt_variant,
+            "route": route,
+        }
+
+        return response_data
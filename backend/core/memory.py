@@ -0,0 +1,215 @@
+"""
+Memória de conversa por sessão, armazenada de forma compacta no Redis.
+
+Cada sessão guarda um resumo das mensagens antigas e as mensagens
+recentes com sua contagem de tokens. O contexto enviado ao LLM é o
+resumo mais a maior janela de mensagens recentes que cabe no orçamento
+de tokens, então o custo por turno não cresce com a conversa.
+
+Os ids de sessão são emitidos pelo servidor (new_session_id): um valor
+aleatório assinado com HMAC (SESSION_SECRET), então não dá para
+adivinhar nem forjar um id. O id funciona como um token ao portador:
+quem o tiver lê (via /v1/query) e apaga a sessão. Não há vínculo com a
+identidade do usuário, porque a API não tem autenticação.
+"""
+import os
+import hmac
+import hashlib
+import json
+import secrets
+from typing import Dict, Any, List, Optional, Tuple
+
+from backend.core.tokens import count_tokens
+from backend.utils.cache import cache
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SUMMARY_PROMPT = """Resuma a conversa abaixo entre um usuário e um \
+assistente em no máximo {max_words} palavras, em português. Mantenha \
+nomes, cidades, números e o assunto atual, pois o usuário pode fazer \
+perguntas de continuação.
+
+Resumo anterior:
+{summary}
+
+Novas mensagens:
+{turns}
+
+Resumo atualizado:"""
+
+
+# Sem SESSION_SECRET, ids assinados valem só até o processo reiniciar
+_PROCESS_SECRET = secrets.token_hex(32)
+
+
+def _session_signature(token: str) -> str:
+    secret = os.getenv("SESSION_SECRET") or _PROCESS_SECRET
+    return hmac.new(
+        secret.encode(), token.encode(), hashlib.sha256
+    ).hexdigest()[:32]
+
+
+def new_session_id() -> str:
+    """Id de sessão aleatório e assinado pelo servidor."""
+    token = secrets.token_urlsafe(18)
+    return f"{token}.{_session_signature(token)}"
+
+
+def valid_session_id(session_id: Optional[str]) -> bool:
+    """Verdadeiro se o id foi emitido por new_session_id."""
+    if not session_id or session_id.count(".") != 1:
+        return False
+    token, signature = session_id.split(".")
+    return hmac.compare_digest(signature, _session_signature(token))
+
+
+class ConversationMemory:
+    """Sessões de conversa com janela por tokens e resumo incremental."""
+
+    def __init__(self, model: str = "gpt-4o-mini"):
+        self.model = model
+        self.max_context_tokens = int(
+            os.getenv("SESSION_CONTEXT_TOKENS", 1000)
+        )
+        self.max_turns = int(os.getenv("SESSION_MAX_TURNS", 50))
+        self.summary_words = int(os.getenv("SESSION_SUMMARY_WORDS", 120))
+        self.ttl = int(os.getenv("SESSION_TTL_SECONDS", 86400))
+
+    def _key(self, session_id: str) -> str:
+        return f"session:{session_id}"
+
+    def load(self, session_id: str) -> Dict[str, Any]:
+        """
+        Carrega a sessão.
+
+        Formato: {"s": resumo, "n": próximo id,
+        "t": [[id, papel ("u"/"a"), texto, tokens], ...]}
+        """
+        session = cache.get(self._key(session_id))
+        return session or {"s": "", "n": 0, "t": []}
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> bool:
+        return cache.set(self._key(session_id), session, ttl=self.ttl)
+
+    def clear(self, session_id: str) -> bool:
+        return cache.delete(self._key(session_id))
+
+    def build_context(
+        self, session: Dict[str, Any]
+    ) -> Tuple[List[Tuple[str, str]], int]:
+        """
+        Monta as mensagens de contexto dentro do orçamento de tokens.
+
+        O resumo vai como mensagem de sistema depois do system prompt
+        (que continua sendo o prefixo estável da requisição), seguido das
+        mensagens mais recentes que couberem no orçamento.
+
+        Returns:
+            Tupla (mensagens, tokens do contexto)
+        """
+        messages: List[Tuple[str, str]] = []
+        budget = self.max_context_tokens
+
+        summary = session.get("s", "")
+        summary_tokens = count_tokens(summary, self.model)
+        budget -= summary_tokens
+
+        window = []
+        for _, role, text, tokens in reversed(session.get("t", [])):
+            if tokens > budget:
+                break
+            budget -= tokens
+            window.append(("user" if role == "u" else "assistant", text))
+
+        if summary:
+            messages.append(
+                ("system", f"Resumo da conversa até aqui: {summary}")
+            )
+        messages.extend(reversed(window))
+
+        return messages, self.max_context_tokens - budget
+
+    def context_digest(self, messages: List[Tuple[str, str]]) -> str:
+        """Hash do contexto, usado para compor a chave de cache."""
+        if not messages:
+            return ""
+        return hashlib.sha256(
+            json.dumps(messages, ensure_ascii=False).encode()
+        ).hexdigest()[:16]
+
+    def append(
+        self, session_id: str, query: str, response: str
+    ) -> Dict[str, Any]:
+        """Adiciona o turno (pergunta e resposta) à sessão."""
+        session = self.load(session_id)
+        for role, text in (("u", query), ("a", response or "")):
+            session["t"].append([
+                session["n"], role, text, count_tokens(text, self.model)
+            ])
+            session["n"] += 1
+
+        if len(session["t"]) > self.max_turns:
+            session["t"] = session["t"][-self.max_turns:]
+
+        self.save(session_id, session)
+        return session
+
+    def needs_summary(self, session: Dict[str, Any]) -> bool:
+        """Indica se as mensagens guardadas estouram o orçamento."""
+        stored = sum(turn[3] for turn in session.get("t", []))
+        return stored > self.max_context_tokens
+
+    async def summarize(self, session_id: str, llm) -> bool:
+        """
+        Incorpora as mensagens mais antigas ao resumo.
+
+        Roda fora do caminho da requisição. Resume as mensagens antigas
+        até que as restantes ocupem metade do orçamento, para que o resumo
+        não precise ser refeito a cada turno.
+        """
+        session = self.load(session_id)
+        if not self.needs_summary(session):
+            return False
+
+        turns = session["t"]
+        remaining = sum(turn[3] for turn in turns)
+        folded = []
+        for turn in turns:
+            if remaining <= self.max_context_tokens // 2:
+                break
+            folded.append(turn)
+            remaining -= turn[3]
+
+        if not folded:
+            return False
+
+        prompt = SUMMARY_PROMPT.format(
+            max_words=self.summary_words,
+            summary=session.get("s") or "(vazio)",
+            turns="\n".join(
+                f"{'Usuário' if role == 'u' else 'Assistente'}: {text}"
+                for _, role, text, _ in folded
+            ),
+        )
+
+        try:
+            result = await llm.ainvoke([("user", prompt)])
+        except Exception as e:
+            logger.error(f"Erro ao resumir sessão: {e}", exc_info=True)
+            return False
+
+        last_folded_id = folded[-1][0]
+
+        # Recarrega para não perder turnos gravados durante o resumo
+        session = self.load(session_id)
+        session["s"] = result.content.strip()
+        session["t"] = [
+            turn for turn in session["t"] if turn[0] > last_folded_id
+        ]
+        self.save(session_id, session)
+
+        logger.info(
+            f"Sessão resumida: {len(folded)} mensagens incorporadas"
+        )
+        return True
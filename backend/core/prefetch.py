@@ -0,0 +1,196 @@
+"""
+Prefetch especulativo de tools em paralelo com a primeira chamada ao LLM.
+
+No loop ReAct, a primeira ida ao LLM só decide qual tool chamar; a tool
+roda depois, em sequência. Aqui os argumentos prováveis são extraídos da
+query por regex (cidades em perguntas de clima, trechos aritméticos) e
+o cache de tools é aquecido enquanto o LLM responde. Quando o agente
+chama a tool, o resultado já está no cache (ou em voo, e a chamada se
+junta a ela pelo single-flight do ToolResultCache).
+
+Métricas por tool (GET /v1/metrics -> prefetch):
+- prefetch_candidates: argumentos previstos
+- prefetch_hits: previsões que o agente de fato usou (precisão)
+- prefetch_fetches: previsões que geraram chamada ao MCP Server
+- prefetch_wasted: chamadas disparadas cujo resultado não foi usado
+
+Configuração:
+- PREFETCH_ENABLED: liga o prefetch (padrão: true)
+- PREFETCH_MAX_CANDIDATES: máximo de chamadas especulativas por query
+  (padrão: 3)
+"""
+import os
+import re
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.core.tool_cache import ToolResultCache, normalize_arguments
+from backend.utils.cache import cache
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+PREFETCH_TOOLS = ("calculator", "get_weather")
+
+_WORD_OPERATORS = [
+    (re.compile(r"\s+dividido\s+por\s+", re.I), " / "),
+    (re.compile(r"\s+(?:vezes|x|×)\s+", re.I), " * "),
+    (re.compile(r"\s+mais\s+", re.I), " + "),
+    (re.compile(r"\s+menos\s+", re.I), " - "),
+    (re.compile(r"\s+elevado\s+a\s+", re.I), " ^ "),
+    (re.compile(r"÷"), "/"),
+]
+
+_NUMBER = r"\(*\s*\d+(?:\.\d+)?\s*\)*"
+_ARITHMETIC = re.compile(
+    rf"-?{_NUMBER}(?:\s*[-+*/^]\s*{_NUMBER})+"
+)
+
+_WEATHER_WORDS = re.compile(
+    r"\b(clima|tempo|temperatura|chuva|chovendo|previs[aã]o|frio|calor|"
+    r"graus|umidade|weather|forecast)\b",
+    re.I,
+)
+
+_CITY = re.compile(
+    r"\b(?:em|no|na|de|do|da|para|pra|in|for)\s+"
+    r"((?:[A-ZÀ-Ý][\w'-]+)(?:\s+(?:d[aeo]s?\s+)?[A-ZÀ-Ý][\w'-]+)*)"
+    r"(?:\s*[,-]\s*([A-Z]{2})\b)?"
+)
+
+current_prefetch: ContextVar[Optional["PrefetchRun"]] = ContextVar(
+    "current_prefetch", default=None
+)
+
+
+def extract_candidates(
+    query: str, max_candidates: int = 3
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Extrai chamadas de tool prováveis a partir do texto da query.
+
+    Returns:
+        Lista de (tool, argumentos), sem repetições
+    """
+    candidates = []
+
+    text = query
+    for pattern, operator in _WORD_OPERATORS:
+        text = pattern.sub(operator, text)
+    for match in _ARITHMETIC.finditer(text):
+        expression = " ".join(match.group(0).split())
+        if expression.count("(") == expression.count(")"):
+            candidates.append(("calculator", {"expression": expression}))
+
+    if _WEATHER_WORDS.search(query):
+        for match in _CITY.finditer(query):
+            candidates.append(("get_weather", {
+                "city": match.group(1),
+                "country_code": match.group(2) or "BR",
+            }))
+
+    unique = {}
+    for tool_name, arguments in candidates:
+        key = f"{tool_name}:{normalize_arguments(tool_name, arguments)}"
+        unique.setdefault(key, (tool_name, arguments))
+    return list(unique.values())[:max_candidates]
+
+
+class PrefetchRun:
+    """Previsões de uma requisição e se o agente chegou a usá-las."""
+
+    def __init__(self, candidates: List[Tuple[str, Dict[str, Any]]]):
+        self.entries = {
+            f"{tool}:{normalize_arguments(tool, args)}": {
+                "tool": tool, "arguments": args,
+                "used": False, "fetched": False,
+            }
+            for tool, args in candidates
+        }
+        self.task: Optional[asyncio.Task] = None
+
+    def mark_used(self, tool_name: str, arguments: Dict[str, Any]) -> None:
+        entry = self.entries.get(
+            f"{tool_name}:{normalize_arguments(tool_name, arguments)}"
+        )
+        if entry is not None:
+            entry["used"] = True
+
+    def record(self) -> None:
+        """Acumula as métricas de precisão e desperdício da requisição."""
+        metrics: Dict[str, int] = {}
+        for entry in self.entries.values():
+            tool = entry["tool"]
+            wasted = entry["fetched"] and not entry["used"]
+            for name, value in (
+                ("prefetch_candidates", 1),
+                ("prefetch_hits", entry["used"]),
+                ("prefetch_fetches", entry["fetched"]),
+                ("prefetch_wasted", wasted),
+            ):
+                key = f"{name}:{tool}"
+                metrics[key] = metrics.get(key, 0) + int(value)
+        cache.increment_metrics(metrics)
+
+
+def mark_prefetch_used(tool_name: str, arguments: Dict[str, Any]) -> None:
+    """Marca a chamada de tool feita pelo agente na previsão corrente."""
+    run = current_prefetch.get()
+    if run is not None:
+        run.mark_used(tool_name, arguments)
+
+
+class ToolPrefetcher:
+    """Dispara as chamadas especulativas de uma query."""
+
+    def __init__(
+        self,
+        tool_cache: ToolResultCache,
+        max_candidates: Optional[int] = None,
+    ):
+        self.tool_cache = tool_cache
+        self.max_candidates = (
+            max_candidates if max_candidates is not None
+            else int(os.getenv("PREFETCH_MAX_CANDIDATES", 3))
+        )
+        self.enabled = os.getenv("PREFETCH_ENABLED", "true").lower() in (
+            "true", "1", "yes"
+        )
+
+    def start(
+        self,
+        query: str,
+        fetch: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+        tool_names=PREFETCH_TOOLS,
+    ) -> Optional[PrefetchRun]:
+        """
+        Agenda o aquecimento do cache e retorna a previsão, ou None se
+        não houver candidatos.
+        """
+        if not self.enabled:
+            return None
+
+        candidates = [
+            (tool, args)
+            for tool, args in extract_candidates(query, self.max_candidates)
+            if tool in tool_names
+        ]
+        if not candidates:
+            return None
+
+        run = PrefetchRun(candidates)
+        run.task = asyncio.create_task(self._warm(run, fetch))
+        logger.debug(f"Prefetch de {len(candidates)} chamada(s) de tool")
+        return run
+
+    async def _warm(self, run: PrefetchRun, fetch) -> None:
+        async def warm_one(entry):
+            try:
+                entry["fetched"] = await self.tool_cache.prefetch(
+                    entry["tool"], entry["arguments"], fetch
+                )
+            except Exception as e:
+                logger.warning(f"Falha no prefetch de {entry['tool']}: {e}")
+
+        await asyncio.gather(*(warm_one(e) for e in run.entries.values()))
@@ -0,0 +1,200 @@
+"""
+Pré-aquecimento do cache guiado por popularidade.
+
+Os acessos a cidades (get_weather) e a queries sem sessão (llm_query)
+entram em um ranking com decaimento no Redis (RedisCache.
+track_popularity). Um agendador em background percorre o top-N de cada
+namespace e recalcula as entradas que estão perto de expirar (ou que já
+expiraram), para que o próximo usuário não pague o miss.
+
+As renovações respeitam um limite global por minuto (compartilhado entre
+processos) e um orçamento por hora de chamadas upstream em cada
+namespace. Entradas gravadas pelo agendador levam o campo
+PREWARMED_FIELD e um marcador de uso único (RedisCache.set_prewarmed);
+o primeiro hit depois da renovação, o único que sem o pré-aquecimento
+teria sido miss, é contado em prewarm_hit:<namespace>. Isso permite
+estimar a taxa de acerto que se teria sem o pré-aquecimento.
+
+Configuração:
+- PREWARM_ENABLED: liga o ranking e o agendador (padrão: false)
+- PREWARM_TOP_N: entradas mais populares renovadas por namespace
+  (padrão: 20)
+- PREWARM_INTERVAL_SECONDS: intervalo entre rodadas (padrão: 30)
+- PREWARM_LEAD_SECONDS: renova entradas com TTL abaixo disso
+  (padrão: 120)
+- PREWARM_RATE_PER_MINUTE: renovações por minuto, no total (padrão: 30)
+- PREWARM_WEATHER_BUDGET_PER_HOUR: chamadas ao OpenWeather por hora
+  (padrão: 120)
+- PREWARM_LLM_BUDGET_PER_HOUR: execuções do agente por hora (padrão: 60)
+- POPULARITY_HALF_LIFE_SECONDS: meia-vida da popularidade (padrão: 3600)
+"""
+import os
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from backend.utils.cache import cache
+from backend.utils.logger import setup_logger
+from mcp_server.tools.weather import (
+    WEATHER_CACHE_TTL, fetch_weather, weather_cache_key
+)
+
+logger = setup_logger(__name__)
+
+PREWARM_NAMESPACES = ("weather", "llm_query")
+
+# Verdadeiro enquanto o agendador recalcula uma resposta: o trabalho não
+# é de um usuário, então não conta acesso, uso de tools, tokens nem
+# prefetch
+refreshing: ContextVar[bool] = ContextVar("prewarm_refreshing", default=False)
+
+
+def prewarm_enabled() -> bool:
+    return os.getenv("PREWARM_ENABLED", "false").lower() in (
+        "true", "1", "yes"
+    )
+
+
+def record_access(namespace: str, member: str) -> None:
+    """Conta um acesso no ranking de popularidade do namespace."""
+    if prewarm_enabled() and not refreshing.get():
+        cache.track_popularity(namespace, member)
+
+
+class PrewarmScheduler:
+    """
+    Renova periodicamente as entradas mais populares do cache.
+
+    Args:
+        get_agent: Corrotina que devolve o AIAssistant (renovação de
+            llm_query); só é chamada quando há query a renovar
+    """
+
+    def __init__(
+        self,
+        get_agent: Callable[[], Awaitable[Any]],
+        top_n: Optional[int] = None,
+        interval: Optional[float] = None,
+        lead_seconds: Optional[int] = None,
+        rate_per_minute: Optional[int] = None,
+        budgets: Optional[Dict[str, int]] = None,
+    ):
+        self.get_agent = get_agent
+        self.top_n = top_n or int(os.getenv("PREWARM_TOP_N", 20))
+        self.interval = interval or float(
+            os.getenv("PREWARM_INTERVAL_SECONDS", 30)
+        )
+        self.lead_seconds = lead_seconds or int(
+            os.getenv("PREWARM_LEAD_SECONDS", 120)
+        )
+        self.rate_per_minute = rate_per_minute or int(
+            os.getenv("PREWARM_RATE_PER_MINUTE", 30)
+        )
+        self.budgets = budgets or {
+            "weather": int(os.getenv("PREWARM_WEATHER_BUDGET_PER_HOUR", 120)),
+            "llm_query": int(os.getenv("PREWARM_LLM_BUDGET_PER_HOUR", 60)),
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Pré-aquecimento do cache: top {self.top_n} a cada "
+                f"{self.interval:g}s"
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Erro no pré-aquecimento: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def tick(self) -> Dict[str, int]:
+        """
+        Uma rodada: renova as entradas populares perto de expirar.
+
+        Returns:
+            Renovações bem-sucedidas por namespace
+        """
+        refreshed = {namespace: 0 for namespace in PREWARM_NAMESPACES}
+        for namespace in PREWARM_NAMESPACES:
+            for member, _ in cache.top_popular(namespace, self.top_n):
+                key = await self._cache_key(namespace, member)
+                if key is None:
+                    continue
+
+                ttl = cache.get_ttl(key)
+                if ttl is not None and (ttl < 0 or ttl > self.lead_seconds):
+                    continue
+                # Outro processo já está renovando esta entrada
+                lock = f"prewarm:{key}"
+                if not cache.try_lock(lock, self.lead_seconds):
+                    continue
+
+                # Sem cota, solta o lock para a entrada ser renovada
+                # na próxima rodada (ou por outro processo)
+                if not cache.acquire_quota(
+                    "prewarm_rate", self.rate_per_minute, 60
+                ):
+                    cache.delete(f"lock:{lock}")
+                    cache.increment_metric("prewarm_rate_limited")
+                    return refreshed
+                if not cache.acquire_quota(
+                    f"prewarm_budget:{namespace}",
+                    self.budgets[namespace], 3600
+                ):
+                    cache.delete(f"lock:{lock}")
+                    cache.increment_metric(
+                        f"prewarm_budget_exhausted:{namespace}"
+                    )
+                    break
+
+                if await self._refresh(namespace, member, key):
+                    refreshed[namespace] += 1
+                    cache.increment_metric(f"prewarm_refresh:{namespace}")
+                else:
+                    cache.increment_metric(f"prewarm_failed:{namespace}")
+
+        if any(refreshed.values()):
+            logger.info(f"Cache pré-aquecido: {refreshed}")
+        return refreshed
+
+    async def _cache_key(self, namespace: str, member: str) -> Optional[str]:
+        if namespace == "weather":
+            city, _, country_code = member.rpartition(",")
+            return weather_cache_key(city, country_code)
+        agent = await self.get_agent()
+        return agent.response_cache_key(member)
+
+    async def _refresh(self, namespace: str, member: str, key: str) -> bool:
+        if namespace == "weather":
+            city, _, country_code = member.rpartition(",")
+            result = await asyncio.to_thread(
+                fetch_weather, city, country_code
+            )
+            if "error" in result:
+                logger.warning(
+                    f"Falha ao renovar clima de {member}: {result['error']}"
+                )
+                return False
+            return cache.set_prewarmed(key, result, ttl=WEATHER_CACHE_TTL)
+
+        agent = await self.get_agent()
+        try:
+            result = await agent.refresh_answer(member)
+        except Exception as e:
+            logger.warning(f"Falha ao renovar resposta: {e}")
+            return False
+        return bool(result.get("success"))
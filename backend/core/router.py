@@ -0,0 +1,175 @@
+"""
+Roteamento de queries entre um modelo rápido e um modelo forte.
+
+A classificação é local e barata (sem chamada ao LLM): saudações,
+agradecimentos e perguntas curtas de clima/cálculo vão para o modelo
+rápido; perguntas longas, com várias partes ou que pedem explicação,
+comparação ou análise vão para o modelo forte. Se a resposta do modelo
+rápido não passar na validação (vazia, evasiva ou com erro de tool), a
+query é reenviada ao modelo forte.
+
+Configuração:
+- MODEL_ROUTING_ENABLED: liga o roteamento (padrão: false, usa só
+  OPENAI_MODEL)
+- OPENAI_FAST_MODEL: modelo rápido (padrão: gpt-4o-mini)
+- OPENAI_STRONG_MODEL: modelo forte (padrão: OPENAI_MODEL)
+- ROUTER_FAST_MAX_WORDS: queries acima desse tamanho vão para o modelo
+  forte (padrão: 30)
+"""
+import os
+import re
+import unicodedata
+from typing import Any, Callable, Dict, Optional
+
+from backend.utils.cache import cache
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+FAST = "fast"
+STRONG = "strong"
+ROUTES = (FAST, STRONG)
+
+# Preço em USD por 1M de tokens (prompt, completion)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+DEFAULT_PRICE = MODEL_PRICES["gpt-4o-mini"]
+
+_CHITCHAT = re.compile(
+    r"^(oi+|ola+|opa|e ai|hey|hi|hello|bom dia|boa tarde|boa noite|"
+    r"tudo bem|tudo bom|como vai|obrigad[oa]|valeu|vlw|ok|beleza|"
+    r"tchau|ate mais|thanks|thank you)\b[\s!?.,]*"
+    r"(tudo bem|tudo bom|como vai)?[\s!?.,]*$"
+)
+
+_STRONG_KEYWORDS = (
+    "explique", "explica", "por que", "porque", "compare", "comparar",
+    "diferenca entre", "analise", "analisar", "avalie", "passo a passo",
+    "detalhadamente", "demonstre", "prove", "justifique", "vantagens",
+    "desvantagens", "pros e contras", "estrategia", "planeje", "resuma",
+    "codigo", "implemente", "algoritmo", "why", "explain", "analyze",
+    "step by step",
+)
+
+_REFUSALS = (
+    "nao sei", "nao tenho certeza", "nao consigo", "nao posso ajudar",
+    "nao tenho informacoes", "nao foi possivel", "desculpe, mas",
+    "i don't know", "i'm not sure", "i cannot", "i can't",
+)
+
+
+def _fold(text: str) -> str:
+    """Minúsculas e sem acentos, para comparar com as listas acima."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def classify_query(query: str, max_fast_words: int = 30) -> str:
+    """
+    Decide a rota ("fast" ou "strong") de uma query por heurísticas.
+    """
+    text = _fold(query).strip()
+    if _CHITCHAT.match(text):
+        return FAST
+    if any(keyword in text for keyword in _STRONG_KEYWORDS):
+        return STRONG
+    if len(text.split()) > max_fast_words:
+        return STRONG
+    if text.count("?") > 1:
+        return STRONG
+    return FAST
+
+
+def validate_answer(answer: Any) -> bool:
+    """
+    Verifica se a resposta do modelo rápido é aceitável: não vazia,
+    sem recusa/incerteza e sem erro de execução de tool.
+    """
+    if not isinstance(answer, str) or not answer.strip():
+        return False
+    text = _fold(answer)
+    if text.startswith("erro") or "erro ao executar tool" in text:
+        return False
+    return not any(marker in text for marker in _REFUSALS)
+
+
+def estimate_cost(usage: Dict[str, Any], model: str) -> float:
+    """Custo estimado em USD de uma chamada, pelo uso de tokens."""
+    prompt_price, completion_price = MODEL_PRICES.get(model, DEFAULT_PRICE)
+    return (
+        usage.get("prompt_tokens", 0) * prompt_price
+        + usage.get("completion_tokens", 0) * completion_price
+    ) / 1_000_000
+
+
+def _default_llm_factory(model: str, temperature: float):
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model=model, temperature=temperature)
+
+
+class ModelRouter:
+    """
+    Mantém um agente por rota e registra latência e custo de cada uma.
+
+    `llm_factory(model, temperature)` cria o chat model de cada rota;
+    nos testes pode devolver um fake chat model do LangChain.
+    """
+
+    def __init__(
+        self,
+        fast_model: Optional[str] = None,
+        strong_model: Optional[str] = None,
+        temperature: float = 0.0,
+        max_fast_words: Optional[int] = None,
+        llm_factory: Optional[Callable[[str, float], Any]] = None,
+    ):
+        self.models = {
+            FAST: fast_model or os.getenv("OPENAI_FAST_MODEL", "gpt-4o-mini"),
+            STRONG: strong_model or os.getenv(
+                "OPENAI_STRONG_MODEL",
+                os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+            ),
+        }
+        self.temperature = temperature
+        self.max_fast_words = (
+            max_fast_words if max_fast_words is not None
+            else int(os.getenv("ROUTER_FAST_MAX_WORDS", 30))
+        )
+        self.llm_factory = llm_factory or _default_llm_factory
+        self.llms: Dict[str, Any] = {}
+        self.agents: Dict[str, Any] = {}
+
+    def build(self, tools) -> None:
+        """Cria o LLM e o agente ReAct de cada rota."""
+        from langgraph.prebuilt import create_react_agent
+
+        for route, model in self.models.items():
+            self.llms[route] = self.llm_factory(model, self.temperature)
+            self.agents[route] = create_react_agent(self.llms[route], tools)
+        logger.info(
+            f"Roteamento de modelos: fast={self.models[FAST]} "
+            f"strong={self.models[STRONG]}"
+        )
+
+    def classify(self, query: str) -> str:
+        return classify_query(query, self.max_fast_words)
+
+    def record(
+        self, route: str, latency_ms: float, usage: Dict[str, Any]
+    ) -> None:
+        """Acumula requisições, latência e custo (em micro-USD) da rota."""
+        cost = estimate_cost(usage, self.models[route])
+        cache.increment_metrics({
+            f"route_requests:{route}": 1,
+            f"route_latency_ms:{route}": int(round(latency_ms)),
+            f"route_cost_micro_usd:{route}": int(round(cost * 1_000_000)),
+        })
+
+    def record_escalation(self) -> None:
+        cache.increment_metric("route_escalations")
@@ -0,0 +1,128 @@
+"""
+Contabilização de tokens por requisição (prompt x completion).
+"""
+import json
+from functools import lru_cache
+from typing import Dict, Any, List
+
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Média aproximada de caracteres por token quando não há tokenizer local
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """
+    Carrega o tokenizer do tiktoken para o modelo.
+    Retorna None se o tiktoken ou o arquivo de encoding não estiverem
+    disponíveis (ex: ambiente sem internet).
+    """
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Tokenizer local indisponível, usando estimativa: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Conta tokens de um texto com tiktoken ou estimativa por caracteres."""
+    if not text:
+        return 0
+
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def _message_text(msg) -> str:
+    """Texto enviado/recebido em uma mensagem, incluindo tool calls."""
+    if isinstance(msg, tuple):
+        return str(msg[1])
+
+    content = getattr(msg, "content", "")
+    text = content if isinstance(content, str) else json.dumps(
+        content, ensure_ascii=False, default=str
+    )
+    tool_calls = getattr(msg, "tool_calls", None)
+    if tool_calls:
+        text += json.dumps(tool_calls, ensure_ascii=False, default=str)
+    return text
+
+
+def _is_ai_message(msg) -> bool:
+    return getattr(msg, "type", None) == "ai"
+
+
+def extract_usage(
+    messages: List[Any],
+    model: str = "gpt-4o-mini",
+    tools_text: str = "",
+    start: int = 0,
+) -> Dict[str, Any]:
+    """
+    Soma o uso de tokens de todas as chamadas ao LLM de um run ReAct.
+
+    Usa `usage_metadata` das respostas do modelo. Para chamadas sem
+    metadata, estima localmente: o prompt é tudo que veio antes da
+    resposta (mais os schemas das tools) e o completion é a resposta.
+
+    Args:
+        messages: Mensagens retornadas pelo agente (entrada + respostas)
+        model: Nome do modelo (para o tokenizer)
+        tools_text: Descrição das tools enviada em toda chamada
+        start: Índice da primeira mensagem gerada no run (as anteriores
+            são entrada, ex: histórico da sessão)
+
+    Returns:
+        Dict com prompt_tokens, completion_tokens, total_tokens,
+        llm_calls e estimated (True se algum valor foi estimado)
+    """
+    history = list(messages)
+    usage = {
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "llm_calls": 0,
+        "estimated": False,
+    }
+
+    tools_tokens = None
+    for index, msg in enumerate(history):
+        if index < start or not _is_ai_message(msg):
+            continue
+
+        usage["llm_calls"] += 1
+        metadata = getattr(msg, "usage_metadata", None)
+
+        if metadata:
+            prompt = metadata.get("input_tokens", 0)
+            completion = metadata.get("output_tokens", 0)
+        else:
+            if tools_tokens is None:
+                tools_tokens = count_tokens(tools_text, model)
+            prompt = tools_tokens + sum(
+                count_tokens(_message_text(previous), model)
+                for previous in history[:index]
+            )
+            completion = count_tokens(_message_text(msg), model)
+            usage["estimated"] = True
+
+        usage["prompt_tokens"] += prompt
+        usage["completion_tokens"] += completion
+
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    return usage
+
+
+def tool_path(tools_used: List[str]) -> str:
+    """Rótulo do caminho de execução (ex: "calculator", "direct")."""
+    return "+".join(sorted(set(tools_used))) or "direct"
@@ -0,0 +1,202 @@
+"""
+Memoização de resultados de tools MCP no lado do agente.
+
+Um acerto evita a ida ao MCP Server. Há duas camadas: um LRU em memória
+(repetições dentro do mesmo run ReAct) e o Redis (repetições entre
+usuários). A chave é o nome da tool mais os argumentos normalizados.
+
+Chamadas concorrentes com a mesma chave são agrupadas (single-flight):
+só a primeira vai ao MCP Server e as demais aguardam o mesmo resultado.
+Isso permite que o prefetch especulativo (backend/core/prefetch.py) e a
+chamada do agente compartilhem uma única ida ao servidor.
+"""
+import os
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from backend.utils.cache import (
+    cache, is_error_result, is_transient_result
+)
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# pure: mesma entrada gera sempre a mesma saída (inclusive erros), então
+# o resultado nunca expira (ttl=None) e erros também são memoizados.
+TOOL_CACHE_POLICIES: Dict[str, Dict[str, Any]] = {
+    "calculator": {"pure": True, "ttl": None},
+    "get_weather": {
+        "pure": False,
+        "ttl": int(os.getenv("WEATHER_CACHE_TTL_SECONDS", 1800)),
+    },
+}
+
+
+def normalize_arguments(tool_name: str, arguments: Dict[str, Any]) -> str:
+    """
+    Serializa os argumentos de forma canônica para compor a chave.
+
+    "2 + 2" e "2+2" ou "são paulo" e "São Paulo " resultam na mesma chave.
+    """
+    if tool_name == "calculator":
+        expression = str(arguments.get("expression", ""))
+        return "".join(expression.split())
+
+    if tool_name == "get_weather":
+        city = " ".join(str(arguments.get("city", "")).split()).casefold()
+        country = str(arguments.get("country_code", "BR")).strip().upper()
+        return f"{city},{country}"
+
+    return json.dumps(arguments, sort_keys=True, ensure_ascii=False)
+
+
+class ToolResultCache:
+    """Cache de resultados de tools com política por tool."""
+
+    def __init__(self, policies: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.policies = TOOL_CACHE_POLICIES if policies is None else policies
+        self.max_entries = int(os.getenv("TOOL_MEMO_MAX_ENTRIES", 1024))
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def make_key(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        return cache.make_namespaced_key(
+            f"tool:{tool_name}", normalize_arguments(tool_name, arguments)
+        )
+
+    def _get_local(self, key: str) -> Optional[Any]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._local[key]
+            return None
+
+        self._local.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: Any, ttl: Optional[int]):
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        self._local[key] = (value, expires_at)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def get(self, tool_name: str, arguments: Dict[str, Any]) -> Optional[Any]:
+        """Busca resultado memoizado (memória local e depois Redis)."""
+        if tool_name not in self.policies:
+            return None
+
+        key = self.make_key(tool_name, arguments)
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        value = cache.get(key)
+        if value is not None:
+            policy = self.policies[tool_name]
+            self._set_local(key, value, policy["ttl"])
+        return value
+
+    def set(self, tool_name: str, arguments: Dict[str, Any], value: Any):
+        """
+        Memoiza o resultado conforme a política da tool.
+        Erros só são guardados para tools puras (determinísticos);
+        timeouts e prazos esgotados (`transient`) nunca.
+        """
+        policy = self.policies.get(tool_name)
+        if policy is None or value is None or is_transient_result(value):
+            return
+        if is_error_result(value) and not policy["pure"]:
+            return
+
+        key = self.make_key(tool_name, arguments)
+        self._set_local(key, value, policy["ttl"])
+        cache.set(key, value, ttl=policy["ttl"])
+
+    async def call(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        fetch: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+    ) -> Any:
+        """
+        Retorna o resultado memoizado ou executa `fetch` (chamada MCP)
+        e memoiza o resultado.
+        """
+        cached = self.get(tool_name, arguments)
+        if cached is not None:
+            logger.debug(f"Tool cache HIT: {tool_name}")
+            cache.increment_metric(f"cache_hit_tool:{tool_name}")
+            return cached
+
+        if tool_name not in self.policies:
+            return await fetch(tool_name, arguments)
+
+        key = self.make_key(tool_name, arguments)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                result = await asyncio.shield(pending)
+                cache.increment_metric(f"cache_coalesced_tool:{tool_name}")
+                return result
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # A chamada original foi cancelada: busca por conta própria
+
+        cache.increment_metric(f"cache_miss_tool:{tool_name}")
+        return await self._fetch(key, tool_name, arguments, fetch)
+
+    async def prefetch(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        fetch: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+    ) -> bool:
+        """
+        Aquece o cache sem contar hit/miss. Retorna True se disparou
+        uma chamada ao MCP Server (resultado ausente e nada em voo).
+        """
+        if tool_name not in self.policies:
+            return False
+
+        key = self.make_key(tool_name, arguments)
+        if key in self._inflight or self.get(tool_name, arguments) is not None:
+            return False
+
+        await self._fetch(key, tool_name, arguments, fetch)
+        return True
+
+    async def _fetch(
+        self,
+        key: str,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        fetch: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+    ) -> Any:
+        """Executa `fetch` publicando o resultado para chamadas em voo."""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fetch(tool_name, arguments)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Marca a exceção como consumida se ninguém estiver aguardando
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        self.set(tool_name, arguments, result)
+        future.set_result(result)
+        return result
@@ -1,8 +1,15 @@
 import os
+import time
+import uuid
 import logging
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from backend.api.routes import router
+from backend.api import debug
+from backend.api.capture import CaptureMiddleware
+from backend.api.routes import get_agent, router
+from backend.core.prewarm import PrewarmScheduler, prewarm_enabled
+from backend.utils.logger import request_id_var, setup_logger
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,10 +23,24 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logger.info(f"Starting AI Assistant API (DEBUG={'ON' if DEBUG else 'OFF'})")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicia o pré-aquecimento do cache (PREWARM_ENABLED)."""
+    scheduler = None
+    if prewarm_enabled():
+        scheduler = PrewarmScheduler(get_agent)
+        scheduler.start()
+    yield
+    if scheduler:
+        await scheduler.stop()
+
+
 app = FastAPI(
     title="AI Assistant API",
     description="Assistente de IA com suporte a calculadora e previsão do clima via MCP",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -30,7 +51,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if os.getenv("CAPTURE_ENABLED", "false").lower() == "true":
+    app.add_middleware(CaptureMiddleware)
+    logger.info("Captura de tráfego habilitada")
+
 app.include_router(router)
+app.include_router(debug.router)
+
+request_logger = setup_logger("backend.requests")
+
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """
+    Propaga o request_id (header X-Request-ID ou gerado) para os logs e
+    registra a duração de cada requisição.
+    """
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        request_logger.info(
+            f"{request.method} {request.url.path} {status_code}",
+            extra={
+                "path": request.url.path,
+                "status_code": status_code,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            }
+        )
+        request_id_var.reset(token)
 
 
 @app.get("/")
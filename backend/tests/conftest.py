@@ -1,4 +1,5 @@
 import os
+import time
 import pytest
 import tempfile
 import shutil
@@ -38,12 +39,195 @@ def clean_metrics():
 from unittest.mock import AsyncMock, patch
 
 
+class FakeRedis:
+    """
+    Redis em memória com o subconjunto de comandos usado pelo RedisCache.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+
+    def _alive(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        return self.data.get(key) if self._alive(key) else None
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and self._alive(key):
+            return None
+        self.data[key] = str(value)
+        self.expires.pop(key, None)
+        if ex:
+            self.expires[key] = time.time() + ex
+        return True
+
+    def getdel(self, key):
+        value = self.get(key)
+        self.data.pop(key, None)
+        self.expires.pop(key, None)
+        return value
+
+    def setex(self, key, ttl, value):
+        return self.set(key, value, ex=ttl)
+
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                removed += 1
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return removed
+
+    def incrby(self, key, amount=1):
+        value = int(self.get(key) or 0) + amount
+        self.data[key] = str(value)
+        return value
+
+    def incr(self, key, amount=1):
+        return self.incrby(key, amount)
+
+    def expire(self, key, ttl):
+        if not self._alive(key):
+            return False
+        self.expires[key] = time.time() + ttl
+        return True
+
+    def ttl(self, key):
+        if not self._alive(key):
+            return -2
+        if key not in self.expires:
+            return -1
+        return int(self.expires[key] - time.time())
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def sadd(self, key, *members):
+        current = self.data.setdefault(key, set())
+        before = len(current)
+        current.update(members)
+        return len(current) - before
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def zincrby(self, key, amount, member):
+        zset = self.data.setdefault(key, {})
+        zset[member] = zset.get(member, 0.0) + amount
+        return zset[member]
+
+    def _ranked(self, key):
+        zset = self.data.get(key, {}) if self._alive(key) else {}
+        return sorted(zset.items(), key=lambda item: (item[1], item[0]))
+
+    def zrevrange(self, key, start, end, withscores=False):
+        ranked = self._ranked(key)[::-1]
+        end = len(ranked) if end == -1 else end + 1
+        items = ranked[start:end]
+        return items if withscores else [member for member, _ in items]
+
+    def zremrangebyrank(self, key, start, end):
+        ranked = self._ranked(key)
+        start += len(ranked) if start < 0 else 0
+        end += len(ranked) if end < 0 else 0
+        removed = ranked[max(start, 0):end + 1] if end >= start else []
+        for member, _ in removed:
+            del self.data[key][member]
+        return len(removed)
+
+    def zunionstore(self, dest, keys):
+        result = {}
+        for key, weight in keys.items():
+            for member, score in self._ranked(key):
+                result[member] = result.get(member, 0.0) + score * weight
+        self.data[dest] = result
+        self.expires.pop(dest, None)
+        return len(result)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def scan_iter(self, match=None, count=None):
+        return [key for key in list(self.data) if self._alive(key)]
+
+    def pttl(self, key):
+        ttl = self.ttl(key)
+        return ttl * 1000 if ttl > 0 else ttl
+
+    def dump(self, key):
+        if not self._alive(key):
+            return None
+        return ("dump", self.data[key])
+
+    def restore(self, key, ttl, value, replace=False):
+        import redis
+
+        if self._alive(key) and not replace:
+            raise redis.ResponseError("BUSYKEY Target key name already exists.")
+        self.data[key] = value[1]
+        self.expires.pop(key, None)
+        if ttl:
+            self.expires[key] = time.time() + ttl / 1000
+        return True
+
+    def close(self):
+        pass
+
+
+class FakePipeline:
+    """Pipeline que enfileira comandos e executa em ordem."""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((method, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        results = [
+            method(*args, **kwargs) for method, args, kwargs in self.commands
+        ]
+        self.commands = []
+        return results
+
+
+@pytest.fixture
+def fake_cache(monkeypatch):
+    """
+    Habilita o cache global sobre um FakeRedis.
+    """
+    from backend.utils.cache import cache
+
+    fake = FakeRedis()
+    monkeypatch.setattr(cache, "_client", fake)
+    monkeypatch.setattr(cache, "enabled", True)
+    monkeypatch.setattr(cache, "_generations", {})
+    yield cache
+
+
 @pytest.fixture
 def mock_agent():
     """
     Mock do AIAssistant para testes unitários
     """
-    async def mock_process_query(query: str):
+    async def mock_process_query(query: str, session_id=None):
         return {
             "success": True,
             "query": query,
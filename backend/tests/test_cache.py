@@ -0,0 +1,307 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from backend.core.agent import AIAssistant
+
+
+class TestNamespacedKeys:
+    def test_params_change_key(self, fake_cache):
+        key_a = fake_cache.make_namespaced_key(
+            "llm_query", "oi", model="gpt-4o-mini", temperature=0
+        )
+        key_b = fake_cache.make_namespaced_key(
+            "llm_query", "oi", model="gpt-4o", temperature=0
+        )
+        assert key_a != key_b
+        assert key_a.startswith("llm_query:")
+
+    def test_same_params_same_key(self, fake_cache):
+        key_a = fake_cache.make_namespaced_key("weather", "Recife,BR")
+        key_b = fake_cache.make_namespaced_key("weather", "Recife,BR")
+        assert key_a == key_b
+
+    def test_invalidate_namespace(self, fake_cache):
+        key = fake_cache.make_namespaced_key("llm_query", "oi")
+        fake_cache.set(key, {"response": "olá"})
+
+        generation = fake_cache.invalidate_namespace("llm_query")
+
+        new_key = fake_cache.make_namespaced_key("llm_query", "oi")
+        assert generation == 1
+        assert new_key != key
+        assert fake_cache.get(new_key) is None
+
+    def test_invalidate_keeps_other_namespaces(self, fake_cache):
+        key = fake_cache.make_namespaced_key("weather", "Recife,BR")
+        fake_cache.invalidate_namespace("llm_query")
+        assert fake_cache.make_namespaced_key("weather", "Recife,BR") == key
+
+    def test_disabled_cache(self):
+        from backend.utils.cache import cache
+        assert cache.invalidate_namespace("llm_query") == 0
+        assert cache.get_generation("llm_query") == 0
+
+    def test_invalidate_endpoint_requires_token(
+        self, fake_cache, monkeypatch
+    ):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from backend.api.routes import router
+
+        app = FastAPI()
+        app.include_router(router)
+        client = TestClient(app)
+        url = "/v1/cache/llm_query/invalidate"
+
+        monkeypatch.delenv("DEBUG_ENDPOINTS_TOKEN", raising=False)
+        assert client.post(url).status_code == 404
+        monkeypatch.setenv("DEBUG_ENDPOINTS_TOKEN", "segredo")
+        assert client.post(
+            url, headers={"X-Debug-Token": "errado"}
+        ).status_code == 403
+        assert fake_cache.get_generation("llm_query") == 0
+
+        response = client.post(url, headers={"X-Debug-Token": "segredo"})
+        assert response.json() == {"namespace": "llm_query", "generation": 1}
+
+
+class TestAgentCache:
+    @pytest.fixture
+    def assistant(self):
+        assistant = AIAssistant()
+        message = type("Msg", (), {"content": "Olá!", "tool_calls": []})()
+        assistant.agent = AsyncMock()
+        assistant.agent.ainvoke = AsyncMock(
+            return_value={"messages": [message]}
+        )
+        return assistant
+
+    async def test_hit_skips_agent(self, fake_cache, assistant):
+        await assistant.process_query("oi")
+        await assistant.process_query("oi")
+        assert assistant.agent.ainvoke.await_count == 1
+
+    async def test_model_change_misses(self, fake_cache, assistant):
+        await assistant.process_query("oi")
+        assistant.openai_model_name = "gpt-4o"
+        await assistant.process_query("oi")
+        assert assistant.agent.ainvoke.await_count == 2
+
+    async def test_nonzero_temperature_not_cached(
+        self, fake_cache, assistant
+    ):
+        assistant.openai_model_temperature = 0.7
+        await assistant.process_query("oi")
+        await assistant.process_query("oi")
+        assert assistant.agent.ainvoke.await_count == 2
+
+    async def test_nonzero_temperature_opt_in(self, fake_cache, assistant):
+        assistant.openai_model_temperature = 0.7
+        assistant.cache_nonzero_temperature = True
+        await assistant.process_query("oi")
+        await assistant.process_query("oi")
+        assert assistant.agent.ainvoke.await_count == 1
+
+
+class TestWindowedMetrics:
+    NOW = 1_800_000_000.0
+
+    def _increment_at(self, monkeypatch, cache, ts, name, amount=1):
+        monkeypatch.setattr("backend.utils.cache.time.time", lambda: ts)
+        cache.increment_metric(name, amount)
+
+    def test_windows_sum_recent_buckets(self, fake_cache, monkeypatch):
+        for ago in (5, 120, 1000, 5000):
+            self._increment_at(
+                monkeypatch, fake_cache, self.NOW - ago, "queries"
+            )
+
+        counts = fake_cache.get_windowed_metrics(
+            ["queries"], now=self.NOW
+        )["queries"]
+        assert counts == {"1m": 1, "5m": 2, "1h": 3}
+        assert fake_cache.get_metric("queries") == 4
+
+    def test_increment_metrics_updates_windows(self, fake_cache):
+        fake_cache.increment_metrics({"tokens_prompt:direct": 40})
+        counts = fake_cache.get_windowed_metrics(["tokens_prompt:direct"])
+        assert counts["tokens_prompt:direct"]["1m"] == 40
+
+    def test_buckets_expire(self, fake_cache):
+        fake_cache.increment_metric("queries")
+        bucket_keys = [
+            key for key in fake_cache.client.data
+            if key.startswith("metric_ts:queries:")
+        ]
+        assert len(bucket_keys) == 2
+        assert all(fake_cache.client.ttl(key) > 0 for key in bucket_keys)
+
+    def test_single_mget(self, fake_cache):
+        calls = []
+        mget = fake_cache.client.mget
+        fake_cache.client.mget = lambda keys: calls.append(keys) or mget(keys)
+
+        fake_cache.get_windowed_metrics(["queries", "cache_hit_llm"])
+        assert len(calls) == 1
+        # 1m: 6 x 10s, 5m: 30 x 10s, 1h: 60 x 60s
+        assert len(calls[0]) == 2 * (6 + 30 + 60)
+
+    def test_disabled_cache_returns_zeros(self):
+        from backend.utils.cache import cache
+        counts = cache.get_windowed_metrics(["queries"], windows=["1m"])
+        assert counts == {"queries": {"1m": 0}}
+
+    def test_metrics_endpoint_reports_windows(self, fake_cache):
+        from fastapi.testclient import TestClient
+        from backend.main import app
+
+        for _ in range(3):
+            fake_cache.increment_metric("queries")
+        fake_cache.increment_metric("cache_hit_llm")
+        fake_cache.increment_metric("cache_miss_llm")
+
+        data = TestClient(app).get("/v1/metrics").json()
+        window = data["windows"]["1m"]
+        assert window["queries"] == 3
+        assert window["qps"] == 0.05
+        assert window["cache_hit_ratio_llm"] == 0.5
+
+
+class TestCachedDecorator:
+    def test_sync_hit_skips_call(self, fake_cache):
+        calls = []
+
+        @fake_cache.cached("square", ttl=60)
+        def square(x):
+            calls.append(x)
+            return {"result": x * x}
+
+        assert square(3) == square(3) == {"result": 9}
+        assert calls == [3]
+        assert fake_cache.get_metric("cache_hit_square") == 1
+        assert fake_cache.get_metric("cache_miss_square") == 1
+
+    async def test_async_with_custom_key(self, fake_cache):
+        calls = []
+
+        @fake_cache.cached(
+            "greet", key=lambda name: fake_cache.make_namespaced_key(
+                "greet", name.casefold()
+            ),
+            metric="greeting",
+        )
+        async def greet(name):
+            calls.append(name)
+            return {"text": f"Olá, {name}"}
+
+        await greet("Ana")
+        assert await greet("ANA") == {"text": "Olá, Ana"}
+        assert calls == ["Ana"]
+        assert fake_cache.get_metric("cache_hit_greeting") == 1
+
+    def test_none_key_bypasses_cache(self, fake_cache):
+        calls = []
+
+        @fake_cache.cached("noop", key=lambda x: None)
+        def noop(x):
+            calls.append(x)
+            return {"result": x}
+
+        noop(1)
+        noop(1)
+        assert len(calls) == 2
+        assert fake_cache.get_metric("cache_miss_noop") == 0
+
+    def test_negative_caching(self, fake_cache):
+        calls = []
+
+        @fake_cache.cached(
+            "lookup", ttl=600, error_ttl=30,
+            negative=lambda result: result.get("status") == 404,
+        )
+        def lookup(name):
+            calls.append(name)
+            if name == "instavel":
+                return {"error": "Erro HTTP 500"}
+            return {"error": "não encontrada", "status": 404}
+
+        lookup("inexistente")
+        lookup("inexistente")
+        lookup("instavel")
+        lookup("instavel")
+
+        assert calls == ["inexistente", "instavel", "instavel"]
+        assert fake_cache.get_metric("cache_negative_hit_lookup") == 1
+        key = lookup.cache_key("inexistente")
+        assert 0 < fake_cache.client.ttl(key) <= 30
+
+    async def test_negative_exceptions(self, fake_cache):
+        from backend.utils.cache import CachedError
+
+        calls = []
+
+        @fake_cache.cached(
+            "fails", error_ttl=30, negative_exceptions=(ValueError,)
+        )
+        async def fails(x):
+            calls.append(x)
+            raise ValueError("entrada inválida")
+
+        with pytest.raises(ValueError):
+            await fails(1)
+        with pytest.raises(CachedError, match="entrada inválida"):
+            await fails(1)
+        assert calls == [1]
+
+    def test_refresh_marks_prewarmed(self, fake_cache):
+        from backend.utils.cache import PREWARMED_FIELD
+
+        @fake_cache.cached("value", ttl=60)
+        def value(x):
+            return {"result": x}
+
+        assert value.refresh(1) == {"result": 1}
+        for _ in range(3):
+            assert value(1) == {"result": 1}
+        assert PREWARMED_FIELD not in value(1)
+        # Só o primeiro hit após a renovação teria sido miss sem ela
+        assert fake_cache.get_metric("cache_hit_value") == 4
+        assert fake_cache.get_metric("prewarm_hit:value") == 1
+
+        value.refresh(1)
+        value(1)
+        assert fake_cache.get_metric("prewarm_hit:value") == 2
+
+    def test_disabled_cache_calls_function(self):
+        from backend.utils.cache import cache
+
+        calls = []
+
+        @cache.cached("off")
+        def off(x):
+            calls.append(x)
+            return x
+
+        off(1)
+        off(1)
+        assert calls == [1, 1]
+
+
+class TestWeatherNegativeCache:
+    def test_unknown_city_is_not_refetched(self, fake_cache, monkeypatch):
+        from unittest.mock import Mock, patch
+        import httpx
+        from mcp_server.server import get_weather
+
+        monkeypatch.setenv("OPENWEATHER_API_KEY", "chave")
+        response = Mock(status_code=404)
+        response.raise_for_status.side_effect = httpx.HTTPStatusError(
+            "404", request=Mock(), response=response
+        )
+        with patch("httpx.get", return_value=response) as http_get:
+            first = get_weather("Recfie")
+            second = get_weather("Recfie")
+
+        assert first == second
+        assert "não encontrada" in first["error"]
+        assert http_get.call_count == 1
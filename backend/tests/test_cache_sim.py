@@ -0,0 +1,114 @@
+from benchmarks.cache_sim import (
+    CacheModel, build_simulations, parse_size, simulate
+)
+
+
+def records(queries, interval=1.0, **fields):
+    for i, query in enumerate(queries):
+        yield {"ts": 1000.0 + i * interval, "query": query, **fields}
+
+
+def run(queries, ttls=(None,), capacities=(None,), policies=("lru",),
+        normalizations=("none",), weather_ttls=(1800,), **kwargs):
+    simulations = build_simulations(
+        list(ttls), list(weather_ttls), list(capacities), list(policies),
+        list(normalizations)
+    )
+    return simulate(queries, simulations, **kwargs)
+
+
+class TestCacheModel:
+    def test_lru_evicts_least_recent(self):
+        cache = CacheModel(capacity=300, policy="lru")
+        cache.set(1, 100, None, 0)
+        cache.set(2, 100, None, 0)
+        cache.set(3, 100, None, 0)
+        assert cache.get(1, 0)
+        cache.set(4, 100, None, 0)
+
+        assert not cache.get(2, 0)
+        assert cache.get(1, 0)
+        assert cache.evictions == 1
+        assert cache.bytes == 300
+
+    def test_lfu_keeps_frequent(self):
+        cache = CacheModel(capacity=200, policy="lfu")
+        cache.set(1, 100, None, 0)
+        cache.set(2, 100, None, 0)
+        for _ in range(3):
+            cache.get(1, 0)
+        cache.get(2, 0)
+        cache.set(3, 100, None, 0)
+
+        assert cache.get(1, 0)
+        assert not cache.get(2, 0)
+
+    def test_ttl_expires_and_frees_memory(self):
+        cache = CacheModel(capacity=None)
+        cache.set(1, 100, ttl=10, now=0)
+        cache.set(1, 100, ttl=10, now=5)
+        cache.expire(12)
+        assert cache.get(1, 12)
+        cache.expire(15)
+        assert cache.bytes == 0
+        assert not cache.get(1, 15)
+
+    def test_parse_size(self):
+        assert parse_size("64mb") == 64 * 1024 ** 2
+        assert parse_size("none") is None
+        assert parse_size("1024") == 1024
+
+
+class TestSimulate:
+    def test_repeated_queries_hit(self):
+        [report] = run(records(["a", "b", "a", "a"]))
+        assert report["llm"]["hits"] == 2
+        assert report["llm"]["hit_ratio"] == 0.5
+        assert report["llm_calls_saved"] == 2
+
+    def test_ttl_limits_hits(self):
+        short, long = run(
+            records(["a", "a", "a"], interval=100), ttls=(50, 1000)
+        )
+        assert short["llm"]["hits"] == 0
+        assert long["llm"]["hits"] == 2
+
+    def test_normalization_increases_hits(self):
+        exact, folded = run(
+            records(["Clima em Recife", "clima  em recife "]),
+            normalizations=("none", "casefold")
+        )
+        assert exact["llm"]["hits"] == 0
+        assert folded["llm"]["hits"] == 1
+
+    def test_session_context_is_not_shared(self):
+        [report] = run(records(["a", "a"], session_id="s1"))
+        assert report["llm"]["hits"] == 0
+        assert report["llm"]["with_session_context"] == 1
+
+    def test_weather_cache_on_llm_miss(self):
+        queries = records(
+            ["clima em recife?", "e o clima em Recife?"],
+            tools=[["get_weather", "Recife"]]
+        )
+        short, long = run(queries, weather_ttls=(0.5, 1800))
+        assert short["weather"]["api_calls"] == 2
+        assert long["weather"]["api_calls"] == 1
+        assert long["weather"]["hits"] == 1
+
+    def test_cost_and_memory(self):
+        [report] = run(
+            records(["a", "a"]), value_bytes=1000, cost_per_call=0.01
+        )
+        assert report["cost_saved_usd"] == 0.01
+        assert report["memory"]["peak_bytes"] > 1000
+
+    def test_bounded_memory_on_long_streams(self):
+        queries = (
+            {"ts": float(i), "query": f"pergunta {i}"}
+            for i in range(50_000)
+        )
+        [report] = run(queries, capacities=(parse_size("100kb"),))
+        assert report["requests"] == 50_000
+        assert report["memory"]["peak_bytes"] <= 100 * 1024
+        assert report["memory"]["evictions"] > 0
@@ -0,0 +1,206 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from unittest.mock import AsyncMock, patch
+
+from backend.api.capture import (
+    CaptureMiddleware, anonymize, hash_session, read_capture
+)
+from backend.api.routes import router
+from backend.core.agent import AIAssistant
+from backend.core.memory import new_session_id
+from benchmarks.replay import replay
+
+
+class FakeAgent:
+    """Responde qualquer query; repetições vêm "do cache"."""
+
+    def __init__(self):
+        self.seen = set()
+
+    async def process_query(self, query, session_id=None):
+        cached = query in self.seen
+        self.seen.add(query)
+        return {
+            "success": True,
+            "query": query,
+            "response": "ok",
+            "session_id": session_id,
+            "cached": cached,
+        }
+
+
+@pytest.fixture
+def fake_agent():
+    agent = FakeAgent()
+    with patch("backend.api.routes.get_agent", return_value=agent):
+        yield agent
+
+
+@pytest.fixture
+def capture_app(tmp_path):
+    app = FastAPI()
+    app.add_middleware(
+        CaptureMiddleware, path=str(tmp_path / "capture.jsonl"), salt="s"
+    )
+    app.include_router(router)
+    return app
+
+
+class TestAnonymize:
+    def test_masks_personal_data(self):
+        text = anonymize(
+            "meu email é ana@exemplo.com, CPF 123.456.789-09 "
+            "e telefone (11) 91234-5678"
+        )
+        assert "ana@exemplo.com" not in text
+        assert "<email>" in text
+        assert "<cpf>" in text
+        assert "<telefone>" in text
+
+    @pytest.mark.parametrize("text, label", [
+        ("11987654321", "<telefone>"),
+        ("(11) 98765 4321", "<telefone>"),
+        ("+55 11 98765-4321", "<telefone>"),
+        ("12345678901", "<cpf>"),
+        ("123.456.789-09", "<cpf>"),
+        ("4111 1111 1111 1111", "<cartao>"),
+    ])
+    def test_masks_unpunctuated_numbers(self, text, label):
+        assert anonymize(f"meu número é {text}") == f"meu número é {label}"
+
+    def test_keeps_calculations(self):
+        assert anonymize("Quanto é 128 * 46?") == "Quanto é 128 * 46?"
+
+    def test_session_hash_is_stable(self):
+        assert hash_session("abc", "s") == hash_session("abc", "s")
+        assert hash_session("abc", "s") != hash_session("abc", "t")
+        assert hash_session(None, "s") is None
+
+
+class TestCaptureMiddleware:
+    def test_writes_anonymized_record(
+        self, capture_app, fake_agent, tmp_path
+    ):
+        client = TestClient(capture_app)
+        session_id = new_session_id()
+        response = client.post("/v1/query", json={
+            "query": "Clima em Recife? Responda para ana@exemplo.com",
+            "session_id": session_id,
+        })
+        assert response.status_code == 200
+
+        records = list(read_capture(str(tmp_path / "capture.jsonl")))
+        assert len(records) == 1
+        record = records[0]
+        assert record["query"] == "Clima em Recife? Responda para <email>"
+        assert record["session_id"] == hash_session(session_id, "s")
+        assert record["status"] == 200
+        assert record["cached"] is False
+        assert record["response_bytes"] == len(response.content)
+        assert record["tools"] == []
+        assert record["latency_ms"] >= 0
+
+    def test_ignores_other_routes(self, capture_app, tmp_path):
+        TestClient(capture_app).get("/v1/health")
+        assert not (tmp_path / "capture.jsonl").exists()
+
+    def test_records_tool_calls_of_agent(
+        self, capture_app, fake_cache, tmp_path
+    ):
+        assistant = AIAssistant()
+        assistant.agent = AsyncMock()
+        assistant.agent.ainvoke = AsyncMock(return_value={"messages": [
+            HumanMessage(content="Clima em Recife?"),
+            AIMessage(content="", tool_calls=[{
+                "name": "get_weather",
+                "args": {"__arg1": "Recife"},
+                "id": "call_1",
+            }]),
+            ToolMessage(content="Recife: 30°C", tool_call_id="call_1"),
+            AIMessage(content="Faz 30°C em Recife."),
+        ]})
+
+        with patch("backend.api.routes.get_agent", return_value=assistant):
+            response = TestClient(capture_app).post(
+                "/v1/query", json={"query": "Clima em Recife?"}
+            )
+
+        assert response.json()["intermediate_steps"] == [{
+            "tool": "get_weather", "input": "Recife",
+            "output": "Recife: 30°C",
+        }]
+        record = next(read_capture(str(tmp_path / "capture.jsonl")))
+        assert record["tools"] == [["get_weather", "Recife"]]
+
+    def test_tool_inputs_are_anonymized(self, capture_app, tmp_path):
+        class ToolAgent:
+            async def process_query(self, query, session_id=None):
+                return {
+                    "success": True,
+                    "query": query,
+                    "response": "ok",
+                    "intermediate_steps": [{
+                        "tool": "search_documents",
+                        "input": "cliente joao@ex.com CPF 123.456.789-00",
+                        "output": "nada encontrado",
+                    }],
+                }
+
+        with patch(
+            "backend.api.routes.get_agent", return_value=ToolAgent()
+        ):
+            TestClient(capture_app).post("/v1/query", json={
+                "query": "busque joao@ex.com CPF 123.456.789-00",
+            })
+
+        content = (tmp_path / "capture.jsonl").read_text(encoding="utf-8")
+        assert "joao@ex.com" not in content
+        assert "123.456.789-00" not in content
+        record = next(read_capture(str(tmp_path / "capture.jsonl")))
+        assert record["tools"] == [
+            ["search_documents", "cliente <email> CPF <cpf>"]
+        ]
+
+
+class TestReplay:
+    def _records(self, count=10, interval=1.0):
+        return [
+            {"ts": 1000.0 + i * interval, "query": f"pergunta {i % 5}"}
+            for i in range(count)
+        ]
+
+    async def _replay(self, app, records, **kwargs):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await replay(records, client, **kwargs)
+
+    async def test_max_throughput_reports_cache_hits(
+        self, capture_app, fake_agent
+    ):
+        report = await self._replay(
+            capture_app, self._records(), speed=None, concurrency=1
+        )
+        assert report["requests"] == 10
+        assert report["errors"] == 0
+        assert report["cache_hit_ratio"] == 0.5
+        assert report["latency_ms"]["p50"] > 0
+
+    async def test_speed_scales_original_pacing(
+        self, capture_app, fake_agent
+    ):
+        report = await self._replay(
+            capture_app, self._records(count=5), speed=20
+        )
+        # 4 intervalos de 1s a 20x = 0.2s
+        assert 0.2 <= report["elapsed_s"] < 1.0
+
+    async def test_limit(self, capture_app, fake_agent):
+        report = await self._replay(
+            capture_app, self._records(), speed=None, limit=3
+        )
+        assert report["requests"] == 3
@@ -0,0 +1,167 @@
+import time
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from fastmcp import Client, FastMCP
+from unittest.mock import patch
+
+from backend.api.routes import router
+from backend.core.agent import AIAssistant
+from backend.utils.deadline import (
+    ClientDisconnected, DeadlineExceeded, cancel_on_disconnect,
+    deadline_scope, parse_timeout, remaining, run_with_deadline
+)
+from mcp_server.executors import ToolExecutors, offloaded
+
+
+class TestDeadline:
+    def test_parse_timeout(self, monkeypatch):
+        monkeypatch.setenv("REQUEST_TIMEOUT_SECONDS", "30")
+        monkeypatch.setenv("REQUEST_TIMEOUT_MAX_SECONDS", "60")
+        assert parse_timeout(None) == 30
+        assert parse_timeout("5") == 5
+        assert parse_timeout("abc") == 30
+        assert parse_timeout("-1") == 30
+        assert parse_timeout("600") == 60
+
+    def test_inner_scope_cannot_extend(self):
+        assert remaining() is None
+        with deadline_scope(1):
+            with deadline_scope(60):
+                assert remaining() <= 1
+            with deadline_scope(0.5):
+                assert remaining() <= 0.5
+        assert remaining() is None
+
+    async def test_run_with_deadline_cancels(self):
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with deadline_scope(0.05):
+            with pytest.raises(DeadlineExceeded):
+                await run_with_deadline(slow())
+        assert cancelled.is_set()
+
+    async def test_cancel_on_disconnect(self):
+        task_cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                task_cancelled.set()
+                raise
+
+        async def is_disconnected():
+            return True
+
+        with pytest.raises(ClientDisconnected):
+            await cancel_on_disconnect(
+                work(), is_disconnected, poll_interval=0.01
+            )
+        await asyncio.sleep(0)
+        assert task_cancelled.is_set()
+
+
+class TestAgentDeadline:
+    async def test_slow_agent_returns_error(self, fake_cache):
+        assistant = AIAssistant()
+
+        async def ainvoke(state):
+            await asyncio.sleep(5)
+
+        assistant.agent = type("Agent", (), {"ainvoke": staticmethod(ainvoke)})
+
+        start = time.perf_counter()
+        with deadline_scope(0.1):
+            result = await assistant.process_query("oi")
+
+        assert time.perf_counter() - start < 1
+        assert result["success"] is False
+        assert "Prazo" in result["error"]
+        assert fake_cache.get_metric("deadline_exceeded") == 1
+
+
+class TestMCPDeadline:
+    @pytest.fixture
+    def assistant(self):
+        mcp = FastMCP(name="teste")
+
+        @offloaded(mcp, "thread")
+        def time_left() -> dict:
+            """Tempo restante visto dentro da thread da tool."""
+            return {"remaining": remaining()}
+
+        @offloaded(mcp, "thread")
+        def slow() -> dict:
+            """Tool lenta."""
+            time.sleep(1)
+            return {"result": "ok"}
+
+        assistant = AIAssistant()
+        assistant._mcp_client = Client(mcp)
+        return assistant
+
+    async def test_deadline_reaches_tool_thread(self, assistant):
+        with deadline_scope(5):
+            result = await assistant._call_mcp_tool("time_left", {})
+        assert 0 < result["remaining"] <= 5
+
+    async def test_no_deadline(self, assistant):
+        result = await assistant._call_mcp_tool("time_left", {})
+        assert result["remaining"] is None
+
+    async def test_deadline_limits_tool_timeout(self, assistant):
+        start = time.perf_counter()
+        with deadline_scope(0.2):
+            result = await assistant._call_mcp_tool("slow", {})
+        assert result == {
+            "error": "Prazo da requisição esgotado", "transient": True
+        }
+        assert time.perf_counter() - start < 1
+
+    async def test_deadline_cut_is_not_a_tool_timeout(self):
+        executors = ToolExecutors(thread_workers=1, timeout=5)
+        try:
+            with deadline_scope(0.1):
+                result = await executors.run("thread", time.sleep, 1)
+        finally:
+            executors.shutdown()
+
+        assert result["error"] == "Prazo da requisição esgotado"
+        assert executors.snapshot()["thread"]["timeouts"] == 0
+
+    async def test_expired_deadline_skips_call(self, assistant):
+        with deadline_scope(at=time.time() - 1):
+            with pytest.raises(DeadlineExceeded):
+                await assistant._call_mcp_tool("time_left", {})
+
+
+class TestRouteDeadline:
+    def test_header_sets_deadline(self):
+        class Agent:
+            async def process_query(self, query, session_id=None):
+                return {
+                    "success": True,
+                    "query": query,
+                    "response": f"{remaining():.1f}",
+                }
+
+        app = FastAPI()
+        app.include_router(router)
+        with patch("backend.api.routes.get_agent", return_value=Agent()):
+            response = TestClient(app).post(
+                "/v1/query",
+                json={"query": "oi"},
+                headers={"X-Request-Timeout": "7"},
+            )
+
+        assert response.status_code == 200
+        assert 6 < float(response.json()["response"]) <= 7
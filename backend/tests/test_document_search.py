@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+import mcp_server.server as server
+from mcp_server.tools.bm25 import BM25Index, build_bm25_index
+from mcp_server.tools.ingest import ingest
+from mcp_server.tools.text import chunk_text, iter_chunks, tokenize
+
+DOCUMENTS = {
+    "clima.md": (
+        "O clima de Florianópolis é subtropical úmido, com verões quentes "
+        "e invernos amenos. Chove bem distribuído ao longo do ano."
+    ),
+    "python.txt": (
+        "Python é uma linguagem de programação de alto nível. "
+        "A linguagem Python é muito usada em ciência de dados."
+    ),
+    "receitas/pao.txt": (
+        "Para fazer pão de queijo use polvilho azedo, queijo minas e ovos."
+    ),
+}
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    root = tmp_path / "documents"
+    for name, text in DOCUMENTS.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    return root
+
+
+@pytest.fixture
+def bm25_index(docs_dir, tmp_path):
+    index_dir = tmp_path / "index"
+    build_bm25_index(iter_chunks(str(docs_dir)), str(index_dir))
+    index = BM25Index(str(index_dir))
+    yield index
+    index.close()
+
+
+class TestText:
+    def test_tokenize_strips_accents_and_stopwords(self):
+        assert tokenize("O clima de Florianópolis") == [
+            "clima", "florianopolis"
+        ]
+
+    def test_chunk_overlap(self):
+        chunks = list(chunk_text(" ".join(map(str, range(10))), 4, 2))
+        assert chunks[0] == "0 1 2 3"
+        assert chunks[1] == "2 3 4 5"
+        assert chunks[-1].endswith("9")
+
+
+class TestBM25Index:
+    def test_ranks_relevant_chunk_first(self, bm25_index):
+        results = bm25_index.search("linguagem python", top_k=2)
+        assert results[0]["source"] == "python.txt"
+        assert results[0]["score"] > 0
+
+    def test_accent_insensitive(self, bm25_index):
+        results = bm25_index.search("florianopolis")
+        assert results[0]["source"] == "clima.md"
+
+    def test_unknown_terms(self, bm25_index):
+        assert bm25_index.search("xyzzy") == []
+
+    def test_postings_are_memory_mapped(self, bm25_index):
+        assert isinstance(bm25_index.postings_docs, np.memmap)
+        docs, tfs = bm25_index.postings("python")
+        assert len(docs) == 1
+        assert tfs[0] == 2
+
+
+class TestSearchDocumentsTool:
+    @pytest.fixture(autouse=True)
+    def reset_index(self, monkeypatch):
+        monkeypatch.setattr(server, "_document_index", None)
+
+    def test_search(self, docs_dir, tmp_path, monkeypatch):
+        ingest(str(docs_dir), str(tmp_path / "index"), workers=1)
+        monkeypatch.setenv("INDEX_DIR", str(tmp_path / "index"))
+        result = server.search_documents("pão de queijo", top_k=1)
+        assert result["results"][0]["source"].endswith("pao.txt")
+        assert "polvilho" in result["formatted"]
+
+    def test_missing_index(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("INDEX_DIR", str(tmp_path / "nada"))
+        result = server.search_documents("python")
+        assert "error" in result
+
+    def test_empty_query(self):
+        assert "error" in server.search_documents("  ")
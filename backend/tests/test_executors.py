@@ -0,0 +1,104 @@
+import os
+import time
+import asyncio
+import numpy as np
+import pytest
+
+from mcp_server.executors import ToolExecutors
+from mcp_server.server import get_weather
+from mcp_server.tools.calculator import calculator
+
+SLOW_EXPRESSION = "99 ^ 999999"     # ~1s de CPU
+ENDLESS_EXPRESSION = "9 ^ 9 ^ 8"    # minutos de CPU
+
+
+@pytest.fixture
+def executors():
+    pool = ToolExecutors(process_workers=1, thread_workers=4, timeout=5)
+    yield pool
+    pool.shutdown()
+
+
+class TestToolExecutors:
+    async def test_process_pool_runs_in_other_process(self, executors):
+        result = await executors.run("process", calculator, "2 + 2")
+        assert result["result"] == 4
+
+        pid = await executors.run("process", os.getpid)
+        assert pid != os.getpid()
+
+    async def test_thread_pool_passes_kwargs(self, executors):
+        result = await executors.run(
+            "thread", calculator, expression="3 * 3"
+        )
+        assert result["result"] == 9
+
+    async def test_timeout_recycles_process_pool(self, executors):
+        result = await executors.run(
+            "process", calculator, ENDLESS_EXPRESSION, timeout=0.5
+        )
+        assert "Tempo limite" in result["error"]
+        assert result["transient"] is True
+
+        stats = executors.snapshot()["process"]
+        assert stats["timeouts"] == 1
+        assert stats["recycles"] == 1
+
+        result = await executors.run("process", calculator, "1 + 1")
+        assert result["result"] == 2
+
+    async def test_exceptions_propagate(self, executors):
+        with pytest.raises(ZeroDivisionError):
+            await executors.run("thread", lambda: 1 / 0)
+        assert executors.snapshot()["thread"]["failed"] == 1
+
+    async def test_snapshot_reports_queue_and_latency(self, executors):
+        await executors.run("process", calculator, "1 + 1")
+        await asyncio.gather(*(
+            executors.run("process", calculator, "2 ^ 10")
+            for _ in range(4)
+        ))
+
+        stats = executors.snapshot()["process"]
+        assert stats["completed"] == 5
+        assert stats["in_flight"] == 0
+        assert stats["max_queue_depth"] == 3
+        assert stats["latency_ms"]["p50"] > 0
+
+
+class TestSaturation:
+    async def _weather_latencies(self, executors, count=20):
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            result = await executors.run("thread", get_weather, "Recife")
+            latencies.append(time.perf_counter() - start)
+            assert result["city"] == "Recife"
+            await asyncio.sleep(0.02)
+        return np.percentile(latencies, 95)
+
+    async def test_weather_latency_flat_under_calculator_load(
+        self, executors, fake_cache
+    ):
+        fake_cache.set(
+            fake_cache.make_namespaced_key("weather", "Recife,BR"),
+            {"city": "Recife", "temperature": 28}
+        )
+        # Sobe o worker antes de medir
+        await executors.run("process", calculator, "1 + 1")
+        baseline = await self._weather_latencies(executors)
+
+        load = [
+            asyncio.create_task(
+                executors.run("process", calculator, SLOW_EXPRESSION)
+            )
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0.05)
+        loaded = await self._weather_latencies(executors)
+
+        assert executors.snapshot()["process"]["queue_depth"] >= 1
+        await asyncio.gather(*load)
+
+        # Com a calculator inline, cada chamada esperaria ~1s de CPU
+        assert loaded < baseline + 0.1
@@ -0,0 +1,99 @@
+import time
+import pytest
+import redis
+from unittest.mock import patch
+
+from backend.utils.cache import RedisCache
+from benchmarks.bench_import import measure, parse_importtime
+
+# Orçamento do import (ms, tempo cumulativo do -X importtime). Folga de
+# ~2x sobre o medido em uma máquina de desenvolvimento
+IMPORT_BUDGETS_MS = {
+    "backend.main": 2500,
+    "mcp_server.server": 2500,
+}
+
+# Stacks carregadas só no primeiro uso
+LAZY_MODULES = {"langchain_openai", "langgraph", "openai", "tiktoken"}
+
+# Endereço não roteável: um connect síncrono esperaria o timeout (5s)
+REDIS_DOWN = {"REDIS_ENABLED": "true", "REDIS_HOST": "10.255.255.1"}
+
+
+class TestImportTime:
+    def test_parse_importtime(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   redis.utils\n"
+            "import time:      1500 |       1620 | redis\n"
+        )
+        imports = parse_importtime(output)
+
+        assert [(i.module, i.depth) for i in imports] == [
+            ("redis.utils", 1), ("redis", 0)
+        ]
+        assert imports[1].cumulative_ms == pytest.approx(1.62)
+
+    @pytest.mark.parametrize("module", sorted(IMPORT_BUDGETS_MS))
+    def test_budget_with_redis_down(self, module):
+        profile = measure(module, env=REDIS_DOWN)
+
+        assert profile.get(module).cumulative_ms < IMPORT_BUDGETS_MS[module]
+        heavy = {m.split(".")[0] for m in profile.modules()} & LAZY_MODULES
+        assert not heavy
+
+
+class TestLazyConnect:
+    @pytest.fixture
+    def redis_cache(self, monkeypatch):
+        monkeypatch.setenv("REDIS_ENABLED", "true")
+        monkeypatch.setenv("REDIS_HOST", "127.0.0.1")
+        monkeypatch.setenv("REDIS_PORT", "1")
+        monkeypatch.setenv("REDIS_RECONNECT_SECONDS", "60")
+        return RedisCache()
+
+    def _wait_connect(self, redis_cache):
+        deadline = time.monotonic() + 5
+        while redis_cache._connecting and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_constructor_does_not_connect(self):
+        with patch("redis.Redis") as client:
+            RedisCache()
+        client.assert_not_called()
+
+    def test_miss_while_down_then_backoff(self, redis_cache):
+        start = time.perf_counter()
+        assert redis_cache.get("chave") is None
+        assert time.perf_counter() - start < 0.1
+
+        self._wait_connect(redis_cache)
+        assert redis_cache.client is None
+        # Próxima tentativa só depois de REDIS_RECONNECT_SECONDS
+        assert redis_cache._next_attempt > time.monotonic() + 50
+        assert not redis_cache._connecting
+
+    def test_connects_in_background(self, redis_cache):
+        from backend.tests.conftest import FakeRedis
+
+        with patch("redis.Redis", return_value=FakeRedis()):
+            redis_cache.set("chave", {"valor": 1})
+            self._wait_connect(redis_cache)
+
+        assert redis_cache.set("chave", {"valor": 1})
+        assert redis_cache.get("chave") == {"valor": 1}
+
+    def test_connection_error_drops_client(self, redis_cache):
+        from backend.tests.conftest import FakeRedis
+
+        fake = FakeRedis()
+        redis_cache._client = fake
+        with patch.object(
+            fake, "get", side_effect=redis.ConnectionError("recusada")
+        ), patch.object(fake, "close") as close:
+            assert redis_cache.get("chave") is None
+
+        assert redis_cache._client is None
+        assert redis_cache._next_attempt > time.monotonic()
+        # Pools (e threads do modo shardeado) não vazam a cada queda
+        close.assert_called_once()
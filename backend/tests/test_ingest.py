@@ -0,0 +1,148 @@
+import os
+import pytest
+from unittest.mock import patch
+
+from mcp_server.tools.index import DocumentIndex, load_manifest
+from mcp_server.tools.ingest import ingest, main
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+@pytest.fixture
+def docs(tmp_path):
+    root = tmp_path / "documents"
+    write(root / "a.txt", "Recife tem praias urbanas e frevo no carnaval.")
+    write(root / "b.txt", "Curitiba é conhecida pelo frio e pelos parques.")
+    return root
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return str(tmp_path / "index")
+
+
+def sources(results):
+    return [result["source"] for result in results]
+
+
+class TestIngest:
+    def test_initial_ingest(self, docs, index_dir):
+        stats = ingest(str(docs), index_dir, workers=1)
+        assert stats["indexed"] == 2
+        assert stats["files_per_second"] > 0
+
+        index = DocumentIndex(index_dir)
+        assert sources(index.search_bm25("frevo")) == ["a.txt"]
+        assert sources(index.search_vectors("parques frios", 1)) == ["b.txt"]
+
+    def test_unchanged_files_are_skipped(self, docs, index_dir):
+        ingest(str(docs), index_dir, workers=1)
+        stats = ingest(str(docs), index_dir, workers=1)
+        assert stats["indexed"] == 0
+        assert stats["files"] == 0
+        assert len(load_manifest(index_dir)["segments"]) == 1
+
+    def test_touched_file_with_same_content(self, docs, index_dir):
+        ingest(str(docs), index_dir, workers=1)
+        os.utime(docs / "a.txt", ns=(1, 1))
+        stats = ingest(str(docs), index_dir, workers=1)
+        assert stats["unchanged"] == 1
+        assert stats["indexed"] == 0
+
+    def test_changed_file_replaces_old_chunks(self, docs, index_dir):
+        ingest(str(docs), index_dir, workers=1)
+        index = DocumentIndex(index_dir)
+
+        write(docs / "a.txt", "Recife agora fala de maracatu.")
+        stats = ingest(str(docs), index_dir, workers=1)
+        assert stats["indexed"] == 1
+
+        assert index.reload_if_changed()
+        assert index.search_bm25("frevo") == []
+        assert sources(index.search_bm25("maracatu")) == ["a.txt"]
+        assert len(index) == 2
+
+    def test_deleted_file(self, docs, index_dir):
+        ingest(str(docs), index_dir, workers=1)
+        os.remove(docs / "b.txt")
+        stats = ingest(str(docs), index_dir, workers=1)
+        assert stats["deleted"] == 1
+
+        index = DocumentIndex(index_dir)
+        assert index.search_bm25("curitiba") == []
+        assert "b.txt" not in sources(index.search_vectors("curitiba", 5))
+
+    def test_segments_are_merged(self, docs, index_dir, monkeypatch):
+        monkeypatch.setenv("INGEST_MAX_SEGMENTS", "2")
+        ingest(str(docs), index_dir, workers=1)
+        for i in range(3):
+            write(docs / f"novo{i}.txt", f"Documento número {i} sobre ipê.")
+            ingest(str(docs), index_dir, workers=1)
+
+        manifest = load_manifest(index_dir)
+        assert len(manifest["segments"]) <= 2
+        segment_dirs = os.listdir(os.path.join(index_dir, "segments"))
+        assert sorted(segment_dirs) == sorted(manifest["segments"])
+
+        index = DocumentIndex(index_dir)
+        assert len(index) == 5
+        assert sources(index.search_bm25("frevo")) == ["a.txt"]
+        assert len(index.search_bm25("ipe", 10)) == 3
+
+    def test_reload_during_search(self, docs, index_dir, monkeypatch):
+        monkeypatch.setenv("INGEST_MAX_SEGMENTS", "1")
+        ingest(str(docs), index_dir, workers=1)
+        index = DocumentIndex(index_dir)
+
+        with index._reading() as segments:
+            os.remove(docs / "b.txt")
+            write(docs / "c.txt", "Manaus tem o encontro das águas.")
+            ingest(str(docs), index_dir, workers=1)
+            assert index.reload_if_changed()
+
+            # A busca em andamento continua na geração anterior, aberta
+            assert not set(segments) & set(index.segments)
+            assert sources(
+                index._search_bm25(segments, "curitiba", 5)
+            ) == ["b.txt"]
+
+        assert all(s.store._file.closed for s in segments.values())
+        assert index.search_bm25("curitiba") == []
+        assert sources(index.search_bm25("manaus")) == ["c.txt"]
+
+    def test_deletions_do_not_touch_running_search(self, docs, index_dir):
+        ingest(str(docs), index_dir, workers=1)
+        index = DocumentIndex(index_dir)
+
+        with index._reading() as segments:
+            os.remove(docs / "b.txt")
+            ingest(str(docs), index_dir, workers=1)
+            assert index.reload_if_changed()
+
+            assert all(s.live.all() for s in segments.values())
+            assert len(index) == 1
+
+    def test_parallel_workers(self, docs, index_dir):
+        for i in range(10):
+            write(docs / "lote" / f"{i}.md", f"Arquivo {i} do lote paralelo.")
+        stats = ingest(str(docs), index_dir, workers=2)
+        assert stats["indexed"] == 12
+
+
+class TestCommandLine:
+    @pytest.mark.parametrize("argv", [
+        ["--workers", "3"],
+        ["run", "--workers", "3"],
+        ["--workers", "3", "run"],
+    ])
+    def test_run_options(self, docs, index_dir, argv):
+        with patch(
+            "mcp_server.tools.ingest.ingest", wraps=ingest
+        ) as wrapped:
+            main(["--docs", str(docs), "--index", index_dir, *argv])
+
+        assert wrapped.call_args.args[2] == 3
+        assert load_manifest(index_dir)["files"]
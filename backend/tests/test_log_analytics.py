@@ -0,0 +1,181 @@
+import os
+import json
+import logging
+import numpy as np
+import pytest
+
+from backend.utils.log_analytics import (
+    LogAnalyzer, QuantileSketch, log_files
+)
+from backend.utils.logger import RequestContextFilter, request_id_var
+
+
+def line(**fields):
+    record = {
+        "timestamp": "2026-10-18 12:00:00",
+        "level": "INFO",
+        "logger": "backend.core.agent",
+        "message": "x",
+        **fields,
+    }
+    return json.dumps(record) + "\n"
+
+
+def write(path, *lines, mode="a"):
+    with open(path, mode) as f:
+        f.writelines(lines)
+
+
+def roundtrip(analyzer):
+    return LogAnalyzer(json.loads(json.dumps(analyzer.state())))
+
+
+class TestQuantileSketch:
+    def test_relative_error(self):
+        values = np.random.default_rng(0).lognormal(3, 1.5, 50_000)
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        for q in (0.5, 0.95, 0.99):
+            expected = np.quantile(values, q)
+            assert sketch.quantile(q) == pytest.approx(expected, rel=0.02)
+
+    def test_merge_and_serialization(self):
+        a, b = QuantileSketch(), QuantileSketch()
+        for value in range(1, 501):
+            a.add(value)
+        for value in range(501, 1001):
+            b.add(value)
+        a.merge(QuantileSketch.from_dict(json.loads(json.dumps(b.to_dict()))))
+
+        assert a.count == 1000
+        assert a.quantile(0.5) == pytest.approx(500, rel=0.02)
+        assert a.max == 1000
+
+    def test_bounded_buckets(self):
+        sketch = QuantileSketch(max_buckets=64)
+        for exponent in range(-6, 12):
+            sketch.add(10.0 ** exponent)
+        assert len(sketch.buckets) <= 64
+        assert sketch.quantile(1.0) == 10.0 ** 11
+
+
+class TestLogAnalyzer:
+    def test_aggregates_by_dimension_and_request(self, tmp_path):
+        log = tmp_path / "app.log"
+        write(
+            log,
+            line(request_id="r1", tool_name="get_weather", duration_ms=80),
+            line(request_id="r1", level="ERROR"),
+            line(
+                request_id="r1", logger="backend.requests",
+                path="/v1/query", status_code=200, duration_ms=900
+            ),
+            line(
+                request_id="r2", logger="backend.requests",
+                path="/v1/query", status_code=200, duration_ms=100
+            ),
+        )
+        analyzer = LogAnalyzer()
+        analyzer.process(log_files(str(tmp_path)))
+        report = analyzer.report()
+
+        assert report["total"]["lines"] == 4
+        assert report["level"]["ERROR"]["errors"] == 1
+        assert report["tool_name"]["get_weather"]["duration_ms"]["p99"] == (
+            pytest.approx(80, rel=0.02)
+        )
+        weather = report["request_tool"]["get_weather"]
+        assert weather["duration_ms"]["max"] == 900
+        assert weather["errors"] == 1
+        assert report["request_tool"]["none"]["lines"] == 1
+        assert report["slowest_requests"][0]["request_id"] == "r1"
+
+    def test_incremental_runs_read_only_new_lines(self, tmp_path):
+        log = tmp_path / "app.log"
+        write(log, line(), line())
+        analyzer = LogAnalyzer()
+        analyzer.process(log_files(str(tmp_path)))
+
+        write(log, line(), line(level="ERROR"))
+        analyzer = roundtrip(analyzer)
+        analyzer.process(log_files(str(tmp_path)))
+
+        assert analyzer.lines_read == 2
+        total = analyzer.report()["total"]
+        assert total["lines"] == 4
+        assert total["errors"] == 1
+
+    def test_partial_line_is_left_for_next_run(self, tmp_path):
+        log = tmp_path / "app.log"
+        write(log, line(), '{"timestamp": "2026-10-18')
+        analyzer = LogAnalyzer()
+        analyzer.process(log_files(str(tmp_path)))
+        assert analyzer.report()["total"]["lines"] == 1
+
+        write(log, ' 12:00:00", "level": "INFO"}\n')
+        analyzer = roundtrip(analyzer)
+        analyzer.process(log_files(str(tmp_path)))
+        assert analyzer.report()["total"]["lines"] == 2
+
+    def test_rotation_resumes_by_inode(self, tmp_path):
+        log = tmp_path / "app.log"
+        write(log, line(), line())
+        analyzer = LogAnalyzer()
+        analyzer.process(log_files(str(tmp_path)))
+
+        # Linha escrita antes da rotação, depois app.log -> app.log.1
+        write(log, line())
+        os.rename(log, tmp_path / "app.log.1")
+        write(log, line(), mode="w")
+
+        analyzer = roundtrip(analyzer)
+        analyzer.process(log_files(str(tmp_path)))
+        assert analyzer.lines_read == 2
+        assert analyzer.report()["total"]["lines"] == 4
+
+    def test_replaced_file_is_read_from_start(self, tmp_path):
+        log = tmp_path / "app.log"
+        write(log, line(message="a" * 300))
+        analyzer = LogAnalyzer()
+        analyzer.process(log_files(str(tmp_path)))
+
+        file_id = next(iter(analyzer.files))
+        write(log, line(message="b" * 300) * 2, mode="w")
+        analyzer.process(log_files(str(tmp_path)))
+
+        assert file_id in analyzer.files
+        assert analyzer.report()["total"]["lines"] == 3
+
+    def test_report_filters_days(self, tmp_path):
+        log = tmp_path / "app.log"
+        write(
+            log,
+            line(timestamp="2026-10-17 23:59:59"),
+            line(timestamp="2026-10-18 00:00:01"),
+            line(timestamp="2026-10-18 10:00:00"),
+        )
+        analyzer = LogAnalyzer()
+        analyzer.process(log_files(str(tmp_path)))
+
+        report = analyzer.report(since="2026-10-18", until="2026-10-18")
+        assert report["days"] == ["2026-10-18"]
+        assert report["total"]["lines"] == 2
+
+    def test_log_files_oldest_first(self, tmp_path):
+        for name in ("app.log", "app.log.1", "app.log.2", "error.log"):
+            (tmp_path / name).write_text("")
+        names = [os.path.basename(p) for p in log_files(str(tmp_path))]
+        assert names == ["app.log.2", "app.log.1", "app.log"]
+
+
+class TestRequestContextFilter:
+    def test_adds_request_id(self):
+        record = logging.LogRecord("x", logging.INFO, "", 0, "m", (), None)
+        token = request_id_var.set("abc")
+        try:
+            RequestContextFilter().filter(record)
+        finally:
+            request_id_var.reset(token)
+        assert record.request_id == "abc"
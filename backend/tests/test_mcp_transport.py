@@ -0,0 +1,47 @@
+import pytest
+from fastmcp.client.transports import (
+    FastMCPTransport, StreamableHttpTransport
+)
+
+from backend.core.agent import AIAssistant, create_mcp_client
+
+
+class TestCreateMCPClient:
+    def test_http_default(self, monkeypatch):
+        monkeypatch.delenv("MCP_TRANSPORT", raising=False)
+        monkeypatch.setenv("MCP_SERVER_URL", "http://mcp:9000/")
+
+        client = create_mcp_client()
+
+        assert isinstance(client.transport, StreamableHttpTransport)
+        assert client.transport.url == "http://mcp:9000/mcp"
+
+    def test_inprocess(self):
+        from mcp_server.server import mcp
+
+        client = create_mcp_client("inprocess")
+
+        assert isinstance(client.transport, FastMCPTransport)
+        assert client.transport.server is mcp
+
+    def test_invalid(self):
+        with pytest.raises(ValueError, match="MCP_TRANSPORT"):
+            create_mcp_client("grpc")
+
+
+class TestInProcessAgent:
+    @pytest.fixture
+    def assistant(self, monkeypatch):
+        monkeypatch.setenv("MCP_TRANSPORT", "inprocess")
+        return AIAssistant()
+
+    async def test_initialize_lists_tools(self, assistant):
+        await assistant.initialize()
+
+        names = {tool.name for tool in assistant.tools}
+        assert {"calculator", "get_weather"} <= names
+        assert assistant.agent is not None
+
+    async def test_tool_call(self, assistant):
+        result = await assistant._call_mcp_tool("get_weather", {"city": ""})
+        assert result == {"error": "Cidade inválida"}
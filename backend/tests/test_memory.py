@@ -0,0 +1,173 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.core.agent import AIAssistant
+from backend.core.memory import (
+    ConversationMemory, new_session_id, valid_session_id
+)
+
+
+class FakeLLM:
+    def __init__(self, summary="Usuário perguntou o clima em São Paulo."):
+        self.summary = summary
+        self.calls = []
+
+    async def ainvoke(self, messages):
+        self.calls.append(messages)
+        return SimpleNamespace(content=self.summary)
+
+
+class TestConversationMemory:
+    def test_window_respects_budget(self, fake_cache):
+        memory = ConversationMemory()
+        memory.max_context_tokens = 30
+        for i in range(10):
+            memory.append("s1", f"pergunta {i} " * 3, f"resposta {i} " * 3)
+
+        messages, tokens = memory.build_context(memory.load("s1"))
+
+        assert 0 < tokens <= 30
+        assert messages[-1][0] == "assistant"
+        assert "resposta 9" in messages[-1][1]
+
+    def test_empty_session(self, fake_cache):
+        memory = ConversationMemory()
+        assert memory.build_context(memory.load("nova")) == ([], 0)
+
+    async def test_summarize_folds_old_turns(self, fake_cache):
+        memory = ConversationMemory()
+        memory.max_context_tokens = 40
+        for i in range(6):
+            memory.append("s1", f"pergunta {i} " * 4, f"resposta {i} " * 4)
+        assert memory.needs_summary(memory.load("s1"))
+
+        llm = FakeLLM()
+        assert await memory.summarize("s1", llm)
+
+        session = memory.load("s1")
+        assert session["s"] == llm.summary
+        assert not memory.needs_summary(session)
+        messages, _ = memory.build_context(session)
+        assert messages[0] == (
+            "system", f"Resumo da conversa até aqui: {llm.summary}"
+        )
+
+    def test_clear(self, fake_cache):
+        memory = ConversationMemory()
+        memory.append("s1", "oi", "olá")
+        memory.clear("s1")
+        assert memory.load("s1")["t"] == []
+
+
+class TestSessionIds:
+    def test_issued_ids_are_valid(self):
+        first, second = new_session_id(), new_session_id()
+        assert first != second
+        assert valid_session_id(first)
+        assert valid_session_id(second)
+
+    def test_forged_ids_are_rejected(self):
+        token, signature = new_session_id().split(".")
+        assert not valid_session_id(None)
+        assert not valid_session_id("s1")
+        assert not valid_session_id(f"{token}x.{signature}")
+        assert not valid_session_id(f"{token}.{signature}.x")
+
+    def test_secret_binds_ids(self, monkeypatch):
+        monkeypatch.setenv("SESSION_SECRET", "a")
+        session_id = new_session_id()
+        assert valid_session_id(session_id)
+        monkeypatch.setenv("SESSION_SECRET", "b")
+        assert not valid_session_id(session_id)
+
+
+class TestSessionRoutes:
+    @pytest.fixture
+    def client(self):
+        return TestClient(app)
+
+    def test_issued_session_is_accepted(self, client, mock_agent):
+        session_id = client.post("/v1/sessions").json()["session_id"]
+        response = client.post(
+            "/v1/query", json={"query": "oi", "session_id": session_id}
+        )
+        assert response.status_code == 200
+
+    def test_forged_session_is_rejected(self, client, mock_agent):
+        response = client.post(
+            "/v1/query", json={"query": "oi", "session_id": "s1"}
+        )
+        assert response.status_code == 404
+        assert client.delete("/v1/sessions/s1").status_code == 404
+
+    def test_clear_issued_session(self, client, fake_cache):
+        session_id = client.post("/v1/sessions").json()["session_id"]
+        ConversationMemory().append(session_id, "oi", "olá")
+        response = client.delete(f"/v1/sessions/{session_id}")
+        assert response.status_code == 200
+        assert ConversationMemory().load(session_id)["t"] == []
+
+
+class TestAgentSessions:
+    @pytest.fixture
+    def assistant(self):
+        assistant = AIAssistant()
+        message = SimpleNamespace(content="Está 25°C.", tool_calls=[])
+        assistant.agent = AsyncMock()
+        assistant.agent.ainvoke = AsyncMock(
+            return_value={"messages": [message]}
+        )
+        assistant.llm = FakeLLM()
+        return assistant
+
+    async def test_follow_up_receives_history(self, fake_cache, assistant):
+        await assistant.process_query("Clima em São Paulo?", session_id="s1")
+        await assistant.process_query("e no Rio?", session_id="s1")
+
+        messages = assistant.agent.ainvoke.await_args.args[0]["messages"]
+        assert ("user", "Clima em São Paulo?") in messages
+        assert ("assistant", "Está 25°C.") in messages
+        assert messages[-1] == ("user", "e no Rio?")
+
+    async def test_cache_key_depends_on_context(self, fake_cache, assistant):
+        await assistant.process_query("e no Rio?", session_id="s1")
+        await assistant.process_query("Clima em Recife?", session_id="s2")
+        await assistant.process_query("e no Rio?", session_id="s2")
+        assert assistant.agent.ainvoke.await_count == 3
+
+    async def test_summary_runs_in_background(self, fake_cache, assistant):
+        assistant.memory.max_context_tokens = 20
+        for i in range(4):
+            await assistant.process_query(
+                f"pergunta longa número {i} sobre o clima", session_id="s1"
+            )
+        await asyncio.gather(*assistant._background_tasks)
+
+        assert assistant.llm.calls
+        assert fake_cache.get_metric("session_turns") == 4
+
+    async def test_one_summary_per_session(self, fake_cache, assistant):
+        release = asyncio.Event()
+
+        class SlowLLM(FakeLLM):
+            async def ainvoke(self, messages):
+                await release.wait()
+                return await super().ainvoke(messages)
+
+        assistant.llm = SlowLLM()
+        assistant.memory.max_context_tokens = 20
+        for i in range(4):
+            await assistant.process_query(
+                f"pergunta longa número {i} sobre o clima", session_id="s1"
+            )
+        assert len(assistant._background_tasks) == 1
+
+        release.set()
+        await asyncio.gather(*assistant._background_tasks)
+
+        assert len(assistant.llm.calls) == 1
+        assert not assistant._summarizing
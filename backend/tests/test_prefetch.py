@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from backend.core.agent import AIAssistant
+from backend.core.prefetch import extract_candidates
+from backend.core.tool_cache import ToolResultCache
+
+
+class TestExtractCandidates:
+    @pytest.mark.parametrize("query, city, country", [
+        ("Qual o clima em São Paulo?", "São Paulo", "BR"),
+        ("Como está o tempo no Rio de Janeiro?", "Rio de Janeiro", "BR"),
+        ("Temperatura em Paris, FR agora", "Paris", "FR"),
+    ])
+    def test_weather_city(self, query, city, country):
+        assert extract_candidates(query) == [
+            ("get_weather", {"city": city, "country_code": country})
+        ]
+
+    @pytest.mark.parametrize("query, expression", [
+        ("Quanto é 15 + 27?", "15 + 27"),
+        ("Quanto é 128 vezes 46?", "128 * 46"),
+        ("Calcule (2 + 3) * 4", "(2 + 3) * 4"),
+    ])
+    def test_arithmetic(self, query, expression):
+        assert extract_candidates(query) == [
+            ("calculator", {"expression": expression})
+        ]
+
+    def test_no_candidates(self):
+        assert extract_candidates("Qual a capital da França?") == []
+        assert extract_candidates("Quem nasceu em 1990?") == []
+
+    def test_limit(self):
+        query = "Clima em Recife, em Natal, em Belém e em Manaus"
+        assert len(extract_candidates(query, max_candidates=2)) == 2
+
+
+class TestSingleFlight:
+    async def test_concurrent_calls_share_fetch(self, fake_cache):
+        tool_cache = ToolResultCache()
+
+        async def slow_fetch(tool_name, arguments):
+            await asyncio.sleep(0.05)
+            return {"formatted": "Recife: 30°C"}
+
+        fetch = AsyncMock(side_effect=slow_fetch)
+        args = {"city": "Recife", "country_code": "BR"}
+        results = await asyncio.gather(*(
+            tool_cache.call("get_weather", args, fetch) for _ in range(3)
+        ))
+
+        assert fetch.await_count == 1
+        assert all(r == {"formatted": "Recife: 30°C"} for r in results)
+        assert fake_cache.get_metric("cache_coalesced_tool:get_weather") == 2
+
+    async def test_failure_propagates_to_waiters(self, fake_cache):
+        tool_cache = ToolResultCache()
+
+        async def failing_fetch(tool_name, arguments):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("MCP indisponível")
+
+        args = {"city": "Recife", "country_code": "BR"}
+        results = await asyncio.gather(*(
+            tool_cache.call("get_weather", args, failing_fetch)
+            for _ in range(2)
+        ), return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not tool_cache._inflight
+
+
+class TestAgentPrefetch:
+    @pytest.fixture
+    def assistant(self):
+        assistant = AIAssistant()
+        fetch_calls = []
+
+        async def call_mcp_tool(tool_name, arguments):
+            fetch_calls.append((tool_name, arguments))
+            await asyncio.sleep(0.05)
+            return {"formatted": f"{arguments['city']}: 30°C"}
+
+        assistant._call_mcp_tool = call_mcp_tool
+        assistant.fetch_calls = fetch_calls
+        tool = assistant._create_langchain_tool(
+            SimpleNamespace(name="get_weather", description="Clima")
+        )
+        assistant.tools = [tool]
+
+        async def ainvoke(state):
+            # Primeira ida ao LLM (decide a tool) e depois a chamada
+            await asyncio.sleep(0.05)
+            output = await tool.coroutine(assistant.agent.city)
+            message = SimpleNamespace(content=output, tool_calls=[])
+            return {"messages": [message]}
+
+        assistant.agent = SimpleNamespace(ainvoke=ainvoke, city="Recife")
+        return assistant
+
+    async def test_tool_call_hits_prefetched_result(
+        self, fake_cache, assistant
+    ):
+        result = await assistant.process_query("Qual o clima em Recife?")
+        await asyncio.gather(*assistant._background_tasks)
+
+        assert result["response"] == "Recife: 30°C"
+        assert len(assistant.fetch_calls) == 1
+        assert fake_cache.get_metric("prefetch_hits:get_weather") == 1
+        assert fake_cache.get_metric("prefetch_fetches:get_weather") == 1
+        assert fake_cache.get_metric("prefetch_wasted:get_weather") == 0
+
+    async def test_wrong_guess_is_wasted(self, fake_cache, assistant):
+        assistant.agent.city = "Olinda"
+        await assistant.process_query("Qual o clima em Recife?")
+        await asyncio.gather(*assistant._background_tasks)
+
+        assert len(assistant.fetch_calls) == 2
+        assert fake_cache.get_metric("prefetch_hits:get_weather") == 0
+        assert fake_cache.get_metric("prefetch_wasted:get_weather") == 1
+
+    async def test_disabled(self, fake_cache, assistant):
+        assistant.prefetcher.enabled = False
+        await assistant.process_query("Qual o clima em Recife?")
+
+        assert len(assistant.fetch_calls) == 1
+        assert fake_cache.get_metric("prefetch_candidates:get_weather") == 0
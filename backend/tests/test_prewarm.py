@@ -0,0 +1,131 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from backend.core.agent import AIAssistant
+from backend.core.prewarm import PrewarmScheduler
+from backend.utils.cache import (
+    POPULARITY_ERA_HALF_LIVES, POPULARITY_HALF_LIFE, PREWARMED_FIELD
+)
+
+WEATHER = {"city": "Recife", "temperature": 30, "formatted": "Recife: 30°C"}
+
+
+class TestPopularity:
+    def test_decayed_ranking(self, fake_cache):
+        start = 1000 * POPULARITY_HALF_LIFE * POPULARITY_ERA_HALF_LIVES
+        for _ in range(3):
+            fake_cache.track_popularity("weather", "Recife,BR", now=start)
+        later = start + 3 * POPULARITY_HALF_LIFE
+        for _ in range(2):
+            fake_cache.track_popularity("weather", "Natal,BR", now=later)
+
+        top = fake_cache.top_popular("weather", 10, now=later)
+
+        assert [member for member, _ in top] == ["Natal,BR", "Recife,BR"]
+        assert top[0][1] == pytest.approx(2)
+        assert top[1][1] == pytest.approx(3 / 8)
+
+    def test_carried_into_next_era(self, fake_cache):
+        era_seconds = POPULARITY_HALF_LIFE * POPULARITY_ERA_HALF_LIVES
+        end_of_era = 1001 * era_seconds - 1
+        fake_cache.track_popularity("weather", "Recife,BR", now=end_of_era)
+
+        top = fake_cache.top_popular("weather", 10, now=end_of_era + 2)
+
+        assert top[0][0] == "Recife,BR"
+        assert top[0][1] == pytest.approx(1, rel=1e-3)
+
+    def test_quota(self, fake_cache):
+        results = [fake_cache.acquire_quota("q", 2, 60) for _ in range(3)]
+        assert results == [True, True, False]
+
+
+class TestPrewarmScheduler:
+    @pytest.fixture
+    def fetch_weather(self):
+        with patch(
+            "backend.core.prewarm.fetch_weather", return_value=dict(WEATHER)
+        ) as fetch:
+            yield fetch
+
+    def _scheduler(self, agent=None, **kwargs):
+        async def get_agent():
+            return agent
+
+        return PrewarmScheduler(get_agent, **kwargs)
+
+    async def test_refreshes_missing_weather(self, fake_cache, fetch_weather):
+        from mcp_server.server import get_weather
+
+        fake_cache.track_popularity("weather", "Recife,BR")
+
+        refreshed = await self._scheduler().tick()
+
+        assert refreshed["weather"] == 1
+        fetch_weather.assert_called_once_with("Recife", "BR")
+        assert get_weather("Recife", "BR") == WEATHER
+        assert fake_cache.get_metric("prewarm_hit:weather") == 1
+        assert fake_cache.get_metric("prewarm_refresh:weather") == 1
+
+    async def test_skips_fresh_entries(self, fake_cache, fetch_weather):
+        key = fake_cache.make_namespaced_key("weather", "Recife,BR")
+        fake_cache.set(key, WEATHER, ttl=1800)
+        fake_cache.track_popularity("weather", "Recife,BR")
+
+        refreshed = await self._scheduler(lead_seconds=120).tick()
+
+        assert refreshed["weather"] == 0
+        fetch_weather.assert_not_called()
+
+    async def test_upstream_budget(self, fake_cache, fetch_weather):
+        for city in ("Recife,BR", "Natal,BR", "Belém,BR"):
+            fake_cache.track_popularity("weather", city)
+
+        scheduler = self._scheduler(budgets={"weather": 2, "llm_query": 0})
+        refreshed = await scheduler.tick()
+
+        assert refreshed["weather"] == 2
+        assert fake_cache.get_metric("prewarm_budget_exhausted:weather") == 1
+
+    async def test_global_rate_limit(self, fake_cache, fetch_weather):
+        for city in ("Recife,BR", "Natal,BR", "Belém,BR"):
+            fake_cache.track_popularity("weather", city)
+
+        refreshed = await self._scheduler(rate_per_minute=1).tick()
+
+        assert refreshed["weather"] == 1
+        assert fake_cache.get_metric("prewarm_rate_limited") == 1
+
+    async def test_refused_entries_are_unlocked(
+        self, fake_cache, fetch_weather
+    ):
+        for city in ("Recife,BR", "Natal,BR", "Belém,BR"):
+            fake_cache.track_popularity("weather", city)
+
+        await self._scheduler(rate_per_minute=1).tick()
+        refreshed = await self._scheduler(rate_per_minute=10).tick()
+
+        assert refreshed["weather"] == 2
+
+    async def test_refreshes_llm_answer(self, fake_cache, monkeypatch):
+        monkeypatch.setenv("PREWARM_ENABLED", "true")
+        assistant = AIAssistant()
+        message = type("Msg", (), {"content": "Olá!", "tool_calls": []})()
+        assistant.agent = AsyncMock()
+        assistant.agent.ainvoke = AsyncMock(
+            return_value={"messages": [message]}
+        )
+
+        await assistant.process_query("oi")
+        key = assistant.response_cache_key("oi")
+        fake_cache.delete(key)
+
+        refreshed = await self._scheduler(assistant).tick()
+        result = await assistant.process_query("oi")
+
+        assert refreshed["llm_query"] == 1
+        assert result["cached"] is True
+        assert PREWARMED_FIELD not in result
+        assert fake_cache.get_metric("prewarm_hit:llm_query") == 1
+        # A renovação não conta como uso: só a primeira query registra
+        assert fake_cache.get_metric("requests_path:direct") == 1
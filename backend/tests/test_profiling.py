@@ -0,0 +1,160 @@
+import threading
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage
+from starlette.requests import Request
+
+from backend.api import debug
+from backend.utils.profiling import (
+    AllocationTracker, ProfilerBusy, SamplingProfiler
+)
+
+TOKEN = "segredo"
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("DEBUG_ENDPOINTS_TOKEN", TOKEN)
+    app = FastAPI()
+    app.include_router(debug.router)
+    yield TestClient(app)
+    debug.get_tracker().stop()
+
+
+class TestSamplingProfiler:
+    def test_collapsed_stacks(self, busy_thread):
+        profiler = SamplingProfiler(interval=0.005).run(0.2)
+
+        assert profiler.samples > 0
+        lines = profiler.collapsed().splitlines()
+        busy = [line for line in lines if line.startswith("busy;")]
+        assert busy
+        stack, count = busy[0].rsplit(" ", 1)
+        assert "busy_loop (test_profiling.py:" in stack
+        assert int(count) > 0
+
+    def test_idle_threads_skipped(self):
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait, name="idle")
+        thread.start()
+        try:
+            profiler = SamplingProfiler(interval=0.005).run(0.05)
+            with_idle = SamplingProfiler(0.005, include_idle=True).run(0.05)
+        finally:
+            stop.set()
+            thread.join()
+
+        assert "idle;" not in profiler.collapsed()
+        assert "idle;" in with_idle.collapsed()
+
+    def test_one_profile_at_a_time(self):
+        SamplingProfiler._lock.acquire()
+        try:
+            with pytest.raises(ProfilerBusy):
+                SamplingProfiler().run(0.01)
+        finally:
+            SamplingProfiler._lock.release()
+
+
+class TestAllocationTracker:
+    def test_diff_shows_new_allocations(self):
+        tracker = AllocationTracker()
+        try:
+            first = tracker.snapshot()
+            retained = [HumanMessage(content="x" * 100) for _ in range(200)]
+            second = tracker.snapshot(limit=50, include="*test_profiling*")
+        finally:
+            tracker.stop()
+
+        assert first["diff"] == []
+        assert any(
+            "test_profiling.py" in stat["site"] and stat["size_diff_bytes"] > 0
+            for stat in second["diff"]
+        )
+        del retained
+
+
+class TestDebugEndpoints:
+    def test_disabled_without_token(self, monkeypatch):
+        monkeypatch.delenv("DEBUG_ENDPOINTS_TOKEN", raising=False)
+        app = FastAPI()
+        app.include_router(debug.router)
+
+        response = TestClient(app).get("/debug/allocations")
+
+        assert response.status_code == 404
+
+    def test_wrong_token(self, client):
+        response = client.get(
+            "/debug/allocations", headers={"X-Debug-Token": "errado"}
+        )
+        assert response.status_code == 403
+
+    def test_profile(self, client, busy_thread):
+        response = client.get(
+            "/debug/profile",
+            params={"seconds": 0.1, "interval_ms": 5},
+            headers={"X-Debug-Token": TOKEN},
+        )
+
+        assert response.status_code == 200
+        assert int(response.headers["X-Profile-Samples"]) > 0
+        assert "busy_loop" in response.text
+
+    def test_allocations_count_messages(self, client):
+        headers = {"X-Debug-Token": TOKEN}
+        retained = [AIMessage(content="resposta") for _ in range(50)]
+
+        response = client.get("/debug/allocations", headers=headers)
+
+        body = response.json()
+        assert body["retained"]["messages"]["AIMessage"]["count"] >= 50
+        assert body["traced_bytes"] > 0
+        del retained
+
+
+class TestMCPDebugEndpoints:
+    def _request(self, path, query=b"", token=TOKEN):
+        return Request({
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": query,
+            "headers": [(b"x-debug-token", token.encode())],
+        })
+
+    async def test_profile(self, monkeypatch):
+        from mcp_server.server import debug_profile
+
+        monkeypatch.setenv("DEBUG_ENDPOINTS_TOKEN", TOKEN)
+        response = await debug_profile(
+            self._request("/debug/profile", b"seconds=0.05&idle=true")
+        )
+
+        assert response.status_code == 200
+        assert int(response.headers["X-Profile-Samples"]) > 0
+
+    async def test_forbidden(self, monkeypatch):
+        from mcp_server.server import debug_allocations
+
+        monkeypatch.setenv("DEBUG_ENDPOINTS_TOKEN", TOKEN)
+        response = await debug_allocations(
+            self._request("/debug/allocations", token="errado")
+        )
+        assert response.status_code == 403
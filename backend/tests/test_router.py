@@ -0,0 +1,112 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import (
+    FakeMessagesListChatModel
+)
+from langchain_core.messages import AIMessage
+
+from backend.core.agent import AIAssistant
+from backend.core.router import (
+    FAST, STRONG, ModelRouter, classify_query, estimate_cost,
+    validate_answer
+)
+
+
+class TestClassify:
+    @pytest.mark.parametrize("query", [
+        "oi", "Olá, tudo bem?", "obrigado!", "Qual o clima em Recife?",
+        "Quanto é 128 * 46?",
+    ])
+    def test_fast(self, query):
+        assert classify_query(query) == FAST
+
+    @pytest.mark.parametrize("query", [
+        "Explique por que o céu é azul",
+        "Compare Python e Go para APIs",
+        "Qual a capital da França? E da Alemanha?",
+        " ".join(["palavra"] * 40),
+    ])
+    def test_strong(self, query):
+        assert classify_query(query) == STRONG
+
+
+class TestValidate:
+    def test_accepts_answer(self):
+        assert validate_answer("Em Recife faz 28°C, céu limpo.")
+
+    @pytest.mark.parametrize("answer", [
+        "", "   ", None, "Não sei responder isso.",
+        "Erro ao executar tool get_weather: timeout",
+    ])
+    def test_rejects(self, answer):
+        assert not validate_answer(answer)
+
+    def test_cost_uses_model_prices(self):
+        usage = {"prompt_tokens": 1_000_000, "completion_tokens": 0}
+        assert estimate_cost(usage, "gpt-4o") > estimate_cost(
+            usage, "gpt-4o-mini"
+        )
+
+
+class TestRoutedAgent:
+    @pytest.fixture
+    def make_assistant(self):
+        def make(fast_answer, strong_answer="Resposta do modelo forte."):
+            answers = {
+                "fast-model": fast_answer, "strong-model": strong_answer
+            }
+            calls = []
+
+            def llm_factory(model, temperature):
+                calls.append(model)
+                return FakeMessagesListChatModel(
+                    responses=[AIMessage(content=answers[model])] * 10
+                )
+
+            assistant = AIAssistant()
+            assistant.router = ModelRouter(
+                fast_model="fast-model",
+                strong_model="strong-model",
+                llm_factory=llm_factory,
+            )
+            assistant.router.build([])
+            assistant.agent = object()
+            return assistant
+
+        return make
+
+    async def test_fast_route(self, fake_cache, make_assistant):
+        assistant = make_assistant("Olá! Como posso ajudar?")
+        result = await assistant.process_query("oi")
+
+        assert result["route"] == FAST
+        assert result["response"] == "Olá! Como posso ajudar?"
+        assert fake_cache.get_metric("route_requests:fast") == 1
+        assert fake_cache.get_metric("route_requests:strong") == 0
+        assert fake_cache.get_metric("route_cost_micro_usd:fast") > 0
+
+    async def test_escalates_invalid_answer(self, fake_cache, make_assistant):
+        assistant = make_assistant("Não sei.")
+        result = await assistant.process_query("Qual o clima em Recife?")
+
+        assert result["route"] == STRONG
+        assert result["response"] == "Resposta do modelo forte."
+        assert fake_cache.get_metric("route_escalations") == 1
+        assert fake_cache.get_metric("route_requests:fast") == 1
+        assert fake_cache.get_metric("route_requests:strong") == 1
+
+    async def test_strong_route(self, fake_cache, make_assistant):
+        assistant = make_assistant("nunca usada")
+        result = await assistant.process_query("Explique a fotossíntese")
+
+        assert result["route"] == STRONG
+        assert fake_cache.get_metric("route_requests:fast") == 0
+
+    async def test_cache_key_per_route_model(
+        self, fake_cache, make_assistant
+    ):
+        assistant = make_assistant("Olá!")
+        await assistant.process_query("oi")
+        cached = await assistant.process_query("oi")
+
+        assert cached["cached"] is True
+        assert fake_cache.get_metric("route_requests:fast") == 1
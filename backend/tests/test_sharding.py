@@ -0,0 +1,316 @@
+import time
+import shutil
+import socket
+import subprocess
+import pytest
+import redis
+
+from backend.tests.conftest import FakeRedis
+from backend.utils.cache import RedisCache
+from backend.utils.sharding import (
+    HashRing, ShardedRedis, ShardUnavailable, parse_nodes, rebalance
+)
+
+NODES = ["redis-a:6379", "redis-b:6379", "redis-c:6379"]
+
+
+def fake_sharded(nodes, fakes=None):
+    fakes = {} if fakes is None else fakes
+    return ShardedRedis(
+        nodes, client_factory=lambda node: fakes.setdefault(node, FakeRedis())
+    ), fakes
+
+
+def take_down(fake):
+    """Faz todos os comandos do nó falharem com erro de conexão."""
+    def refuse(*args, **kwargs):
+        raise redis.ConnectionError("recusada")
+
+    for name in ("ping", "get", "set", "setex", "mget", "incrby", "pipeline"):
+        setattr(fake, name, refuse)
+
+
+class TestHashRing:
+    def test_parse_nodes(self):
+        assert parse_nodes("a:6380, b ,") == ["a:6380", "b:6379"]
+
+    def test_balanced(self):
+        ring = HashRing(NODES)
+        counts = {node: 0 for node in NODES}
+        for i in range(30000):
+            counts[ring.node_for(f"llm_query:{i}")] += 1
+
+        for count in counts.values():
+            assert 10000 * 0.8 < count < 10000 * 1.2
+
+    def test_adding_node_moves_only_its_share(self):
+        before = HashRing(NODES)
+        after = HashRing(NODES + ["redis-d:6379"])
+        keys = [f"weather:{i}" for i in range(20000)]
+
+        moved = [k for k in keys if before.node_for(k) != after.node_for(k)]
+
+        assert 0.15 < len(moved) / len(keys) < 0.35
+        assert all(after.node_for(k) == "redis-d:6379" for k in moved)
+
+    def test_pinned_and_hash_tags(self):
+        ring = HashRing(NODES)
+        for key in ("metric:cache_hit_llm", "metric_ts:x:10:0",
+                    "metric_labels:tools", "popular:weather:12"):
+            assert ring.node_for(key) == NODES[0]
+        assert len({ring.node_for(f"{{sessao}}:{i}") for i in range(50)}) == 1
+
+
+class TestShardedRedis:
+    def test_keys_spread_and_mget_order(self):
+        sharded, fakes = fake_sharded(NODES)
+        keys = [f"k{i}" for i in range(60)]
+        for i, key in enumerate(keys):
+            sharded.set(key, i)
+
+        assert all(fake.data for fake in fakes.values())
+        assert sharded.mget(keys + ["ausente"]) == [
+            str(i) for i in range(60)
+        ] + [None]
+
+    def test_pipeline_keeps_order(self):
+        sharded, _ = fake_sharded(NODES)
+        pipe = sharded.pipeline(transaction=False)
+        for i in range(20):
+            pipe.incrby(f"contador:{i}", i)
+
+        assert pipe.execute() == list(range(20))
+
+    def test_delete_across_nodes(self):
+        sharded, _ = fake_sharded(NODES)
+        keys = [f"k{i}" for i in range(20)]
+        for key in keys:
+            sharded.set(key, 1)
+
+        assert sharded.delete(*keys) == 20
+        assert sharded.mget(keys) == [None] * 20
+
+    def test_zunionstore_requires_same_node(self):
+        sharded, _ = fake_sharded(NODES)
+        keys = [f"z{i}" for i in range(20)]
+        other = next(
+            k for k in keys
+            if sharded.ring.node_for(k) != sharded.ring.node_for("z0")
+        )
+        with pytest.raises(redis.ResponseError):
+            sharded.zunionstore("z0", {other: 1})
+
+    def test_down_node_only_misses_its_keys(self):
+        sharded, fakes = fake_sharded(NODES)
+        keys = [f"k{i}" for i in range(30)]
+        for key in keys:
+            sharded.set(key, 1)
+        down = NODES[1]
+        take_down(fakes[down])
+
+        assert sharded.ping()
+        values = sharded.mget(keys)
+        for key, value in zip(keys, values):
+            expected = None if sharded.ring.node_for(key) == down else "1"
+            assert value == expected
+        assert not sharded.healthy(down)
+
+        down_key = next(k for k in keys if sharded.ring.node_for(k) == down)
+        with pytest.raises(ShardUnavailable):
+            sharded.get(down_key)
+
+    def test_node_retried_after_interval(self):
+        sharded, fakes = fake_sharded(NODES)
+        sharded.retry_seconds = 0
+        key = next(
+            f"k{i}" for i in range(100)
+            if sharded.ring.node_for(f"k{i}") == NODES[1]
+        )
+        original = fakes[NODES[1]].get
+        take_down(fakes[NODES[1]])
+        with pytest.raises(ShardUnavailable):
+            sharded.get(key)
+
+        fakes[NODES[1]].get = original
+        assert sharded.get(key) is None
+        assert sharded.healthy(NODES[1])
+
+    def test_all_nodes_down(self):
+        sharded, fakes = fake_sharded(NODES)
+        for fake in fakes.values():
+            take_down(fake)
+        with pytest.raises(redis.ConnectionError):
+            sharded.ping()
+
+
+class TestShardedCache:
+    @pytest.fixture
+    def sharded_cache(self, monkeypatch):
+        sharded, fakes = fake_sharded(NODES)
+        redis_cache = RedisCache()
+        monkeypatch.setattr(redis_cache, "enabled", True)
+        monkeypatch.setattr(redis_cache, "_client", sharded)
+        redis_cache.fakes = fakes
+        return redis_cache
+
+    def test_metrics_stay_on_first_node(self, sharded_cache):
+        for i in range(10):
+            sharded_cache.increment_metrics({f"metrica_{i}": 2})
+
+        assert sharded_cache.get_metric("metrica_3") == 2
+        windowed = sharded_cache.get_windowed_metrics(["metrica_3"], ["1m"])
+        assert windowed == {"metrica_3": {"1m": 2}}
+        for node in NODES[1:]:
+            keys = sharded_cache.fakes[node].data
+            assert not any(key.startswith("metric") for key in keys)
+
+    def test_down_shard_keeps_client(self, sharded_cache):
+        sharded = sharded_cache._client
+        keys = [f"llm_query:{i}" for i in range(30)]
+        for i, key in enumerate(keys):
+            sharded_cache.set(key, {"response": i})
+        take_down(sharded_cache.fakes[NODES[2]])
+
+        hits = [sharded_cache.get(key) for key in keys]
+
+        assert sharded_cache._client is sharded
+        assert all(
+            (hit is None) == (sharded.ring.node_for(key) == NODES[2])
+            for key, hit in zip(keys, hits)
+        )
+
+    def test_popularity_rollover(self, sharded_cache):
+        sharded_cache.track_popularity("weather", "Recife,BR")
+        assert sharded_cache.top_popular("weather", 5)[0][0] == "Recife,BR"
+
+
+class TestRebalance:
+    def test_moves_keys_to_new_node(self):
+        fakes = {}
+        old, _ = fake_sharded(NODES[:2], fakes)
+        for i in range(200):
+            old.set(f"llm_query:{i}", i, ex=600)
+        old.incrby("metric:total", 5)
+
+        new, _ = fake_sharded(NODES, fakes)
+        stats = rebalance(new)
+
+        assert 0 < stats["moved"] < 200
+        assert stats["scanned"] >= 201
+        for node, fake in fakes.items():
+            assert all(new.ring.node_for(key) == node for key in fake.data)
+        assert new.mget([f"llm_query:{i}" for i in range(200)]) == [
+            str(i) for i in range(200)
+        ]
+        moved_key = next(iter(fakes[NODES[2]].data))
+        assert 0 < new.ttl(moved_key) <= 600
+        assert rebalance(new)["moved"] == 0
+
+    def test_key_expiring_during_scan_is_not_made_persistent(
+        self, monkeypatch
+    ):
+        fakes = {}
+        old, _ = fake_sharded(NODES[:1], fakes)
+        new, _ = fake_sharded(NODES[:2], fakes)
+        key = next(
+            f"k{i}" for i in range(100)
+            if new.ring.node_for(f"k{i}") == NODES[1]
+        )
+        old.set(key, "valor", ex=1)
+        # Expira entre o DUMP e o PTTL
+        monkeypatch.setattr(fakes[NODES[0]], "pttl", lambda key: -2)
+
+        stats = rebalance(new)
+
+        assert stats["moved"] == 0
+        assert key not in fakes[NODES[1]].data
+
+    def test_newer_value_on_owner_wins(self):
+        fakes = {}
+        old, _ = fake_sharded(NODES[:1], fakes)
+        new, _ = fake_sharded(NODES[:2], fakes)
+        key = next(
+            f"k{i}" for i in range(100)
+            if new.ring.node_for(f"k{i}") == NODES[1]
+        )
+        old.set(key, "antigo")
+        new.set(key, "novo")
+
+        stats = rebalance(new)
+
+        assert stats["skipped"] == 1
+        assert new.get(key) == "novo"
+        assert key not in fakes[NODES[0]].data
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def redis_servers():
+    """Sobe três redis-server locais (pula se não instalado)."""
+    if not shutil.which("redis-server"):
+        pytest.skip("redis-server não instalado")
+    processes, nodes = [], []
+    for _ in range(3):
+        port = _free_port()
+        processes.append(subprocess.Popen(
+            ["redis-server", "--port", str(port), "--save", "",
+             "--appendonly", "no"],
+            stdout=subprocess.DEVNULL,
+        ))
+        nodes.append(f"127.0.0.1:{port}")
+    try:
+        for node in nodes:
+            client = redis.Redis.from_url(f"redis://{node}")
+            for _ in range(100):
+                try:
+                    client.ping()
+                    break
+                except redis.ConnectionError:
+                    time.sleep(0.05)
+        yield nodes
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+class TestRedisServers:
+    def test_sharded_cache(self, redis_servers, monkeypatch):
+        monkeypatch.setenv("REDIS_ENABLED", "true")
+        monkeypatch.setenv("REDIS_NODES", ",".join(redis_servers))
+        redis_cache = RedisCache()
+
+        assert redis_cache.connect()
+        for i in range(300):
+            redis_cache.set(f"llm_query:{i}", {"response": i}, ttl=60)
+            redis_cache.increment_metric("cache_hit_llm")
+
+        sharded = redis_cache.client
+        assert all(c.dbsize() > 0 for c in sharded.clients.values())
+        assert redis_cache.get("llm_query:42") == {"response": 42}
+        assert redis_cache.get_metric("cache_hit_llm") == 300
+        assert redis_cache.get_windowed_metrics(
+            ["cache_hit_llm"], ["1m"]
+        ) == {"cache_hit_llm": {"1m": 300}}
+        sharded.close()
+
+    def test_rebalance_after_adding_node(self, redis_servers):
+        old = ShardedRedis(redis_servers[:2])
+        for i in range(300):
+            old.set(f"weather:{i}", i, ex=600)
+
+        new = ShardedRedis(redis_servers)
+        stats = rebalance(new)
+
+        assert stats["moved"] > 0
+        assert new.clients[redis_servers[2]].dbsize() == stats["moved"]
+        assert new.mget([f"weather:{i}" for i in range(300)]) == [
+            str(i) for i in range(300)
+        ]
+        old.close()
+        new.close()
@@ -0,0 +1,99 @@
+from unittest.mock import AsyncMock
+from langchain_core.messages import (
+    AIMessage, HumanMessage, SystemMessage, ToolMessage
+)
+
+from backend.core.agent import AIAssistant
+from backend.core.tokens import count_tokens, extract_usage, tool_path
+
+
+class TestTokenAccounting:
+    def test_usage_metadata_is_summed(self):
+        messages = [
+            SystemMessage(content="sistema"),
+            HumanMessage(content="Quanto é 2 + 2?"),
+            AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": "calculator", "args": {"expression": "2+2"},
+                    "id": "1"
+                }],
+                usage_metadata={
+                    "input_tokens": 100, "output_tokens": 10,
+                    "total_tokens": 110
+                },
+            ),
+            ToolMessage(content="2+2 = 4", tool_call_id="1"),
+            AIMessage(
+                content="2 + 2 é igual a 4.",
+                usage_metadata={
+                    "input_tokens": 120, "output_tokens": 8,
+                    "total_tokens": 128
+                },
+            ),
+        ]
+        usage = extract_usage(messages)
+        assert usage["prompt_tokens"] == 220
+        assert usage["completion_tokens"] == 18
+        assert usage["total_tokens"] == 238
+        assert usage["llm_calls"] == 2
+        assert usage["estimated"] is False
+
+    def test_estimates_without_metadata(self):
+        messages = [
+            SystemMessage(content="sistema " * 50),
+            HumanMessage(content="Qual a capital da França?"),
+            AIMessage(content="A capital da França é Paris."),
+        ]
+        usage = extract_usage(messages, tools_text="calculator: contas")
+        assert usage["estimated"] is True
+        assert usage["prompt_tokens"] > usage["completion_tokens"] > 0
+
+    def test_count_tokens_empty(self):
+        assert count_tokens("") == 0
+
+    def test_tool_path(self):
+        assert tool_path([]) == "direct"
+        assert tool_path(["get_weather", "calculator", "calculator"]) == (
+            "calculator+get_weather"
+        )
+
+
+class TestPromptSelection:
+    def test_fixed_variant(self):
+        assistant = AIAssistant()
+        assistant.prompt_variant = "compact"
+        assert assistant._select_prompt("oi") == "compact"
+
+    def test_ab_is_deterministic(self):
+        assistant = AIAssistant()
+        assistant.prompt_variant = "ab"
+        variants = {assistant._select_prompt(f"q{i}") for i in range(50)}
+        assert variants == {"full", "compact"}
+        assert assistant._select_prompt("q1") == assistant._select_prompt(
+            "q1")
+
+    def test_variants_use_different_cache_keys(self):
+        assistant = AIAssistant()
+        assert assistant._cache_params("full") != assistant._cache_params(
+            "compact")
+
+
+class TestUsageMetrics:
+    async def test_process_query_records_tokens(self, fake_cache):
+        assistant = AIAssistant()
+        assistant.agent = AsyncMock()
+        assistant.agent.ainvoke = AsyncMock(return_value={"messages": [
+            SystemMessage(content="sistema"),
+            HumanMessage(content="oi"),
+            AIMessage(content="Olá!", usage_metadata={
+                "input_tokens": 50, "output_tokens": 5, "total_tokens": 55
+            }),
+        ]})
+
+        result = await assistant.process_query("oi")
+
+        assert result["usage"]["prompt_tokens"] == 50
+        assert fake_cache.get_metric("tokens_prompt:direct") == 50
+        assert fake_cache.get_metric("tokens_completion:direct") == 5
+        assert fake_cache.get_metric_labels("token_paths") == ["direct"]
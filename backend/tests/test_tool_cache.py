@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from backend.core.agent import AIAssistant
+from backend.core.tool_cache import ToolResultCache, normalize_arguments
+
+
+class TestNormalization:
+    def test_calculator_ignores_whitespace(self):
+        assert normalize_arguments(
+            "calculator", {"expression": " 2 +  2"}
+        ) == normalize_arguments("calculator", {"expression": "2+2"})
+
+    def test_weather_ignores_case(self):
+        assert normalize_arguments(
+            "get_weather", {"city": "São  Paulo ", "country_code": "br"}
+        ) == normalize_arguments(
+            "get_weather", {"city": "são paulo", "country_code": "BR"}
+        )
+
+
+class TestToolResultCache:
+    async def test_hit_skips_fetch(self, fake_cache):
+        tool_cache = ToolResultCache()
+        fetch = AsyncMock(return_value={"result": 4, "formatted": "2+2 = 4"})
+
+        await tool_cache.call("calculator", {"expression": "2+2"}, fetch)
+        result = await tool_cache.call(
+            "calculator", {"expression": "2 + 2"}, fetch
+        )
+
+        assert result["result"] == 4
+        assert fetch.await_count == 1
+        assert fake_cache.get_metric("cache_hit_tool:calculator") == 1
+
+    async def test_shared_across_instances_via_redis(self, fake_cache):
+        fetch = AsyncMock(return_value={"result": 4})
+        await ToolResultCache().call(
+            "calculator", {"expression": "2+2"}, fetch)
+        await ToolResultCache().call(
+            "calculator", {"expression": "2+2"}, fetch)
+        assert fetch.await_count == 1
+
+    async def test_pure_tool_never_expires(self, fake_cache):
+        fetch = AsyncMock(return_value={"result": 4})
+        tool_cache = ToolResultCache()
+        await tool_cache.call("calculator", {"expression": "2+2"}, fetch)
+
+        key = tool_cache.make_key("calculator", {"expression": "2+2"})
+        assert fake_cache.client.ttl(key) == -1
+
+    async def test_pure_errors_are_cached(self, fake_cache):
+        fetch = AsyncMock(return_value={"error": "Divisão por zero"})
+        tool_cache = ToolResultCache()
+        for _ in range(2):
+            await tool_cache.call("calculator", {"expression": "1/0"}, fetch)
+        assert fetch.await_count == 1
+
+    async def test_timeouts_are_not_cached(self, fake_cache):
+        fetch = AsyncMock(return_value={
+            "error": "Tempo limite de 10s excedido", "transient": True
+        })
+        tool_cache = ToolResultCache()
+        for _ in range(2):
+            await tool_cache.call("calculator", {"expression": "9^9^8"}, fetch)
+        assert fetch.await_count == 2
+        assert tool_cache.get("calculator", {"expression": "9^9^8"}) is None
+
+    async def test_impure_errors_are_not_cached(self, fake_cache):
+        fetch = AsyncMock(return_value={"error": "Erro HTTP 500"})
+        tool_cache = ToolResultCache()
+        for _ in range(2):
+            await tool_cache.call("get_weather", {"city": "Recife"}, fetch)
+        assert fetch.await_count == 2
+
+    async def test_weather_follows_ttl(self, fake_cache):
+        tool_cache = ToolResultCache()
+        fetch = AsyncMock(return_value={"formatted": "Recife: 30°C"})
+        await tool_cache.call("get_weather", {"city": "Recife"}, fetch)
+
+        key = tool_cache.make_key("get_weather", {"city": "Recife"})
+        assert 0 < fake_cache.client.ttl(key) <= 1800
+
+    async def test_unknown_tool_not_cached(self, fake_cache):
+        fetch = AsyncMock(return_value={"result": 1})
+        tool_cache = ToolResultCache()
+        for _ in range(2):
+            await tool_cache.call("other", {"expression": "x"}, fetch)
+        assert fetch.await_count == 2
+
+
+class TestAgentToolWrapper:
+    async def test_repeated_call_skips_mcp(self, fake_cache):
+        assistant = AIAssistant()
+        assistant._call_mcp_tool = AsyncMock(
+            return_value={"result": 5888, "formatted": "128 * 46 = 5888"}
+        )
+        tool = assistant._create_langchain_tool(
+            SimpleNamespace(name="calculator", description="Calculadora")
+        )
+
+        first = await tool.coroutine("128 * 46")
+        second = await tool.coroutine("128*46")
+
+        assert first == second == "128 * 46 = 5888"
+        assert assistant._call_mcp_tool.await_count == 1
+
+    def test_parse_tool_result(self):
+        assistant = AIAssistant()
+        content = [SimpleNamespace(text='{"result": 4}')]
+        assert assistant._parse_tool_result(content) == {"result": 4}
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+import mcp_server.server as server
+from mcp_server.tools.ingest import ingest
+from mcp_server.tools.text import iter_chunks
+from mcp_server.tools.vectors import (
+    HashingEmbedder, VectorBuilder, VectorIndex, build_vector_index
+)
+
+DOCUMENTS = {
+    "chuva.txt": "Dias chuvosos são comuns no verão, com temporais à tarde.",
+    "praia.txt": "As praias do litoral norte têm areia clara e mar calmo.",
+    "comida.txt": "A feijoada é servida com arroz, couve e laranja.",
+}
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    docs = tmp_path / "documents"
+    docs.mkdir()
+    for name, text in DOCUMENTS.items():
+        (docs / name).write_text(text, encoding="utf-8")
+    return docs
+
+
+@pytest.fixture
+def vector_index(docs_dir, tmp_path):
+    docs = docs_dir
+    index_dir = tmp_path / "vectors"
+    build_vector_index(iter_chunks(str(docs)), str(index_dir))
+    index = VectorIndex(str(index_dir))
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def random_index(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((2000, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    builder = VectorBuilder(HashingEmbedder(dim=32))
+    builder.add_vectors(vectors)
+    builder.write(str(tmp_path), ivf_lists=16)
+    return VectorIndex(str(tmp_path), with_store=False), vectors
+
+
+class TestHashingEmbedder:
+    def test_normalized(self):
+        vector = HashingEmbedder().embed("Previsão de chuva")
+        assert vector.dtype == np.float32
+        assert np.isclose(np.linalg.norm(vector), 1.0)
+
+    def test_morphology_is_closer(self):
+        embedder = HashingEmbedder()
+        query = embedder.embed("vai chover")
+        assert query @ embedder.embed("chuvoso") > query @ embedder.embed(
+            "feijoada")
+
+
+class TestVectorIndex:
+    def test_semantic_search(self, vector_index):
+        results = vector_index.search(
+            "temporal com chuva", top_k=1, mode="exact")
+        assert results[0]["source"] == "chuva.txt"
+
+    def test_embeddings_memory_mapped(self, vector_index):
+        assert isinstance(vector_index.embeddings, np.memmap)
+
+    def test_exact_matches_brute_force(self, random_index):
+        index, vectors = random_index
+        queries = vectors[:5]
+        ids, scores = index.exact_search(queries, 10)
+        expected = np.argsort(-(queries @ vectors.T), axis=1)[:, :10]
+        assert np.array_equal(ids, expected)
+        assert np.all(np.diff(scores, axis=1) <= 0)
+
+    def test_ivf_probing_all_lists_is_exact(self, random_index):
+        index, vectors = random_index
+        exact_ids, _ = index.exact_search(vectors[:5], 10)
+        ivf_ids, _ = index.ivf_search(vectors[:5], 10, nprobe=16)
+        assert np.array_equal(exact_ids, ivf_ids)
+
+    def test_empty_env_uses_default_mode(self, random_index, monkeypatch):
+        index, _ = random_index
+        monkeypatch.setenv("VECTOR_SEARCH_MODE", "")
+        monkeypatch.setenv("VECTOR_IVF_NPROBE", "")
+        probes = []
+
+        def ivf_search(vector, k, nprobe):
+            probes.append(nprobe)
+            return np.full((1, k), -1), np.zeros((1, k))
+
+        monkeypatch.setattr(index, "ivf_search", ivf_search)
+        assert index.search("chuva", top_k=3) == []
+        assert probes == [8]
+
+    def test_float16_storage(self, tmp_path):
+        builder = VectorBuilder(HashingEmbedder(dim=16))
+        builder.add("teste")
+        builder.write(str(tmp_path), dtype="float16")
+        index = VectorIndex(str(tmp_path), with_store=False)
+        assert index.embeddings.dtype == np.float16
+
+
+class TestSemanticSearchTool:
+    def test_search(self, docs_dir, tmp_path, monkeypatch):
+        ingest(str(docs_dir), str(tmp_path / "index"), workers=1)
+        monkeypatch.setattr(server, "_document_index", None)
+        monkeypatch.setenv("INDEX_DIR", str(tmp_path / "index"))
+        result = server.semantic_search_documents("praia com mar", top_k=1)
+        assert result["results"][0]["source"] == "praia.txt"
+
+    def test_missing_index(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(server, "_document_index", None)
+        monkeypatch.setenv("INDEX_DIR", str(tmp_path / "nada"))
+        assert "error" in server.semantic_search_documents("praia")
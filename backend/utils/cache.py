@@ -3,48 +3,254 @@ Sistema de cache com Redis para respostas LLM e API externa.
 """
 import os
 import json
+import time
 import hashlib
-from typing import Optional, Any
+import inspect
+import functools
+import threading
+from typing import Optional, Any, Callable, Dict, List, Tuple, Union
 import redis
 from backend.utils.logger import setup_logger
+from backend.utils.sharding import ShardUnavailable, sharded_from_env
 
 logger = setup_logger(__name__)
 
+# Buckets das métricas por janela: (resolução em segundos, buckets
+# mantidos). Cada incremento atualiza o bucket corrente de cada resolução
+METRIC_RESOLUTIONS = ((10, 30), (60, 60))
+METRIC_WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+
+# Popularidade com decaimento exponencial (forward decay): cada acesso
+# soma 2^(t / meia-vida) ao sorted set, então a ordem dos membros é a da
+# contagem decaída. Para o peso não crescer sem limite, o tempo é
+# dividido em eras de POPULARITY_ERA_HALF_LIVES meias-vidas com um
+# sorted set cada; a era anterior entra na nova multiplicada por 2^-N.
+POPULARITY_HALF_LIFE = float(os.getenv("POPULARITY_HALF_LIFE_SECONDS", 3600))
+POPULARITY_ERA_HALF_LIVES = 32
+POPULARITY_MAX_MEMBERS = int(os.getenv("POPULARITY_MAX_MEMBERS", 1000))
+
+# Campos internos dos valores gravados pelo @cached: entrada gravada pelo
+# pré-aquecimento (backend/core/prewarm.py) e exceção memoizada
+PREWARMED_FIELD = "_prewarmed"
+CACHED_ERROR_FIELD = "_cached_error"
+# Marcador de uso único de uma entrada pré-aquecida (ver set_prewarmed)
+PREWARMED_MARKER_PREFIX = "prewarmed:"
+
+TTL = Union[int, None, Callable[..., Optional[int]]]
+
+
+class CachedError(RuntimeError):
+    """Exceção memoizada pelo cache negativo, relançada em um hit."""
+
+
+def is_error_result(result: Any) -> bool:
+    return isinstance(result, dict) and "error" in result
+
+
+def is_transient_result(result: Any) -> bool:
+    """Erro passageiro (timeout, prazo esgotado): nunca vai para o cache."""
+    return is_error_result(result) and bool(result.get("transient"))
+
+
+def _close_client(client: Any) -> None:
+    """Fecha pools de conexão (e threads, no modo shardeado) do cliente."""
+    if client is None:
+        return
+    try:
+        client.close()
+    except Exception as e:
+        logger.debug(f"Erro ao fechar cliente Redis: {e}")
+
+
+def _resolve_ttl(ttl: TTL, args, kwargs) -> Optional[int]:
+    return ttl(*args, **kwargs) if callable(ttl) else ttl
+
 
 class RedisCache:
-    """Cliente Redis para caching."""
+    """
+    Cliente Redis para caching.
+
+    A conexão é lazy: nada é feito no import nem no construtor. O
+    primeiro acesso a `client` dispara a conexão em uma thread de
+    background e, até ela concluir (ou enquanto o Redis estiver fora),
+    as operações se comportam como cache desabilitado (miss). Uma falha
+    agenda nova tentativa após REDIS_RECONNECT_SECONDS.
+    """
 
     def __init__(self):
         self.enabled = os.getenv("REDIS_ENABLED", "true").lower() == "true"
-
         if not self.enabled:
             logger.info("Redis cache desabilitado")
-            self.client = None
-            return
 
+        self._client: Optional[redis.Redis] = None
+        self._connect_lock = threading.Lock()
+        self._connecting = False
+        self._next_attempt = 0.0
+        self._reconnect_interval = float(
+            os.getenv("REDIS_RECONNECT_SECONDS", 5)
+        )
+
+        self._generation_refresh = float(
+            os.getenv("CACHE_GENERATION_REFRESH_SECONDS", 1)
+        )
+        self._generations: Dict[str, Tuple[int, float]] = {}
+
+    @property
+    def client(self) -> Optional[redis.Redis]:
+        """Cliente conectado, ou None (dispara a conexão em background)."""
+        if self._client is None and self.enabled:
+            self.connect(wait=False)
+        return self._client
+
+    def connect(self, wait: bool = True) -> bool:
+        """
+        Conecta ao Redis, se ainda não estiver conectado.
+
+        Args:
+            wait: Se True, conecta na thread atual; se False, só agenda a
+                conexão em background (respeitando o intervalo entre
+                tentativas)
+
+        Returns:
+            True se há um cliente conectado ao final da chamada
+        """
+        if self._client is not None or not self.enabled:
+            return self._client is not None
+        with self._connect_lock:
+            if self._connecting:
+                return False
+            if not wait and time.monotonic() < self._next_attempt:
+                return False
+            self._connecting = True
+        if wait:
+            self._connect()
+        else:
+            threading.Thread(
+                target=self._connect, name="redis-connect", daemon=True
+            ).start()
+        return self._client is not None
+
+    def _connect(self) -> None:
         host = os.getenv("REDIS_HOST", "localhost")
         port = int(os.getenv("REDIS_PORT", 6379))
-
+        client = None
         try:
-            self.client = redis.Redis(
-                host=host,
-                port=port,
-                db=0,
-                decode_responses=True,
-                socket_connect_timeout=5
-            )
-            self.client.ping()
-            logger.info(f"Redis conectado: {host}:{port}")
+            # REDIS_NODES: várias instâncias com hash consistente
+            client = sharded_from_env()
+            if client is not None:
+                target = ", ".join(client.ring.nodes)
+            else:
+                client = redis.Redis(
+                    host=host,
+                    port=port,
+                    db=0,
+                    decode_responses=True,
+                    socket_connect_timeout=5
+                )
+                target = f"{host}:{port}"
+            client.ping()
+            if self._client is None:
+                self._client, client = client, None
+            logger.info(f"Redis conectado: {target}")
         except Exception as e:
-            logger.error(f"Falha ao conectar Redis: {e}")
-            self.enabled = False
-            self.client = None
+            self._next_attempt = time.monotonic() + self._reconnect_interval
+            logger.error(
+                f"Falha ao conectar Redis: {e} (nova tentativa em "
+                f"{self._reconnect_interval:g}s)"
+            )
+        finally:
+            # Cliente que não foi adotado (falha ou conexão concorrente)
+            _close_client(client)
+            self._connecting = False
+
+    def _log_error(self, message: str, error: Exception) -> None:
+        """
+        Registra a falha de uma operação. Se foi de conexão, fecha e
+        descarta o cliente para que as próximas operações virem miss
+        imediato (em vez de esperar o timeout) até a reconexão em
+        background. Um nó fora do ar no modo shardeado só afeta as
+        próprias chaves: o ShardedRedis o tira do anel e o cliente fica.
+        """
+        if isinstance(error, ShardUnavailable):
+            logger.debug(f"{message}: {error}")
+            return
+        logger.error(f"{message}: {error}")
+        if isinstance(error, (redis.ConnectionError, redis.TimeoutError)):
+            client, self._client = self._client, None
+            self._next_attempt = time.monotonic() + self._reconnect_interval
+            _close_client(client)
 
     def _make_key(self, prefix: str, data: str) -> str:
         """Gera chave única baseada em hash."""
         hash_obj = hashlib.sha256(data.encode())
         return f"{prefix}:{hash_obj.hexdigest()[:16]}"
 
+    def get_generation(self, prefix: str) -> int:
+        """
+        Obtém o contador de geração do namespace.
+
+        O valor é mantido em memória por alguns instantes
+        (CACHE_GENERATION_REFRESH_SECONDS) para não custar um GET extra
+        em toda leitura.
+        """
+        if not self.enabled or not self.client:
+            return 0
+
+        now = time.monotonic()
+        cached = self._generations.get(prefix)
+        if cached and now - cached[1] < self._generation_refresh:
+            return cached[0]
+
+        try:
+            value = self.client.get(f"gen:{prefix}")
+            generation = int(value) if value else 0
+        except Exception as e:
+            self._log_error("Erro ao ler geração do namespace", e)
+            return cached[0] if cached else 0
+
+        self._generations[prefix] = (generation, now)
+        return generation
+
+    def invalidate_namespace(self, prefix: str) -> int:
+        """
+        Invalida todas as chaves do namespace com um único INCR.
+
+        As chaves antigas deixam de ser alcançáveis e expiram pelo TTL.
+        """
+        if not self.enabled or not self.client:
+            return 0
+
+        try:
+            generation = self.client.incr(f"gen:{prefix}")
+        except Exception as e:
+            self._log_error("Erro ao invalidar namespace", e)
+            return 0
+
+        self._generations[prefix] = (generation, time.monotonic())
+        logger.info(f"Namespace invalidado: {prefix} (geração={generation})")
+        return generation
+
+    def make_namespaced_key(self, prefix: str, data: str, **params) -> str:
+        """
+        Gera chave versionada por parâmetros e geração.
+
+        Args:
+            prefix: Namespace da chave (ex: "llm_query")
+            data: Conteúdo que identifica a entrada (ex: query)
+            **params: Parâmetros que alteram a resposta (modelo,
+                temperatura, prompt...). Qualquer mudança gera chaves novas.
+
+        Returns:
+            Chave no formato prefix:<hash params>:g<geração>:<hash data>
+        """
+        params_hash = hashlib.sha256(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()[:8]
+        generation = self.get_generation(prefix)
+        return self._make_key(
+            f"{prefix}:{params_hash}:g{generation}", data
+        )
+
     def get(self, key: str) -> Optional[Any]:
         """Busca valor do cache."""
         if not self.enabled or not self.client:
@@ -58,24 +264,56 @@ class RedisCache:
             logger.debug(f"Cache MISS: {key}")
             return None
         except Exception as e:
-            logger.error(f"Erro ao ler cache: {e}")
+            self._log_error("Erro ao ler cache", e)
             return None
 
-    def set(self, key: str, value: Any, ttl: int = 600) -> bool:
-        """Salva valor no cache com TTL."""
+    def set(self, key: str, value: Any, ttl: Optional[int] = 600) -> bool:
+        """Salva valor no cache com TTL (ttl=None: sem expiração)."""
         if not self.enabled or not self.client:
             return False
 
         try:
-            self.client.setex(
-                key,
-                ttl,
-                json.dumps(value)
-            )
+            if ttl is None:
+                self.client.set(key, json.dumps(value))
+            else:
+                self.client.setex(
+                    key,
+                    ttl,
+                    json.dumps(value)
+                )
             logger.debug(f"Cache SET: {key} (TTL={ttl}s)")
             return True
         except Exception as e:
-            logger.error(f"Erro ao salvar cache: {e}")
+            self._log_error("Erro ao salvar cache", e)
+            return False
+
+    def set_prewarmed(
+        self, key: str, value: Any, ttl: Optional[int] = 600
+    ) -> bool:
+        """
+        Grava uma entrada renovada pelo pré-aquecimento: o valor leva
+        PREWARMED_FIELD e um marcador de uso único com o mesmo TTL. Só o
+        primeiro hit consome o marcador (take_prewarmed), que é o único
+        que teria sido miss sem o pré-aquecimento.
+        """
+        if isinstance(value, dict):
+            value = {**value, PREWARMED_FIELD: True}
+        if not self.set(key, value, ttl=ttl):
+            return False
+        self.set(f"{PREWARMED_MARKER_PREFIX}{key}", 1, ttl=ttl)
+        return True
+
+    def take_prewarmed(self, key: str) -> bool:
+        """Consome (GETDEL) o marcador de pré-aquecimento da entrada."""
+        if not self.enabled or not self.client:
+            return False
+
+        try:
+            return self.client.getdel(
+                f"{PREWARMED_MARKER_PREFIX}{key}"
+            ) is not None
+        except Exception as e:
+            self._log_error("Erro ao consumir marcador de pré-aquecimento", e)
             return False
 
     def delete(self, key: str) -> bool:
@@ -87,20 +325,333 @@ class RedisCache:
             self.client.delete(key)
             return True
         except Exception as e:
-            logger.error(f"Erro ao deletar cache: {e}")
+            self._log_error("Erro ao deletar cache", e)
+            return False
+
+    def cached(
+        self,
+        namespace: str,
+        key: Optional[Callable[..., Optional[str]]] = None,
+        ttl: TTL = 600,
+        error_ttl: TTL = None,
+        negative: Optional[Callable[[Any], bool]] = None,
+        negative_exceptions: Union[
+            Tuple[type, ...], Callable[[], Tuple[type, ...]]
+        ] = (),
+        metric: Optional[str] = None,
+        on_hit: Optional[Callable[[Any], Any]] = None,
+    ):
+        """
+        Decorator de cache para funções síncronas e assíncronas.
+
+        Args:
+            namespace: Namespace das chaves e das métricas
+            key: Recebe os argumentos da função e devolve a chave (ex:
+                via make_namespaced_key) ou None para não usar o cache.
+                Padrão: argumentos serializados em JSON
+            ttl: TTL dos resultados de sucesso (int, None = sem
+                expiração, ou função dos argumentos)
+            error_ttl: TTL do cache negativo. Resultados de erro
+                ({"error": ...}) só são guardados se `negative(result)`
+                for verdadeiro; exceções, se forem `negative_exceptions`
+                (relançadas como CachedError nos hits). Aceita também
+                uma função que devolve a tupla, resolvida só na primeira
+                exceção (evita importar o módulo das exceções no import)
+            metric: Sufixo das métricas cache_hit_/cache_miss_/
+                cache_negative_hit_ (padrão: namespace)
+            on_hit: Transforma o valor retornado em um hit
+
+        A função decorada ganha `refresh(*args, **kwargs)`, que recalcula
+        e grava o valor marcado como pré-aquecido (PREWARMED_FIELD).
+        """
+        metric = metric or namespace
+
+        def build_key(args, kwargs) -> Optional[str]:
+            if not self.enabled or not self.client:
+                return None
+            if key is not None:
+                return key(*args, **kwargs)
+            return self.make_namespaced_key(namespace, json.dumps(
+                [args, kwargs], sort_keys=True, default=str
+            ))
+
+        def lookup(cache_key: str) -> Tuple[bool, Any]:
+            value = self.get(cache_key)
+            if value is None:
+                self.increment_metric(f"cache_miss_{metric}")
+                return False, None
+
+            metrics = {f"cache_hit_{metric}": 1}
+            if isinstance(value, dict):
+                if value.pop(PREWARMED_FIELD, False) and (
+                    self.take_prewarmed(cache_key)
+                ):
+                    metrics[f"prewarm_hit:{namespace}"] = 1
+                if CACHED_ERROR_FIELD in value:
+                    metrics[f"cache_negative_hit_{metric}"] = 1
+                    self.increment_metrics(metrics)
+                    raise CachedError(value[CACHED_ERROR_FIELD])
+                if is_error_result(value):
+                    metrics[f"cache_negative_hit_{metric}"] = 1
+            self.increment_metrics(metrics)
+            return True, on_hit(value) if on_hit else value
+
+        def store(cache_key, result, args, kwargs, prewarmed=False):
+            if is_error_result(result):
+                if not (negative and error_ttl and negative(result)):
+                    return
+                ttl_value = _resolve_ttl(error_ttl, args, kwargs)
+            else:
+                ttl_value = _resolve_ttl(ttl, args, kwargs)
+            if prewarmed:
+                self.set_prewarmed(cache_key, result, ttl=ttl_value)
+            else:
+                self.set(cache_key, result, ttl=ttl_value)
+
+        def store_exception(cache_key, error, args, kwargs):
+            exceptions = (
+                negative_exceptions() if callable(negative_exceptions)
+                else negative_exceptions
+            )
+            if error_ttl and isinstance(error, exceptions):
+                self.set(
+                    cache_key, {CACHED_ERROR_FIELD: str(error)},
+                    ttl=_resolve_ttl(error_ttl, args, kwargs)
+                )
+
+        def decorator(fn):
+            if inspect.iscoroutinefunction(fn):
+                async def call(args, kwargs, read=True, prewarmed=False):
+                    cache_key = build_key(args, kwargs)
+                    if cache_key is None:
+                        return await fn(*args, **kwargs)
+                    if read:
+                        hit, value = lookup(cache_key)
+                        if hit:
+                            return value
+                    try:
+                        result = await fn(*args, **kwargs)
+                    except Exception as e:
+                        store_exception(cache_key, e, args, kwargs)
+                        raise
+                    store(cache_key, result, args, kwargs, prewarmed)
+                    return result
+
+                @functools.wraps(fn)
+                async def wrapper(*args, **kwargs):
+                    return await call(args, kwargs)
+
+                async def refresh(*args, **kwargs):
+                    return await call(
+                        args, kwargs, read=False, prewarmed=True
+                    )
+            else:
+                def call(args, kwargs, read=True, prewarmed=False):
+                    cache_key = build_key(args, kwargs)
+                    if cache_key is None:
+                        return fn(*args, **kwargs)
+                    if read:
+                        hit, value = lookup(cache_key)
+                        if hit:
+                            return value
+                    try:
+                        result = fn(*args, **kwargs)
+                    except Exception as e:
+                        store_exception(cache_key, e, args, kwargs)
+                        raise
+                    store(cache_key, result, args, kwargs, prewarmed)
+                    return result
+
+                @functools.wraps(fn)
+                def wrapper(*args, **kwargs):
+                    return call(args, kwargs)
+
+                def refresh(*args, **kwargs):
+                    return call(args, kwargs, read=False, prewarmed=True)
+
+            wrapper.refresh = refresh
+            wrapper.cache_key = lambda *args, **kwargs: build_key(
+                args, kwargs
+            )
+            return wrapper
+
+        return decorator
+
+    def get_ttl(self, key: str) -> Optional[int]:
+        """
+        TTL restante da chave em segundos (-1 se não expira), ou None se
+        a chave não existe.
+        """
+        if not self.enabled or not self.client:
+            return None
+
+        try:
+            ttl = self.client.ttl(key)
+            return None if ttl == -2 else ttl
+        except Exception as e:
+            self._log_error("Erro ao ler TTL", e)
+            return None
+
+    def try_lock(self, name: str, ttl: int) -> bool:
+        """Lock simples entre processos (SET NX com expiração)."""
+        if not self.enabled or not self.client:
+            return False
+
+        try:
+            return bool(self.client.set(f"lock:{name}", 1, nx=True, ex=ttl))
+        except Exception as e:
+            self._log_error("Erro ao obter lock", e)
+            return False
+
+    def acquire_quota(self, name: str, limit: int, window: int) -> bool:
+        """
+        Consome uma unidade da cota `name` (`limit` por janela fixa de
+        `window` segundos), compartilhada entre processos.
+        """
+        if not self.enabled or not self.client:
+            return False
+
+        key = f"quota:{name}:{int(time.time() // window)}"
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.incr(key)
+            pipe.expire(key, window * 2)
+            return pipe.execute()[0] <= limit
+        except Exception as e:
+            self._log_error("Erro ao consumir cota", e)
+            return False
+
+    def _popularity_era(self, now: float) -> Tuple[int, float]:
+        era_seconds = POPULARITY_HALF_LIFE * POPULARITY_ERA_HALF_LIVES
+        era = int(now // era_seconds)
+        return era, era * era_seconds
+
+    def track_popularity(
+        self, namespace: str, member: str, now: Optional[float] = None
+    ) -> bool:
+        """Registra um acesso a `member` no ranking de popularidade."""
+        if not self.enabled or not self.client:
+            return False
+
+        now = time.time() if now is None else now
+        era, start = self._popularity_era(now)
+        key = f"popular:{namespace}:{era}"
+        weight = 2 ** ((now - start) / POPULARITY_HALF_LIFE)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.zincrby(key, weight, member)
+            pipe.expire(
+                key, int(POPULARITY_HALF_LIFE * POPULARITY_ERA_HALF_LIVES * 2)
+            )
+            pipe.execute()
+            return True
+        except Exception as e:
+            self._log_error("Erro ao registrar popularidade", e)
             return False
 
-    def increment_metric(self, metric_name: str) -> int:
-        """Incrementa métrica (contador)."""
+    def top_popular(
+        self, namespace: str, count: int, now: Optional[float] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Membros mais populares do namespace, com a contagem decaída até
+        `now` (acessos equivalentes).
+        """
+        if not self.enabled or not self.client:
+            return []
+
+        now = time.time() if now is None else now
+        era, start = self._popularity_era(now)
+        key = f"popular:{namespace}:{era}"
+        era_ttl = int(POPULARITY_HALF_LIFE * POPULARITY_ERA_HALF_LIVES * 2)
+        try:
+            # Primeira leitura da era: herda a era anterior, decaída
+            if self.client.set(f"{key}:rollover", 1, nx=True, ex=era_ttl):
+                self.client.zunionstore(key, {
+                    key: 1,
+                    f"popular:{namespace}:{era - 1}":
+                        2.0 ** -POPULARITY_ERA_HALF_LIVES,
+                })
+                self.client.expire(key, era_ttl)
+            self.client.zremrangebyrank(key, 0, -POPULARITY_MAX_MEMBERS - 1)
+            entries = self.client.zrevrange(
+                key, 0, count - 1, withscores=True
+            )
+        except Exception as e:
+            self._log_error("Erro ao ler popularidade", e)
+            return []
+
+        scale = 2 ** ((now - start) / POPULARITY_HALF_LIFE)
+        return [(member, score / scale) for member, score in entries]
+
+    def _add_metric_buckets(
+        self, pipe, metric_name: str, amount: int, now: float
+    ) -> None:
+        """Enfileira o incremento dos buckets de tempo da métrica."""
+        for resolution, count in METRIC_RESOLUTIONS:
+            start = int(now // resolution) * resolution
+            key = f"metric_ts:{metric_name}:{resolution}:{start}"
+            pipe.incrby(key, amount)
+            pipe.expire(key, resolution * (count + 1))
+
+    def increment_metric(self, metric_name: str, amount: int = 1) -> int:
+        """
+        Incrementa métrica (contador acumulado e buckets de tempo).
+
+        Returns:
+            Valor acumulado da métrica
+        """
         if not self.enabled or not self.client:
             return 0
 
         try:
-            return self.client.incr(f"metric:{metric_name}")
+            pipe = self.client.pipeline(transaction=False)
+            pipe.incrby(f"metric:{metric_name}", amount)
+            self._add_metric_buckets(pipe, metric_name, amount, time.time())
+            return pipe.execute()[0]
         except Exception as e:
-            logger.error(f"Erro ao incrementar métrica: {e}")
+            self._log_error("Erro ao incrementar métrica", e)
             return 0
 
+    def increment_metrics(self, metrics: Dict[str, int]) -> bool:
+        """Incrementa várias métricas em um único pipeline."""
+        if not self.enabled or not self.client:
+            return False
+
+        try:
+            now = time.time()
+            pipe = self.client.pipeline(transaction=False)
+            for metric_name, amount in metrics.items():
+                pipe.incrby(f"metric:{metric_name}", amount)
+                self._add_metric_buckets(pipe, metric_name, amount, now)
+            pipe.execute()
+            return True
+        except Exception as e:
+            self._log_error("Erro ao incrementar métricas", e)
+            return False
+
+    def track_metric_label(self, group: str, label: str) -> bool:
+        """Registra um rótulo dinâmico de métrica (ex: caminho de tools)."""
+        if not self.enabled or not self.client:
+            return False
+
+        try:
+            self.client.sadd(f"metric_labels:{group}", label)
+            return True
+        except Exception as e:
+            self._log_error("Erro ao registrar rótulo de métrica", e)
+            return False
+
+    def get_metric_labels(self, group: str) -> List[str]:
+        """Lista os rótulos registrados em um grupo de métricas."""
+        if not self.enabled or not self.client:
+            return []
+
+        try:
+            return sorted(self.client.smembers(f"metric_labels:{group}"))
+        except Exception as e:
+            self._log_error("Erro ao ler rótulos de métrica", e)
+            return []
+
     def get_metric(self, metric_name: str) -> int:
         """Obtém valor da métrica."""
         if not self.enabled or not self.client:
@@ -110,8 +661,74 @@ class RedisCache:
             value = self.client.get(f"metric:{metric_name}")
             return int(value) if value else 0
         except Exception as e:
-            logger.error(f"Erro ao ler métrica: {e}")
+            self._log_error("Erro ao ler métrica", e)
             return 0
 
+    def _window_keys(
+        self, metric_name: str, seconds: int, now: float
+    ) -> List[str]:
+        """
+        Buckets que cobrem a janela, na menor resolução que a comporta.
+        O bucket corrente está incompleto, então a janela efetiva fica
+        entre `seconds - resolução` e `seconds`.
+        """
+        for resolution, count in METRIC_RESOLUTIONS:
+            if resolution * count >= seconds:
+                break
+        current = int(now // resolution) * resolution
+        return [
+            f"metric_ts:{metric_name}:{resolution}:"
+            f"{current - i * resolution}"
+            for i in range(max(1, seconds // resolution))
+        ]
+
+    def get_windowed_metrics(
+        self,
+        metric_names: List[str],
+        windows: Optional[List[str]] = None,
+        now: Optional[float] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Soma das métricas nas janelas recentes (ex: "1m", "5m", "1h").
+
+        Todos os buckets são lidos em um único MGET: o custo é o número
+        de buckets, independente do volume de eventos.
+
+        Returns:
+            {métrica: {janela: total}}
+        """
+        windows = windows or list(METRIC_WINDOWS)
+        result = {
+            name: {window: 0 for window in windows} for name in metric_names
+        }
+        if not self.enabled or not self.client:
+            return result
+
+        now = time.time() if now is None else now
+        slots = []
+        keys = []
+        for name in metric_names:
+            for window in windows:
+                window_keys = self._window_keys(
+                    name, METRIC_WINDOWS[window], now
+                )
+                slots.append((name, window, len(window_keys)))
+                keys.extend(window_keys)
+
+        try:
+            values = self.client.mget(keys)
+        except Exception as e:
+            self._log_error("Erro ao ler métricas por janela", e)
+            return result
+
+        position = 0
+        for name, window, size in slots:
+            result[name][window] = sum(
+                int(value) for value in values[position:position + size]
+                if value
+            )
+            position += size
+        return result
+
 
 cache = RedisCache()
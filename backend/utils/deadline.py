@@ -0,0 +1,152 @@
+"""
+Prazo (deadline) por requisição, propagado do HTTP até o LLM, o MCP
+Server e as APIs externas.
+
+O prazo é um instante absoluto (epoch, time.time()) guardado em um
+ContextVar, então vale para todas as tarefas criadas a partir da
+requisição. Nas chamadas ao MCP Server ele vai no `_meta` da requisição
+("deadline") e o servidor o reinstala antes de executar a tool. Por ser
+absoluto, o mesmo valor é comparável entre processos na mesma máquina
+(ou com relógios sincronizados).
+
+Configuração:
+- REQUEST_TIMEOUT_SECONDS: prazo padrão de /v1/query (padrão: 30, o
+  mesmo timeout do frontend)
+- REQUEST_TIMEOUT_MAX_SECONDS: teto para o header X-Request-Timeout
+  (padrão: 120)
+"""
+import os
+import time
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional
+
+DEADLINE_HEADER = "X-Request-Timeout"
+DEADLINE_META_KEY = "deadline"
+
+# Menor timeout repassado a clientes HTTP (evita timeout zero/negativo)
+MIN_TIMEOUT = 0.01
+
+deadline_var: ContextVar[Optional[float]] = ContextVar(
+    "deadline", default=None
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """O prazo da requisição terminou antes da conclusão do trabalho."""
+
+    def __init__(self, message: str = "Prazo da requisição esgotado"):
+        super().__init__(message)
+
+
+class ClientDisconnected(Exception):
+    """O cliente HTTP encerrou a conexão antes da resposta."""
+
+
+def get_deadline() -> Optional[float]:
+    return deadline_var.get()
+
+
+def remaining() -> Optional[float]:
+    """Segundos até o prazo (negativo se já passou), ou None sem prazo."""
+    deadline = deadline_var.get()
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def timeout_for(default: Optional[float]) -> Optional[float]:
+    """
+    Timeout de uma operação: o menor entre `default` e o tempo restante.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    left = max(left, MIN_TIMEOUT)
+    return left if default is None else min(default, left)
+
+
+def parse_timeout(value: Optional[str]) -> float:
+    """
+    Converte o header X-Request-Timeout (segundos) no prazo da
+    requisição, limitado a REQUEST_TIMEOUT_MAX_SECONDS. Valores ausentes
+    ou inválidos usam REQUEST_TIMEOUT_SECONDS.
+    """
+    default = float(os.getenv("REQUEST_TIMEOUT_SECONDS", 30))
+    maximum = float(os.getenv("REQUEST_TIMEOUT_MAX_SECONDS", 120))
+    try:
+        seconds = float(value) if value else default
+    except ValueError:
+        seconds = default
+    if seconds <= 0:
+        seconds = default
+    return min(seconds, maximum)
+
+
+@contextmanager
+def deadline_scope(
+    seconds: Optional[float] = None, at: Optional[float] = None
+):
+    """
+    Define o prazo dentro do bloco: `seconds` a partir de agora ou o
+    instante absoluto `at`. Um prazo já definido e mais curto prevalece.
+    """
+    deadline = at if seconds is None else time.time() + seconds
+    current = deadline_var.get()
+    if deadline is None or (current is not None and current < deadline):
+        deadline = current
+    token = deadline_var.set(deadline)
+    try:
+        yield deadline
+    finally:
+        deadline_var.reset(token)
+
+
+async def run_with_deadline(awaitable: Awaitable[Any]) -> Any:
+    """
+    Aguarda `awaitable` cancelando-o quando o prazo corrente terminar.
+
+    Raises:
+        DeadlineExceeded: prazo esgotado (antes ou durante a execução)
+    """
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded()
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded() from None
+
+
+async def cancel_on_disconnect(
+    awaitable: Awaitable[Any],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_interval: float = 0.5,
+) -> Any:
+    """
+    Executa `awaitable` e o cancela se o cliente desconectar.
+
+    Raises:
+        ClientDisconnected: o cliente encerrou a conexão
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
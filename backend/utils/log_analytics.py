@@ -0,0 +1,522 @@
+"""
+Análise incremental dos logs JSON (logs/app.log e backups rotacionados).
+
+Cada execução lê só o que foi escrito desde a anterior: o estado guarda,
+por arquivo (identificado por inode e um hash do início do arquivo), o
+offset já processado. Como a rotação renomeia app.log -> app.log.1 sem
+mudar o inode, um arquivo rotacionado continua de onde parou.
+
+As agregações são diárias, por logger, level, tool_name e por
+requisição (linhas com o mesmo request_id). Durações (duration_ms) vão
+para sketches de quantis com erro relativo limitado e memória
+constante, então o estado não cresce com o volume de logs.
+
+error.log contém só as linhas ERROR que já estão em app.log; por isso o
+padrão de arquivos é app.log*.
+
+Uso:
+    python -m backend.utils.log_analytics
+    python -m backend.utils.log_analytics --since yesterday \\
+        --until yesterday --json
+"""
+import os
+import glob
+import json
+import math
+import heapq
+import datetime
+import hashlib
+import argparse
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DIMENSIONS = ("logger", "level", "tool_name")
+ERROR_LEVELS = ("ERROR", "CRITICAL")
+HEAD_BYTES = 256
+MAX_OPEN_REQUESTS = 10_000
+TOP_REQUESTS = 10
+STATE_VERSION = 1
+
+
+class QuantileSketch:
+    """
+    Sketch de quantis com erro relativo limitado (no estilo DDSketch).
+
+    Valores caem em buckets logarítmicos de razão gamma; o quantil
+    estimado fica a no máximo `relative_accuracy` do valor real. Se o
+    número de buckets passar de `max_buckets`, os menores são fundidos
+    (perde precisão só nos quantis mais baixos).
+    """
+
+    def __init__(
+        self, relative_accuracy: float = 0.01, max_buckets: int = 2048
+    ):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value > 0:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+            if len(self.buckets) > self.max_buckets:
+                self._collapse()
+        else:
+            self.zero_count += count
+        self.count += count
+        self.total += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _collapse(self) -> None:
+        indexes = sorted(self.buckets)
+        excess = len(indexes) - self.max_buckets + 1
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.buckets[target] += self.buckets.pop(index)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "a": self.relative_accuracy,
+            "b": {str(k): v for k, v in self.buckets.items()},
+            "z": self.zero_count,
+            "n": self.count,
+            "s": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["a"])
+        sketch.buckets = {int(k): v for k, v in data["b"].items()}
+        sketch.zero_count = data["z"]
+        sketch.count = data["n"]
+        sketch.total = data["s"]
+        if sketch.count:
+            sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+
+class GroupStats:
+    """Contadores e sketch de duração de um grupo (ex: tool_name)."""
+
+    def __init__(self):
+        self.lines = 0
+        self.errors = 0
+        self.durations = QuantileSketch()
+
+    def add(self, is_error: bool, duration: Optional[float]) -> None:
+        self.lines += 1
+        self.errors += is_error
+        if duration is not None:
+            self.durations.add(duration)
+
+    def merge(self, other: "GroupStats") -> None:
+        self.lines += other.lines
+        self.errors += other.errors
+        self.durations.merge(other.durations)
+
+    def summary(self) -> Dict[str, Any]:
+        durations = self.durations
+        result = {"lines": self.lines, "errors": self.errors}
+        if durations.count:
+            result["duration_ms"] = {
+                "count": durations.count,
+                "avg": round(durations.total / durations.count, 1),
+                "p50": round(durations.quantile(0.50), 1),
+                "p95": round(durations.quantile(0.95), 1),
+                "p99": round(durations.quantile(0.99), 1),
+                "max": round(durations.max, 1),
+            }
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "lines": self.lines,
+            "errors": self.errors,
+            "durations": self.durations.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GroupStats":
+        stats = cls()
+        stats.lines = data["lines"]
+        stats.errors = data["errors"]
+        stats.durations = QuantileSketch.from_dict(data["durations"])
+        return stats
+
+
+def _parse_duration(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LogAnalyzer:
+    """Agrega linhas de log em estatísticas diárias e por requisição."""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.files: Dict[str, Dict[str, Any]] = state.get("files", {})
+        # dia -> "dimensão=valor" -> GroupStats
+        self.days: Dict[str, Dict[str, GroupStats]] = {
+            day: {
+                group: GroupStats.from_dict(data)
+                for group, data in groups.items()
+            }
+            for day, groups in state.get("days", {}).items()
+        }
+        # dia -> [(duração, request_id, path)] (heap das mais lentas)
+        self.slowest: Dict[str, List[Tuple[float, str, str]]] = {
+            day: [tuple(item) for item in items]
+            for day, items in state.get("slowest", {}).items()
+        }
+        # request_id -> {"day", "tools", "errors", "lines"}; requisições
+        # cuja linha final ainda não foi lida
+        self.open_requests: "OrderedDict[str, Dict[str, Any]]" = (
+            OrderedDict(state.get("open_requests", []))
+        )
+        self.lines_read = 0
+        self.invalid_lines = 0
+
+    def _group(self, day: str, group: str) -> GroupStats:
+        groups = self.days.setdefault(day, {})
+        stats = groups.get(group)
+        if stats is None:
+            stats = groups[group] = GroupStats()
+        return stats
+
+    def feed(self, record: Dict[str, Any]) -> None:
+        day = str(record.get("timestamp", ""))[:10] or "unknown"
+        is_error = record.get("level") in ERROR_LEVELS
+        duration = _parse_duration(record.get("duration_ms"))
+
+        self._group(day, "all").add(is_error, None)
+        for dimension in DIMENSIONS:
+            value = record.get(dimension)
+            if value is not None:
+                self._group(day, f"{dimension}={value}").add(
+                    is_error, duration
+                )
+
+        request_id = record.get("request_id")
+        if request_id:
+            self._feed_request(day, request_id, record, is_error, duration)
+
+    def _feed_request(
+        self,
+        day: str,
+        request_id: str,
+        record: Dict[str, Any],
+        is_error: bool,
+        duration: Optional[float],
+    ) -> None:
+        request = self.open_requests.pop(request_id, None) or {
+            "day": day, "tools": [], "errors": 0, "lines": 0,
+        }
+        request["lines"] += 1
+        request["errors"] += is_error
+        tool = record.get("tool_name")
+        if tool and tool not in request["tools"]:
+            request["tools"].append(tool)
+
+        # A linha do middleware (com status_code) encerra a requisição
+        if "status_code" in record and duration is not None:
+            self._finish_request(
+                request_id, request, duration, record.get("path", "")
+            )
+            return
+
+        self.open_requests[request_id] = request
+        if len(self.open_requests) > MAX_OPEN_REQUESTS:
+            stale_id, stale = self.open_requests.popitem(last=False)
+            self._finish_request(stale_id, stale, None, "")
+
+    def _finish_request(
+        self,
+        request_id: str,
+        request: Dict[str, Any],
+        duration: Optional[float],
+        path: str,
+    ) -> None:
+        day = request["day"]
+        tools = request["tools"] or ["none"]
+        for tool in tools:
+            self._group(day, f"request_tool={tool}").add(
+                request["errors"] > 0, duration
+            )
+        self._group(day, "request_lines").durations.add(request["lines"])
+
+        if duration is not None:
+            heap = self.slowest.setdefault(day, [])
+            item = (duration, request_id, path)
+            if len(heap) < TOP_REQUESTS:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    def feed_lines(self, lines: Iterable[bytes]) -> None:
+        for line in lines:
+            self.lines_read += 1
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                self.invalid_lines += 1
+                continue
+            if isinstance(record, dict):
+                self.feed(record)
+            else:
+                self.invalid_lines += 1
+
+    def process_file(self, path: str) -> int:
+        """
+        Processa as linhas completas novas de `path` a partir do offset
+        salvo. Retorna o número de bytes lidos.
+        """
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            file_id = f"{stat.st_dev}:{stat.st_ino}"
+
+            # O inode pode ser reaproveitado por outro arquivo: só retoma
+            # se o início do arquivo for o mesmo da última execução
+            offset = 0
+            known = self.files.get(file_id)
+            if known and known["offset"] <= stat.st_size:
+                head = f.read(known["head_len"])
+                if hashlib.sha1(head).hexdigest() == known["head"]:
+                    offset = known["offset"]
+
+            f.seek(offset)
+            read = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # linha ainda sendo escrita
+                read += len(line)
+                self.feed_lines([line])
+
+            f.seek(0)
+            head = f.read(min(HEAD_BYTES, offset + read))
+
+        self.files[file_id] = {
+            "path": path,
+            "offset": offset + read,
+            "head": hashlib.sha1(head).hexdigest(),
+            "head_len": len(head),
+        }
+        return read
+
+    def process(self, paths: List[str]) -> int:
+        """Processa os arquivos (mais antigos primeiro) e esquece os que
+        não existem mais."""
+        total = 0
+        for path in paths:
+            total += self.process_file(path)
+
+        present = set()
+        for path in paths:
+            stat = os.stat(path)
+            present.add(f"{stat.st_dev}:{stat.st_ino}")
+        for file_id in list(self.files):
+            if file_id not in present:
+                del self.files[file_id]
+        return total
+
+    def report(
+        self, since: Optional[str] = None, until: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Resumo dos dias no intervalo [since, until] (YYYY-MM-DD)."""
+        days = sorted(
+            day for day in self.days
+            if (not since or day >= since) and (not until or day <= until)
+        )
+        merged: Dict[str, GroupStats] = {}
+        for day in days:
+            for group, stats in self.days[day].items():
+                merged.setdefault(group, GroupStats()).merge(stats)
+
+        sections: Dict[str, Dict[str, Any]] = {}
+        for group, stats in sorted(merged.items()):
+            dimension, _, value = group.partition("=")
+            if value:
+                sections.setdefault(dimension, {})[value] = stats.summary()
+
+        slowest = sorted(
+            (
+                item for day in days for item in self.slowest.get(day, [])
+            ),
+            reverse=True,
+        )[:TOP_REQUESTS]
+
+        lines_per_request = merged.get("request_lines")
+        return {
+            "days": days,
+            "total": merged.get("all", GroupStats()).summary(),
+            **sections,
+            "lines_per_request_p95": (
+                round(lines_per_request.durations.quantile(0.95), 1)
+                if lines_per_request and lines_per_request.durations.count
+                else None
+            ),
+            "slowest_requests": [
+                {"request_id": rid, "path": path, "duration_ms": duration}
+                for duration, rid, path in slowest
+            ],
+        }
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "files": self.files,
+            "days": {
+                day: {group: s.to_dict() for group, s in groups.items()}
+                for day, groups in self.days.items()
+            },
+            "slowest": self.slowest,
+            "open_requests": list(self.open_requests.items()),
+        }
+
+
+def log_files(log_dir: str, pattern: str = "app.log*") -> List[str]:
+    """Arquivos do padrão, do backup mais antigo (.5) ao atual."""
+    def age(path):
+        suffix = path.rsplit(".", 1)[-1]
+        return -int(suffix) if suffix.isdigit() else 0
+
+    return sorted(glob.glob(os.path.join(log_dir, pattern)), key=age)
+
+
+def load_state(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        state = json.load(f)
+    return state if state.get("version") == STATE_VERSION else {}
+
+
+def save_state(path: str, state: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    days = report["days"]
+    if not days:
+        print("Nenhum log no intervalo.")
+        return
+    print(f"dias: {days[0]} .. {days[-1]}")
+    total = report["total"]
+    print(f"linhas: {total['lines']} (erros: {total['errors']})")
+
+    for section in ("level", "logger", "tool_name", "request_tool"):
+        groups = report.get(section)
+        if not groups:
+            continue
+        print(f"\n{section}:")
+        for name, stats in groups.items():
+            line = f"  {name:<32} {stats['lines']:>8} linhas"
+            line += f" {stats['errors']:>6} erros"
+            duration = stats.get("duration_ms")
+            if duration:
+                line += (
+                    f"  p50={duration['p50']} p95={duration['p95']} "
+                    f"p99={duration['p99']} max={duration['max']} ms"
+                )
+            print(line)
+
+    if report["slowest_requests"]:
+        print("\nrequisições mais lentas:")
+        for item in report["slowest_requests"]:
+            print(
+                f"  {item['duration_ms']:>9} ms  {item['request_id']}  "
+                f"{item['path']}"
+            )
+
+
+def resolve_day(value: Optional[str]) -> Optional[str]:
+    """Aceita YYYY-MM-DD, "today" ou "yesterday"."""
+    if value in ("today", "yesterday"):
+        day = datetime.date.today()
+        if value == "yesterday":
+            day -= datetime.timedelta(days=1)
+        return day.isoformat()
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--log-dir", default=os.getenv("LOG_DIR", "./logs"))
+    parser.add_argument("--pattern", default="app.log*")
+    parser.add_argument(
+        "--state", help="Arquivo de estado (padrão: <log-dir>/.analytics)"
+    )
+    parser.add_argument(
+        "--since", help="Primeiro dia (YYYY-MM-DD, today, yesterday)"
+    )
+    parser.add_argument("--until", help="Último dia (idem)")
+    parser.add_argument(
+        "--reset", action="store_true", help="Ignora o estado salvo"
+    )
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    state_path = args.state or os.path.join(args.log_dir, ".analytics")
+    analyzer = LogAnalyzer(None if args.reset else load_state(state_path))
+    read = analyzer.process(log_files(args.log_dir, args.pattern))
+    save_state(state_path, analyzer.state())
+
+    report = analyzer.report(
+        resolve_day(args.since), resolve_day(args.until)
+    )
+    report["run"] = {
+        "bytes_read": read,
+        "lines_read": analyzer.lines_read,
+        "invalid_lines": analyzer.invalid_lines,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+        print(
+            f"\n(lidos {read} bytes, {analyzer.lines_read} linhas nesta "
+            "execução)"
+        )
+
+
+if __name__ == "__main__":
+    main()
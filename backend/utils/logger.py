@@ -3,9 +3,27 @@ Sistema de logging estruturado em JSON com rotação de arquivos.
 """
 import logging
 import os
+from contextvars import ContextVar
+from typing import Optional
 from pythonjsonlogger import jsonlogger
 from logging.handlers import RotatingFileHandler
 
+# Id da requisição HTTP em andamento (definido pelo middleware do backend)
+request_id_var: ContextVar[Optional[str]] = ContextVar(
+    "request_id", default=None
+)
+
+
+class RequestContextFilter(logging.Filter):
+    """Anexa o request_id da requisição corrente a cada registro."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            request_id = request_id_var.get()
+            if request_id:
+                record.request_id = request_id
+        return True
+
 
 class CustomJsonFormatter(jsonlogger.JsonFormatter):
     """Formatter JSON customizado com campos extras."""
@@ -20,6 +38,8 @@ class CustomJsonFormatter(jsonlogger.JsonFormatter):
             log_record['request_id'] = record.request_id
         if hasattr(record, 'tool_name'):
             log_record['tool_name'] = record.tool_name
+        if hasattr(record, 'duration_ms'):
+            log_record['duration_ms'] = record.duration_ms
 
 
 def setup_logger(name: str, debug: bool = False) -> logging.Logger:
@@ -49,10 +69,12 @@ def setup_logger(name: str, debug: bool = False) -> logging.Logger:
         '%(timestamp)s %(level)s %(name)s %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
+    context_filter = RequestContextFilter()
 
     console_handler = logging.StreamHandler()
     console_handler.setLevel(level)
     console_handler.setFormatter(json_formatter)
+    console_handler.addFilter(context_filter)
     logger.addHandler(console_handler)
 
     log_dir = os.getenv("LOG_DIR", "./logs")
@@ -66,6 +88,7 @@ def setup_logger(name: str, debug: bool = False) -> logging.Logger:
     )
     file_handler.setLevel(level)
     file_handler.setFormatter(json_formatter)
+    file_handler.addFilter(context_filter)
     logger.addHandler(file_handler)
 
     error_handler = RotatingFileHandler(
@@ -76,6 +99,7 @@ def setup_logger(name: str, debug: bool = False) -> logging.Logger:
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(json_formatter)
+    error_handler.addFilter(context_filter)
     logger.addHandler(error_handler)
 
     return logger
@@ -0,0 +1,281 @@
+"""
+Diagnóstico em produção: profiler por amostragem e rastreio de alocações.
+
+Usado pelos endpoints /debug do backend e do MCP Server, que só existem
+quando DEBUG_ENDPOINTS_TOKEN está definido e exigem o mesmo valor no
+header X-Debug-Token.
+
+- Profiler: uma thread amostra as pilhas de todas as threads
+  (sys._current_frames) a cada `interval` segundos durante a janela
+  pedida e devolve as pilhas no formato "collapsed" (uma pilha por
+  linha, frames separados por ";" e o número de amostras no fim), aceito
+  por flamegraph.pl, speedscope e inferno. Não instrumenta chamadas,
+  então o custo fica restrito à thread de amostragem.
+- Alocações: tracemalloc é ligado na primeira consulta (o rastreio tem
+  custo de memória e CPU, por isso não fica ligado por padrão). Cada
+  snapshot traz os maiores sítios de alocação e a diferença para o
+  snapshot anterior; a contagem de objetos vivos de tipos escolhidos
+  (ex: mensagens LangGraph) mostra o que continua retido.
+
+Configuração:
+- DEBUG_ENDPOINTS_TOKEN: habilita os endpoints /debug (padrão: vazio,
+  desabilitados)
+- PROFILER_MAX_SECONDS: duração máxima de um profile (padrão: 60)
+- TRACEMALLOC_FRAMES: frames guardados por alocação (padrão: 25)
+"""
+import gc
+import os
+import sys
+import hmac
+import time
+import asyncio
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Mapping, Optional
+
+DEBUG_TOKEN_HEADER = "X-Debug-Token"
+
+# Funções em que uma thread está apenas esperando (I/O, fila, lock)
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+    ("queues.py", "get"),
+    ("connection.py", "_recv"),
+}
+
+# Alocações do próprio tracemalloc/importlib não interessam no relatório
+_TRACEMALLOC_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+class ProfilerBusy(RuntimeError):
+    """Já existe um profile em andamento neste processo."""
+
+
+def debug_status(token: Optional[str]) -> Optional[int]:
+    """
+    Verifica o acesso aos endpoints de diagnóstico.
+
+    Returns:
+        None se autorizado; 404 se os endpoints estão desabilitados ou
+        403 se o token não confere
+    """
+    expected = os.getenv("DEBUG_ENDPOINTS_TOKEN", "")
+    if not expected:
+        return 404
+    if not token or not hmac.compare_digest(token, expected):
+        return 403
+    return None
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+class SamplingProfiler:
+    """
+    Profiler por amostragem das pilhas de todas as threads do processo.
+
+    Args:
+        interval: Segundos entre amostras
+        include_idle: Mantém pilhas de threads ociosas (ex: event loop
+            parado no select), úteis para medir tempo de parede
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, interval: float = 0.01, include_idle: bool = False):
+        self.interval = max(interval, 0.001)
+        self.include_idle = include_idle
+        self.samples = 0
+        self.stacks: Counter = Counter()
+
+    def _sample(self, own_thread: int, names: Dict[int, str]) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            if not self.include_idle and _is_idle(frame):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, f"thread-{thread_id}"))
+            self.stacks[";".join(reversed(labels))] += 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> "SamplingProfiler":
+        """
+        Amostra por `seconds` segundos (bloqueia a thread chamadora).
+
+        Raises:
+            ProfilerBusy: outro profile está em andamento
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("Já existe um profile em andamento")
+        try:
+            own_thread = threading.get_ident()
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                self._sample(own_thread, names)
+                time.sleep(self.interval)
+        finally:
+            self._lock.release()
+        return self
+
+    def collapsed(self) -> str:
+        """Pilhas no formato collapsed, das mais amostradas para as menos."""
+        return "".join(
+            f"{stack} {count}\n"
+            for stack, count in self.stacks.most_common()
+        )
+
+
+async def profile(
+    seconds: float, interval: float = 0.01, include_idle: bool = False
+) -> SamplingProfiler:
+    """
+    Executa o profiler em uma thread, sem bloquear o event loop.
+
+    A duração é limitada a PROFILER_MAX_SECONDS.
+    """
+    maximum = float(os.getenv("PROFILER_MAX_SECONDS", 60))
+    seconds = min(max(seconds, 0.0), maximum)
+    profiler = SamplingProfiler(interval, include_idle)
+    return await asyncio.to_thread(profiler.run, seconds)
+
+
+def _stat(stat) -> Dict[str, Any]:
+    frame = stat.traceback[0]
+    data = {
+        "site": f"{frame.filename}:{frame.lineno}",
+        "size_bytes": stat.size,
+        "count": stat.count,
+    }
+    if len(stat.traceback) > 1:
+        data["traceback"] = [
+            f"{f.filename}:{f.lineno}" for f in stat.traceback
+        ]
+    if hasattr(stat, "size_diff"):
+        data["size_diff_bytes"] = stat.size_diff
+        data["count_diff"] = stat.count_diff
+    return data
+
+
+def count_instances(types: Mapping[str, type]) -> Dict[str, Dict[str, int]]:
+    """
+    Conta objetos vivos (rastreados pelo gc) de cada tipo, com o tamanho
+    raso somado (sys.getsizeof), agrupando por classe concreta.
+
+    Args:
+        types: Rótulo -> classe base (ex: {"messages": BaseMessage})
+    """
+    result = {label: {} for label in types}
+    if not types:
+        return result
+    # issubclass uma vez por classe: isinstance em classes com metaclasse
+    # ABC (ex: modelos pydantic) é lento para o heap inteiro
+    labels: Dict[type, List[str]] = {}
+    for obj in gc.get_objects():
+        cls = type(obj)
+        matches = labels.get(cls)
+        if matches is None:
+            matches = labels[cls] = [
+                label for label, base in types.items()
+                if issubclass(cls, base)
+            ]
+        for label in matches:
+            entry = result[label].setdefault(
+                cls.__name__, {"count": 0, "size_bytes": 0}
+            )
+            entry["count"] += 1
+            entry["size_bytes"] += sys.getsizeof(obj)
+    return result
+
+
+class AllocationTracker:
+    """
+    Snapshots do tracemalloc com diff em relação ao snapshot anterior.
+    """
+
+    def __init__(self, retained: Optional[Mapping[str, type]] = None):
+        self.retained = dict(retained or {})
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def start(self, frames: Optional[int] = None) -> bool:
+        """Liga o tracemalloc; retorna False se já estava ligado."""
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames or int(os.getenv("TRACEMALLOC_FRAMES", 25)))
+        return True
+
+    def stop(self) -> None:
+        with self._lock:
+            self._baseline = None
+            tracemalloc.stop()
+
+    def snapshot(
+        self,
+        limit: int = 20,
+        key_type: str = "lineno",
+        include: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Tira um snapshot e o compara com o anterior.
+
+        Args:
+            limit: Sítios de alocação retornados em "top" e "diff"
+            key_type: Agrupamento: "lineno", "filename" ou "traceback"
+            include: Padrão fnmatch; só entram alocações com algum frame
+                que case (ex: "*langgraph*")
+
+        Returns:
+            Dict com started, traced_bytes, peak_bytes, top, diff (vazio
+            no primeiro snapshot) e retained
+        """
+        with self._lock:
+            started = self.start()
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                _TRACEMALLOC_FILTERS
+            )
+            baseline, self._baseline = self._baseline, snapshot
+
+        if include:
+            selector = [tracemalloc.Filter(True, include, all_frames=True)]
+            snapshot = snapshot.filter_traces(selector)
+            if baseline is not None:
+                baseline = baseline.filter_traces(selector)
+
+        current, peak = tracemalloc.get_traced_memory()
+        diff: List[Dict[str, Any]] = []
+        if baseline is not None:
+            diff = [
+                _stat(stat)
+                for stat in snapshot.compare_to(baseline, key_type)[:limit]
+            ]
+        return {
+            "started": started,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [
+                _stat(stat) for stat in snapshot.statistics(key_type)[:limit]
+            ],
+            "diff": diff,
+            "retained": count_instances(self.retained),
+        }
@@ -0,0 +1,396 @@
+"""
+Sharding do cache no cliente: várias instâncias Redis atrás de um hash
+consistente.
+
+REDIS_NODES ("host:porta,host:porta,...") liga o modo shardeado do
+RedisCache. Cada nó recebe REDIS_VNODES pontos no anel (nós virtuais),
+o que equilibra a distribuição e faz com que adicionar um nó mova só
+~1/N das chaves. Cada nó tem seu próprio pool de conexões.
+
+Um nó fora do ar não derruba o anel: ele fica marcado como indisponível
+por REDIS_RECONNECT_SECONDS e suas chaves viram miss (ShardUnavailable)
+enquanto os demais nós continuam atendendo.
+
+Chaves fixadas (PINNED_PREFIXES) ficam sempre no primeiro nó da lista:
+métricas (contadores, buckets por janela e rótulos), para que
+get_metric/get_windowed_metrics continuem lendo de um lugar só, e os
+rankings de popularidade, cujo ZUNIONSTORE entre eras exige as chaves no
+mesmo nó. Ao adicionar nós, mantenha o primeiro da lista.
+
+Rebalanceamento após mudar REDIS_NODES (idempotente; move via
+DUMP/RESTORE só as chaves cujo dono mudou):
+    python -m backend.utils.sharding rebalance
+"""
+import os
+import time
+import bisect
+import hashlib
+import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import redis
+
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+PINNED_PREFIXES = ("metric:", "metric_ts:", "metric_labels:", "popular:")
+
+DEFAULT_VNODES = 160
+
+
+class ShardUnavailable(redis.RedisError):
+    """Nó do anel fora do ar: a operação falha sem afetar os demais nós."""
+
+
+def parse_nodes(value: str) -> List[str]:
+    """Lista "host:porta" de REDIS_NODES (porta padrão 6379)."""
+    nodes = []
+    for item in value.split(","):
+        item = item.strip()
+        if item:
+            nodes.append(item if ":" in item else f"{item}:6379")
+    return nodes
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Anel de hash consistente com nós virtuais.
+
+    Args:
+        nodes: Nomes dos nós ("host:porta"); o primeiro recebe as chaves
+            fixadas
+        vnodes: Pontos no anel por nó
+    """
+
+    def __init__(self, nodes: List[str], vnodes: int = DEFAULT_VNODES):
+        if not nodes:
+            raise ValueError("HashRing precisa de ao menos um nó")
+        self.nodes = list(nodes)
+        self.vnodes = vnodes
+        points = sorted(
+            (_hash(f"{node}#{i}"), node)
+            for node in self.nodes for i in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        if key.startswith(PINNED_PREFIXES):
+            return self.nodes[0]
+        # Hash tag no estilo Redis Cluster: "{x}" agrupa chaves no nó
+        start = key.find("{")
+        if start != -1:
+            end = key.find("}", start + 1)
+            if end > start + 1:
+                key = key[start + 1:end]
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+def _default_client(node: str) -> redis.Redis:
+    host, port = node.rsplit(":", 1)
+    pool = redis.ConnectionPool(
+        host=host,
+        port=int(port),
+        db=0,
+        decode_responses=True,
+        socket_connect_timeout=5,
+        max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", 50)),
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+class ShardedRedis:
+    """
+    Cliente com a interface de redis.Redis (o subconjunto usado pelo
+    RedisCache) que roteia cada chave para o nó dono no anel.
+
+    Args:
+        nodes: Nós "host:porta"
+        vnodes: Nós virtuais por nó
+        client_factory: Cria o cliente de um nó (padrão: redis.Redis
+            com pool próprio)
+        retry_seconds: Tempo que um nó com erro de conexão fica fora do
+            anel antes de nova tentativa (padrão: REDIS_RECONNECT_SECONDS)
+    """
+
+    def __init__(
+        self,
+        nodes: List[str],
+        vnodes: int = DEFAULT_VNODES,
+        client_factory: Callable[[str], Any] = _default_client,
+        retry_seconds: Optional[float] = None,
+    ):
+        self.ring = HashRing(nodes, vnodes)
+        self.client_factory = client_factory
+        self.clients = {node: client_factory(node) for node in nodes}
+        self.retry_seconds = (
+            float(os.getenv("REDIS_RECONNECT_SECONDS", 5))
+            if retry_seconds is None else retry_seconds
+        )
+        self._down_until: Dict[str, float] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(nodes), thread_name_prefix="redis-shard"
+        )
+
+    def client_for(self, key: str):
+        return self.clients[self.ring.node_for(key)]
+
+    def healthy(self, node: str) -> bool:
+        return time.monotonic() >= self._down_until.get(node, 0)
+
+    def _call(self, node: str, fn: Callable[..., Any], *args, **kwargs):
+        """
+        Executa um comando no nó. Erro de conexão tira o nó do anel por
+        retry_seconds; enquanto isso, os comandos a ele falham na hora.
+
+        Raises:
+            ShardUnavailable: nó fora do ar
+        """
+        if not self.healthy(node):
+            raise ShardUnavailable(f"Nó {node} indisponível")
+        try:
+            result = fn(*args, **kwargs)
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            self._down_until[node] = time.monotonic() + self.retry_seconds
+            logger.warning(
+                f"Nó {node} do cache fora do ar ({e}); nova tentativa em "
+                f"{self.retry_seconds:g}s"
+            )
+            raise ShardUnavailable(f"Nó {node} indisponível: {e}") from e
+        self._down_until.pop(node, None)
+        return result
+
+    def _group(self, keys: Iterable[str]) -> Dict[str, List[int]]:
+        """Posições das chaves agrupadas pelo nó dono."""
+        groups: Dict[str, List[int]] = {}
+        for position, key in enumerate(keys):
+            groups.setdefault(self.ring.node_for(key), []).append(position)
+        return groups
+
+    def _fan_out(self, calls: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """
+        Executa uma chamada por nó, em paralelo se houver mais de um. O
+        resultado de um nó fora do ar é a exceção ShardUnavailable.
+        """
+        def run(node: str, call: Callable[[], Any]) -> Any:
+            try:
+                return self._call(node, call)
+            except ShardUnavailable as e:
+                return e
+
+        if len(calls) == 1:
+            node, call = next(iter(calls.items()))
+            return {node: run(node, call)}
+        futures = {
+            node: self._executor.submit(run, node, call)
+            for node, call in calls.items()
+        }
+        return {node: future.result() for node, future in futures.items()}
+
+    @staticmethod
+    def _raise_unavailable(results: Dict[str, Any]) -> None:
+        for result in results.values():
+            if isinstance(result, ShardUnavailable):
+                raise result
+
+    def ping(self) -> bool:
+        """Verdadeiro se algum nó responde (os demais ficam fora do anel)."""
+        results = self._fan_out({
+            node: client.ping for node, client in self.clients.items()
+        })
+        if not any(result is True for result in results.values()):
+            raise redis.ConnectionError("Nenhum nó do cache disponível")
+        return True
+
+    def mget(self, keys: List[str]) -> List[Any]:
+        """MGET em cada nó envolvido, em paralelo, na ordem original."""
+        keys = list(keys)
+        groups = self._group(keys)
+        results = self._fan_out({
+            node: functools.partial(
+                self.clients[node].mget, [keys[p] for p in positions]
+            )
+            for node, positions in groups.items()
+        })
+        # Chaves de nós fora do ar ficam None (miss)
+        values: List[Any] = [None] * len(keys)
+        for node, positions in groups.items():
+            if isinstance(results[node], ShardUnavailable):
+                continue
+            for position, value in zip(positions, results[node]):
+                values[position] = value
+        return values
+
+    def delete(self, *keys: str) -> int:
+        groups = self._group(keys)
+        results = self._fan_out({
+            node: functools.partial(
+                self.clients[node].delete, *(keys[p] for p in positions)
+            )
+            for node, positions in groups.items()
+        })
+        self._raise_unavailable(results)
+        return sum(results.values())
+
+    def zunionstore(self, dest: str, keys, *args, **kwargs):
+        sources = list(keys)
+        nodes = {self.ring.node_for(key) for key in [dest, *sources]}
+        if len(nodes) > 1:
+            raise redis.ResponseError(
+                "ZUNIONSTORE com chaves em nós diferentes"
+            )
+        node = self.ring.node_for(dest)
+        return self._call(
+            node, self.clients[node].zunionstore, dest, keys, *args, **kwargs
+        )
+
+    def pipeline(self, transaction: bool = False) -> "ShardedPipeline":
+        return ShardedPipeline(self)
+
+    def __getattr__(self, name: str):
+        # Comandos de uma chave (get, set, incrby, expire, zincrby, ...):
+        # a chave é o primeiro argumento
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def command(key, *args, **kwargs):
+            node = self.ring.node_for(key)
+            return self._call(
+                node, getattr(self.clients[node], name), key, *args, **kwargs
+            )
+
+        return command
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        for client in self.clients.values():
+            client.close()
+
+
+class ShardedPipeline:
+    """
+    Pipeline que agrupa os comandos por nó (um pipeline por nó) e
+    devolve os resultados na ordem em que foram enfileirados.
+    """
+
+    def __init__(self, sharded: ShardedRedis):
+        self.sharded = sharded
+        self.commands: List[Tuple[str, str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def queue(key, *args, **kwargs):
+            self.commands.append((name, key, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self) -> List[Any]:
+        groups = self.sharded._group(key for _, key, _, _ in self.commands)
+
+        def run(node: str, positions: List[int]):
+            pipe = self.sharded.clients[node].pipeline(transaction=False)
+            for position in positions:
+                name, key, args, kwargs = self.commands[position]
+                getattr(pipe, name)(key, *args, **kwargs)
+            return pipe.execute()
+
+        results = self.sharded._fan_out({
+            node: functools.partial(run, node, positions)
+            for node, positions in groups.items()
+        })
+        ordered: List[Any] = [None] * len(self.commands)
+        self.commands = []
+        self.sharded._raise_unavailable(results)
+        for node, positions in groups.items():
+            for position, value in zip(positions, results[node]):
+                ordered[position] = value
+        return ordered
+
+
+def rebalance(
+    sharded: ShardedRedis, batch: int = 500, dry_run: bool = False
+) -> Dict[str, int]:
+    """
+    Move para o dono atual (segundo o anel) as chaves que estão em outro
+    nó, por exemplo depois de adicionar nós a REDIS_NODES. Preserva o
+    TTL restante e não sobrescreve uma chave que já exista no destino
+    (o valor mais novo vence).
+
+    Returns:
+        {"scanned", "moved", "skipped"}
+    """
+    stats = {"scanned": 0, "moved": 0, "skipped": 0}
+    for node, client in sharded.clients.items():
+        for key in client.scan_iter(count=batch):
+            stats["scanned"] += 1
+            owner = sharded.ring.node_for(key)
+            if owner == node:
+                continue
+            if dry_run:
+                stats["moved"] += 1
+                continue
+
+            payload = client.dump(key)
+            ttl = client.pttl(key)
+            # -1: sem expiração (RESTORE com TTL 0); -2 ou 0: expirou
+            # durante o scan e não deve voltar sem expiração no destino
+            if payload is None or (ttl != -1 and ttl <= 0):
+                continue
+            target = sharded.clients[owner]
+            try:
+                target.restore(key, 0 if ttl == -1 else ttl, payload)
+                stats["moved"] += 1
+            except redis.ResponseError:
+                # BUSYKEY: já gravada no dono depois da mudança do anel
+                stats["skipped"] += 1
+            client.delete(key)
+    logger.info(f"Rebalanceamento do cache: {stats}")
+    return stats
+
+
+def sharded_from_env(
+    client_factory: Callable[[str], Any] = _default_client
+) -> Optional[ShardedRedis]:
+    """ShardedRedis a partir de REDIS_NODES, ou None se não definido."""
+    nodes = parse_nodes(os.getenv("REDIS_NODES", ""))
+    if not nodes:
+        return None
+    vnodes = int(os.getenv("REDIS_VNODES", DEFAULT_VNODES))
+    return ShardedRedis(nodes, vnodes, client_factory)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ferramentas do cache shardeado (REDIS_NODES)"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebalance_parser = sub.add_parser(
+        "rebalance", help="move as chaves para o dono atual no anel"
+    )
+    rebalance_parser.add_argument("--batch", type=int, default=500)
+    rebalance_parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    sharded = sharded_from_env()
+    if sharded is None:
+        parser.error("REDIS_NODES não configurado")
+    stats = rebalance(sharded, args.batch, args.dry_run)
+    print(
+        f"{stats['scanned']} chaves lidas, {stats['moved']} movidas, "
+        f"{stats['skipped']} já presentes no destino"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark da busca BM25 em um corpus sintético.
+
+Uso:
+    python -m benchmarks.bench_bm25 --chunks 100000
+"""
+import argparse
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from mcp_server.tools.bm25 import BM25Index, build_bm25_index
+
+
+def synthetic_chunks(count: int, vocab_size: int, words: int, seed: int):
+    """Chunks com distribuição de termos Zipf, como texto real."""
+    rng = np.random.default_rng(seed)
+    vocab = [f"termo{i}" for i in range(vocab_size)]
+    for i in range(count):
+        ids = np.minimum(rng.zipf(1.2, words), vocab_size) - 1
+        yield {
+            "source": f"doc{i // 10}.txt",
+            "chunk": i % 10,
+            "text": " ".join(vocab[j] for j in ids),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--vocab", type=int, default=50_000)
+    parser.add_argument("--words", type=int, default=120)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        start = time.perf_counter()
+        build_bm25_index(
+            synthetic_chunks(args.chunks, args.vocab, args.words, 0),
+            index_dir
+        )
+        print(f"build: {time.perf_counter() - start:.1f}s")
+
+        index = BM25Index(index_dir)
+        random.seed(1)
+        latencies = []
+        for _ in range(args.queries):
+            query = " ".join(
+                f"termo{random.randint(0, 2000)}" for _ in range(3)
+            )
+            start = time.perf_counter()
+            index.search(query, args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(
+            f"{args.chunks} chunks, top-{args.k}: "
+            f"p50={p50:.2f}ms p95={p95:.2f}ms p99={p99:.2f}ms"
+        )
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
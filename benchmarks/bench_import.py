@@ -0,0 +1,118 @@
+"""
+Tempo de import (cold start) dos serviços, a partir de `python -X
+importtime` em um processo novo.
+
+Mostra o tempo de parede do processo e os módulos com maior tempo
+cumulativo e próprio, para achar o que entrou no caminho do import.
+
+Uso:
+    python -m benchmarks.bench_import backend.main mcp_server.server
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+from typing import Dict, List, NamedTuple, Optional
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_ms: float
+    cumulative_ms: float
+    depth: int
+
+
+class ImportProfile(NamedTuple):
+    wall_seconds: float
+    imports: List[ImportTime]
+
+    def get(self, module: str) -> Optional[ImportTime]:
+        for entry in self.imports:
+            if entry.module == module:
+                return entry
+        return None
+
+    def modules(self) -> set:
+        return {entry.module for entry in self.imports}
+
+
+def parse_importtime(output: str) -> List[ImportTime]:
+    """
+    Converte a saída de -X importtime ("import time: self | cumulative |
+    nome", em microssegundos, com o nome indentado pela profundidade).
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # cabeçalho
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        imports.append(ImportTime(
+            module=module,
+            self_ms=int(fields[0]) / 1000,
+            cumulative_ms=int(fields[1]) / 1000,
+            depth=(len(name) - len(module) - 1) // 2,
+        ))
+    return imports
+
+
+def measure(
+    module: str, env: Optional[Dict[str, str]] = None
+) -> ImportProfile:
+    """Importa `module` em um interpretador novo com -X importtime."""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"Falha ao importar {module}:\n{completed.stderr[-2000:]}"
+        )
+    return ImportProfile(wall, parse_importtime(completed.stderr))
+
+
+def report(module: str, profile: ImportProfile, top: int) -> str:
+    lines = [f"{module}: {profile.wall_seconds * 1000:.0f}ms (processo)"]
+    entry = profile.get(module)
+    if entry:
+        lines.append(f"  import: {entry.cumulative_ms:.0f}ms")
+
+    lines.append(f"  top {top} cumulativo (dependências diretas):")
+    roots = [e for e in profile.imports if e.depth == 1]
+    for e in sorted(roots, key=lambda e: -e.cumulative_ms)[:top]:
+        lines.append(f"    {e.cumulative_ms:8.1f}ms  {e.module}")
+
+    lines.append(f"  top {top} tempo próprio:")
+    for e in sorted(profile.imports, key=lambda e: -e.self_ms)[:top]:
+        lines.append(f"    {e.self_ms:8.1f}ms  {e.module}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "modules", nargs="*", default=["backend.main", "mcp_server.server"]
+    )
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument(
+        "--redis-down", action="store_true",
+        help="aponta REDIS_HOST para um endereço sem resposta"
+    )
+    args = parser.parse_args()
+
+    env = {"REDIS_HOST": "10.255.255.1"} if args.redis_down else None
+    for module in args.modules:
+        print(report(module, measure(module, env), args.top))
+
+
+if __name__ == "__main__":
+    main()
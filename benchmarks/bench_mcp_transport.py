@@ -0,0 +1,152 @@
+"""
+Overhead por chamada de tool: transporte HTTP (MCP Server em outro
+processo) vs in-process (transporte em memória do FastMCP).
+
+Mede o caminho do agente (AIAssistant._call_mcp_tool, que abre uma
+sessão MCP por chamada) e chamadas em uma sessão já aberta, que isolam o
+custo do transporte e da serialização. A tool padrão é get_weather com
+cidade vazia: valida e retorna sem rede nem Redis, então o tempo medido
+é quase só overhead (inclui o pool de threads das tools nos dois modos).
+
+Uso:
+    python -m benchmarks.bench_mcp_transport --calls 200
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from typing import Any, Dict, List
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("REDIS_ENABLED", "false")
+
+from backend.core.agent import AIAssistant  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_http_server(port: int) -> subprocess.Popen:
+    """Sobe o MCP Server (streamable HTTP) em um processo separado."""
+    process = subprocess.Popen(
+        [
+            sys.executable, "-c",
+            "from mcp_server.server import mcp; "
+            f"mcp.run(transport='streamable-http', port={port})",
+        ],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("MCP Server HTTP não subiu em 30s")
+
+
+def _summary(latencies: List[float]) -> Dict[str, float]:
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {
+        "mean_ms": float(np.mean(latencies)),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+    }
+
+
+async def measure(
+    assistant: AIAssistant,
+    tool: str,
+    arguments: Dict[str, Any],
+    calls: int,
+    warmup: int,
+) -> Dict[str, Dict[str, float]]:
+    for _ in range(warmup):
+        await assistant._call_mcp_tool(tool, arguments)
+
+    per_call = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await assistant._call_mcp_tool(tool, arguments)
+        per_call.append((time.perf_counter() - start) * 1000)
+
+    # _call_mcp_tool reaproveita a sessão aberta aqui (contexto aninhado)
+    reused = []
+    async with assistant._mcp_client:
+        for _ in range(calls):
+            start = time.perf_counter()
+            await assistant._call_mcp_tool(tool, arguments)
+            reused.append((time.perf_counter() - start) * 1000)
+
+    return {"per_call": _summary(per_call), "reused": _summary(reused)}
+
+
+async def run(args) -> Dict[str, Dict[str, Dict[str, float]]]:
+    arguments = json.loads(args.arguments)
+    results = {}
+
+    os.environ["MCP_TRANSPORT"] = "inprocess"
+    results["inprocess"] = await measure(
+        AIAssistant(), args.tool, arguments, args.calls, args.warmup
+    )
+
+    port = _free_port()
+    server = start_http_server(port)
+    try:
+        os.environ["MCP_TRANSPORT"] = "http"
+        os.environ["MCP_SERVER_URL"] = f"http://127.0.0.1:{port}"
+        results["http"] = await measure(
+            AIAssistant(), args.tool, arguments, args.calls, args.warmup
+        )
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tool", default="get_weather")
+    parser.add_argument("--arguments", default='{"city": ""}')
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"{args.tool} {args.arguments}, {args.calls} chamadas")
+    for mode, scenarios in results.items():
+        for scenario, stats in scenarios.items():
+            label = (
+                "sessão por chamada" if scenario == "per_call"
+                else "sessão reutilizada"
+            )
+            print(
+                f"  {mode:<9} {label:<18} "
+                f"média={stats['mean_ms']:.2f}ms "
+                f"p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms"
+            )
+    for scenario in ("per_call", "reused"):
+        ratio = (
+            results["http"][scenario]["p50_ms"]
+            / results["inprocess"][scenario]["p50_ms"]
+        )
+        print(f"  http/inprocess (p50, {scenario}): {ratio:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark de recall e latência: busca exata x IVF.
+
+Uso:
+    python -m benchmarks.bench_vector_search --vectors 200000 --lists 512
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from mcp_server.tools.vectors import VectorBuilder, VectorIndex
+
+
+def clustered_vectors(
+    centers: np.ndarray, count: int, noise: float, seed: int
+) -> np.ndarray:
+    """Vetores normalizados espalhados em torno de centros aleatórios."""
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, len(centers), count)
+    vectors = centers[labels] + noise * rng.standard_normal(
+        (count, centers.shape[1])
+    ).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def percentiles(latencies):
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return f"p50={p50:.2f}ms p95={p95:.2f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--lists", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--dtype", default="float32")
+    parser.add_argument("--noise", type=float, default=1.5)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    centers = np.random.default_rng(0).standard_normal(
+        (1000, args.dim)
+    ).astype(np.float32) / np.sqrt(args.dim)
+    data = clustered_vectors(
+        centers, args.vectors, args.noise / np.sqrt(args.dim), 1)
+    queries = clustered_vectors(
+        centers, args.queries, args.noise / np.sqrt(args.dim), 2)
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        builder = VectorBuilder()
+        builder.embedder.dim = args.dim
+        builder.add_vectors(data)
+        start = time.perf_counter()
+        builder.write(index_dir, dtype=args.dtype, ivf_lists=args.lists)
+        print(f"build (IVF {args.lists} listas): "
+              f"{time.perf_counter() - start:.1f}s")
+
+        index = VectorIndex(index_dir, with_store=False)
+
+        start = time.perf_counter()
+        truth, _ = index.exact_search(queries, args.k)
+        batch_ms = (time.perf_counter() - start) * 1000
+        print(f"exata em lote: {batch_ms / args.queries:.2f}ms/consulta")
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.exact_search(query, args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"exata:          recall@{args.k}=1.000 "
+              f"{percentiles(latencies)}")
+
+        for nprobe in (1, 4, 8, 16, 32):
+            latencies, hits = [], 0
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                ids, _ = index.ivf_search(query, args.k, nprobe)
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += len(np.intersect1d(ids[0], expected))
+            recall = hits / (args.k * args.queries)
+            print(f"ivf nprobe={nprobe:<3} recall@{args.k}={recall:.3f} "
+                  f"{percentiles(latencies)}")
+
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+"""
+Simulador offline de políticas de cache sobre tráfego capturado
+(backend/api/capture.py).
+
+Reproduz a chave do RedisCache para respostas do LLM (query exata, ou
+query + contexto quando a sessão já tem histórico) e para get_weather
+(argumentos normalizados como em ToolResultCache), sob combinações de:
+- TTL das respostas (CACHE_TTL_SECONDS) e do clima
+  (WEATHER_CACHE_TTL_SECONDS)
+- memória do Redis (maxmemory) e política de despejo (LRU ou LFU)
+- normalização da query antes do hash
+
+Para cada combinação reporta hit ratio, memória, chamadas ao LLM e à API
+de clima evitadas e o custo economizado.
+
+O log é lido em streaming e cada cache guarda só hashes de 8 bytes e
+tamanhos: a memória usada depende do tamanho dos caches simulados, não
+do tamanho do log.
+
+Uso:
+    python -m benchmarks.cache_sim logs/capture.jsonl \\
+        --ttl 600,86400 --capacity 64mb,none --policy lru,lfu \\
+        --normalize none,casefold
+"""
+import re
+import json
+import hashlib
+import argparse
+import itertools
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from backend.api.capture import read_capture
+from backend.core.tool_cache import normalize_arguments
+from mcp_server.tools.text import normalize
+
+# Custo estimado por entrada no Redis além de chave e valor
+ENTRY_OVERHEAD_BYTES = 64
+LLM_KEY_BYTES = len("llm_query:00000000:g0:0000000000000000")
+WEATHER_KEY_BYTES = len("tool:get_weather:00000000:g0:0000000000000000")
+WEATHER_VALUE_BYTES = 220
+MAX_TRACKED_SESSIONS = 100_000
+SIZE_UNITS = (("gb", 1024 ** 3), ("mb", 1024 ** 2), ("kb", 1024))
+
+_QUERY_TOKEN_RE = re.compile(r"[a-z0-9]+|[-+*/^().]")
+
+NORMALIZERS: Dict[str, Callable[[str], str]] = {
+    # Comportamento atual: hash da query exata
+    "none": lambda query: query,
+    "whitespace": lambda query: " ".join(query.split()),
+    "casefold": lambda query: " ".join(query.casefold().split()),
+    # Sem acentos e pontuação (mantém operadores da calculadora)
+    "aggressive": lambda query: " ".join(
+        _QUERY_TOKEN_RE.findall(normalize(query))
+    ),
+}
+
+
+def key_hash(*parts: str) -> int:
+    """Hash de 8 bytes: o simulador não guarda as queries."""
+    digest = hashlib.blake2b(
+        "\x1f".join(parts).encode(), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "little")
+
+
+def parse_size(value: str) -> Optional[int]:
+    """'64mb' -> bytes; 'none' -> sem limite."""
+    value = value.strip().lower()
+    if value in ("none", "0", ""):
+        return None
+    for suffix, factor in SIZE_UNITS:
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * factor)
+    return int(value)
+
+
+def parse_ttl(value: str) -> Optional[int]:
+    value = value.strip().lower()
+    return None if value in ("none", "0", "") else int(value)
+
+
+def format_size(size: Optional[int]) -> str:
+    if size is None:
+        return "none"
+    for suffix, factor in SIZE_UNITS:
+        if size >= factor:
+            return f"{size / factor:.4g}{suffix}"
+    return str(size)
+
+
+class CacheModel:
+    """
+    Modelo de um Redis com maxmemory, despejo LRU ou LFU e TTL por
+    entrada.
+
+    O LFU é exato (contagem de acessos, empate pelo mais antigo); o
+    Redis usa um contador logarítmico com decaimento, então os
+    resultados são uma aproximação.
+    """
+
+    def __init__(self, capacity: Optional[int], policy: str = "lru"):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Política desconhecida: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        # key -> [tamanho, expira_em, frequência]
+        self.entries: Dict[int, List[Any]] = {}
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        self._buckets: Dict[int, "OrderedDict[int, None]"] = {}
+        # Um deque por TTL: com TTL fixo, a expiração segue a ordem de
+        # inserção e pode ser feita de forma ativa e barata
+        self._expiry: Dict[int, deque] = {}
+
+        self.bytes = 0
+        self.peak_bytes = 0
+        self.peak_entries = 0
+        self.evictions = 0
+
+    def _touch(self, key: int, entry: List[Any]) -> None:
+        if self.policy == "lru":
+            self._lru.move_to_end(key)
+            return
+        bucket = self._buckets[entry[2]]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[entry[2]]
+        entry[2] += 1
+        self._buckets.setdefault(entry[2], OrderedDict())[key] = None
+
+    def _remove(self, key: int) -> None:
+        entry = self.entries.pop(key)
+        self.bytes -= entry[0]
+        if self.policy == "lru":
+            del self._lru[key]
+        else:
+            bucket = self._buckets[entry[2]]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[entry[2]]
+
+    def _evict_one(self) -> None:
+        if self.policy == "lru":
+            key = next(iter(self._lru))
+        else:
+            key = next(iter(self._buckets[min(self._buckets)]))
+        self._remove(key)
+        self.evictions += 1
+
+    def expire(self, now: float) -> None:
+        for queue in self._expiry.values():
+            while queue and queue[0][0] <= now:
+                expires_at, key = queue.popleft()
+                entry = self.entries.get(key)
+                if entry is not None and entry[1] == expires_at:
+                    self._remove(key)
+
+    def get(self, key: int, now: float) -> bool:
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        if entry[1] is not None and entry[1] <= now:
+            self._remove(key)
+            return False
+        self._touch(key, entry)
+        return True
+
+    def set(self, key: int, size: int, ttl: Optional[int], now: float):
+        if key in self.entries:
+            self._remove(key)
+        if self.capacity is not None:
+            if size > self.capacity:
+                return
+            while self.bytes + size > self.capacity:
+                self._evict_one()
+
+        expires_at = now + ttl if ttl is not None else None
+        self.entries[key] = [size, expires_at, 1]
+        if self.policy == "lru":
+            self._lru[key] = None
+        else:
+            self._buckets.setdefault(1, OrderedDict())[key] = None
+        if expires_at is not None:
+            self._expiry.setdefault(ttl, deque()).append((expires_at, key))
+
+        self.bytes += size
+        self.peak_bytes = max(self.peak_bytes, self.bytes)
+        self.peak_entries = max(self.peak_entries, len(self.entries))
+
+
+class Simulation:
+    """Uma configuração de cache sendo simulada."""
+
+    def __init__(
+        self,
+        ttl: Optional[int],
+        weather_ttl: Optional[int],
+        capacity: Optional[int],
+        policy: str,
+        normalization: str,
+    ):
+        self.config = {
+            "ttl": ttl,
+            "weather_ttl": weather_ttl,
+            "capacity": format_size(capacity),
+            "policy": policy,
+            "normalize": normalization,
+        }
+        self.ttl = ttl
+        self.weather_ttl = weather_ttl
+        self.normalization = normalization
+        self.cache = CacheModel(capacity, policy)
+
+        self.requests = 0
+        self.llm_hits = 0
+        self.with_context = 0
+        self.weather_calls = 0
+        self.weather_hits = 0
+
+    def process(
+        self,
+        now: float,
+        query_key: int,
+        value_bytes: int,
+        weather_keys: List[int],
+    ) -> None:
+        self.requests += 1
+        self.cache.expire(now)
+
+        if self.cache.get(query_key, now):
+            self.llm_hits += 1
+            return
+
+        # Miss: o agente roda, chama as tools e grava a resposta
+        for weather_key in weather_keys:
+            self.weather_calls += 1
+            if self.cache.get(weather_key, now):
+                self.weather_hits += 1
+            else:
+                self.cache.set(
+                    weather_key,
+                    ENTRY_OVERHEAD_BYTES + WEATHER_KEY_BYTES
+                    + WEATHER_VALUE_BYTES,
+                    self.weather_ttl,
+                    now,
+                )
+
+        self.cache.set(
+            query_key,
+            ENTRY_OVERHEAD_BYTES + LLM_KEY_BYTES + value_bytes,
+            self.ttl,
+            now,
+        )
+
+    def report(self, cost_per_call: float) -> Dict[str, Any]:
+        return {
+            "config": self.config,
+            "requests": self.requests,
+            "llm": {
+                "hits": self.llm_hits,
+                "calls": self.requests - self.llm_hits,
+                "hit_ratio": (
+                    round(self.llm_hits / self.requests, 4)
+                    if self.requests else 0.0
+                ),
+                "with_session_context": self.with_context,
+            },
+            "weather": {
+                "calls": self.weather_calls,
+                "hits": self.weather_hits,
+                "api_calls": self.weather_calls - self.weather_hits,
+            },
+            "memory": {
+                "peak_bytes": self.cache.peak_bytes,
+                "final_bytes": self.cache.bytes,
+                "peak_entries": self.cache.peak_entries,
+                "evictions": self.cache.evictions,
+            },
+            "llm_calls_saved": self.llm_hits,
+            "cost_saved_usd": round(self.llm_hits * cost_per_call, 4),
+        }
+
+
+class SessionTracker:
+    """Turnos por sessão, com limite de sessões acompanhadas (LRU)."""
+
+    def __init__(self, max_sessions: int = MAX_TRACKED_SESSIONS):
+        self.max_sessions = max_sessions
+        self.turns: "OrderedDict[str, int]" = OrderedDict()
+
+    def next_turn(self, session_id: Optional[str]) -> int:
+        if not session_id:
+            return 0
+        turn = self.turns.pop(session_id, 0)
+        self.turns[session_id] = turn + 1
+        if len(self.turns) > self.max_sessions:
+            self.turns.popitem(last=False)
+        return turn
+
+
+def simulate(
+    records: Iterable[Dict[str, Any]],
+    simulations: List[Simulation],
+    value_bytes: int = 1500,
+    cost_per_call: float = 0.0,
+) -> List[Dict[str, Any]]:
+    """
+    Passa o log uma única vez por todas as configurações.
+
+    Args:
+        records: Registros da captura, em ordem de timestamp (streaming)
+        simulations: Configurações a simular
+        value_bytes: Tamanho da resposta quando o registro não o informa
+        cost_per_call: Custo estimado de uma chamada ao LLM (USD)
+    """
+    sessions = SessionTracker()
+    normalizations = sorted({s.normalization for s in simulations})
+
+    for record in records:
+        now = float(record.get("ts", 0))
+        turn = sessions.next_turn(record.get("session_id"))
+        size = int(record.get("response_bytes") or value_bytes)
+        weather_keys = [
+            key_hash("get_weather", normalize_arguments(
+                "get_weather", {"city": str(tool_input)}
+            ))
+            for tool, tool_input in record.get("tools") or []
+            if tool == "get_weather"
+        ]
+
+        query_keys = {}
+        for name in normalizations:
+            data = NORMALIZERS[name](record["query"])
+            if turn:
+                # Com histórico, a chave inclui o contexto da sessão
+                data = f"{data}\x1e{record['session_id']}:{turn}"
+            query_keys[name] = key_hash("llm_query", data)
+
+        for simulation in simulations:
+            simulation.with_context += bool(turn)
+            simulation.process(
+                now, query_keys[simulation.normalization], size,
+                weather_keys
+            )
+
+    return [s.report(cost_per_call) for s in simulations]
+
+
+def build_simulations(
+    ttls: List[Optional[int]],
+    weather_ttls: List[Optional[int]],
+    capacities: List[Optional[int]],
+    policies: List[str],
+    normalizations: List[str],
+) -> List[Simulation]:
+    for name in normalizations:
+        if name not in NORMALIZERS:
+            raise ValueError(f"Normalização desconhecida: {name}")
+    return [
+        Simulation(ttl, weather_ttl, capacity, policy, name)
+        for ttl, weather_ttl, capacity, policy, name in itertools.product(
+            ttls, weather_ttls, capacities, policies, normalizations
+        )
+    ]
+
+
+def print_table(reports: List[Dict[str, Any]]) -> None:
+    header = (
+        f"{'ttl':>7} {'clima':>6} {'memória':>8} {'pol':>4} "
+        f"{'normaliz.':>10} {'hit%':>6} {'llm':>8} {'api clima':>9} "
+        f"{'pico mem':>9} {'despejos':>8} {'economia':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for report in sorted(
+        reports, key=lambda r: -r["llm"]["hit_ratio"]
+    ):
+        config = report["config"]
+        print(
+            f"{str(config['ttl']):>7} {str(config['weather_ttl']):>6} "
+            f"{config['capacity']:>8} {config['policy']:>4} "
+            f"{config['normalize']:>10} "
+            f"{report['llm']['hit_ratio'] * 100:>5.1f}% "
+            f"{report['llm']['calls']:>8} "
+            f"{report['weather']['api_calls']:>9} "
+            f"{format_size(report['memory']['peak_bytes']):>9} "
+            f"{report['memory']['evictions']:>8} "
+            f"${report['cost_saved_usd']:>8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("capture", help="Arquivo JSONL da captura")
+    parser.add_argument("--ttl", default="600,3600,86400")
+    parser.add_argument("--weather-ttl", default="1800")
+    parser.add_argument("--capacity", default="64mb,256mb,none")
+    parser.add_argument("--policy", default="lru")
+    parser.add_argument("--normalize", default="none,casefold")
+    parser.add_argument(
+        "--value-bytes", type=int, default=1500,
+        help="Tamanho da resposta quando a captura não o registra"
+    )
+    parser.add_argument(
+        "--prompt-tokens", type=int, default=1200,
+        help="Tokens de entrada por chamada (ver /v1/metrics)"
+    )
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument(
+        "--price-in", type=float, default=0.15,
+        help="USD por 1M tokens de entrada"
+    )
+    parser.add_argument(
+        "--price-out", type=float, default=0.60,
+        help="USD por 1M tokens de saída"
+    )
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    def split(value):
+        return [item for item in value.split(",") if item.strip()]
+
+    simulations = build_simulations(
+        [parse_ttl(v) for v in split(args.ttl)],
+        [parse_ttl(v) for v in split(args.weather_ttl)],
+        [parse_size(v) for v in split(args.capacity)],
+        split(args.policy),
+        split(args.normalize),
+    )
+    cost_per_call = (
+        args.prompt_tokens * args.price_in
+        + args.completion_tokens * args.price_out
+    ) / 1_000_000
+
+    reports = simulate(
+        read_capture(args.capture),
+        simulations,
+        value_bytes=args.value_bytes,
+        cost_per_call=cost_per_call,
+    )
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print_table(reports)
+
+
+if __name__ == "__main__":
+    main()
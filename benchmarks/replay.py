@@ -0,0 +1,221 @@
+"""
+Replay de tráfego capturado (backend/api/capture.py) contra /v1/query.
+
+Modos:
+- ritmo original: --speed 1 (padrão)
+- acelerado: --speed N (intervalos divididos por N)
+- vazão máxima: --max (ignora os timestamps)
+
+Em todos os modos, --concurrency limita as requisições simultâneas; se o
+ritmo pedido não couber nesse limite, o atraso em relação à agenda
+aparece em "schedule_lag_ms".
+
+Uso:
+    python -m benchmarks.replay logs/capture.jsonl --speed 10
+    python -m benchmarks.replay logs/capture.jsonl --max --concurrency 32
+"""
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+import numpy as np
+
+from backend.api.capture import read_capture
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {f"p{p}": 0.0 for p in PERCENTILES}
+    result = np.percentile(np.asarray(values), PERCENTILES)
+    return {
+        f"p{p}": round(float(v), 1) for p, v in zip(PERCENTILES, result)
+    }
+
+
+class ReplayStats:
+    """Acumula latências, erros e acertos de cache do replay."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.captured_latencies: List[float] = []
+        self.errors = 0
+        self.cached = 0
+        self.max_lag_ms = 0.0
+
+    def add(self, latency_ms: float, ok: bool, cached: bool) -> None:
+        if not ok:
+            self.errors += 1
+            return
+        self.latencies.append(latency_ms)
+        self.cached += cached
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        total = len(self.latencies) + self.errors
+        return {
+            "requests": total,
+            "errors": self.errors,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0,
+            "latency_ms": {
+                **percentiles(self.latencies),
+                "max": round(max(self.latencies, default=0.0), 1),
+            },
+            "captured_latency_ms": percentiles(self.captured_latencies),
+            "cache_hit_ratio": (
+                round(self.cached / len(self.latencies), 4)
+                if self.latencies else 0.0
+            ),
+            "schedule_lag_ms": round(self.max_lag_ms, 1),
+        }
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    record: Dict[str, Any],
+    sessions: Dict[str, "asyncio.Future[httpx.Response]"],
+    stats: ReplayStats,
+) -> None:
+    payload = {"query": record["query"]}
+    if record.get("session_id"):
+        # Uma sessão nova do servidor por sessão capturada e execução:
+        # replays seguidos não compartilham sessões
+        if record["session_id"] not in sessions:
+            sessions[record["session_id"]] = asyncio.ensure_future(
+                client.post("/v1/sessions")
+            )
+        try:
+            session = await sessions[record["session_id"]]
+            payload["session_id"] = session.json()["session_id"]
+        except (httpx.HTTPError, ValueError, KeyError):
+            pass
+
+    start = time.perf_counter()
+    try:
+        response = await client.post("/v1/query", json=payload)
+        data = response.json() if response.status_code == 200 else {}
+        ok = bool(data.get("success"))
+        cached = bool(data.get("cached"))
+    except (httpx.HTTPError, ValueError):
+        ok, cached = False, False
+    stats.add((time.perf_counter() - start) * 1000, ok, cached)
+
+
+async def replay(
+    records: Iterable[Dict[str, Any]],
+    client: httpx.AsyncClient,
+    speed: Optional[float] = 1.0,
+    concurrency: int = 64,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Reenvia os registros capturados e retorna o relatório.
+
+    Args:
+        records: Registros da captura, em ordem de timestamp (streaming)
+        client: Cliente HTTP apontando para o backend
+        speed: Fator sobre o ritmo original; None = vazão máxima
+        concurrency: Máximo de requisições simultâneas
+        limit: Máximo de registros reenviados
+    """
+    stats = ReplayStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    sessions: Dict[str, "asyncio.Future[httpx.Response]"] = {}
+    tasks = set()
+
+    async def worker(record):
+        try:
+            await _send(client, record, sessions, stats)
+        finally:
+            semaphore.release()
+
+    start = time.perf_counter()
+    first_ts = None
+    for count, record in enumerate(records):
+        if limit is not None and count >= limit:
+            break
+        if "latency_ms" in record:
+            stats.captured_latencies.append(record["latency_ms"])
+
+        if speed:
+            first_ts = record["ts"] if first_ts is None else first_ts
+            target = start + (record["ts"] - first_ts) / speed
+            delay = target - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        await semaphore.acquire()
+        if speed:
+            lag_ms = (time.perf_counter() - target) * 1000
+            stats.max_lag_ms = max(stats.max_lag_ms, lag_ms)
+
+        task = asyncio.create_task(worker(record))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    return stats.report(time.perf_counter() - start)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    latency = report["latency_ms"]
+    captured = report["captured_latency_ms"]
+    print(
+        f"requisições: {report['requests']} "
+        f"(erros: {report['errors']}) em {report['elapsed_s']}s "
+        f"-> {report['throughput_rps']} req/s"
+    )
+    print(
+        "latência (ms): "
+        + " ".join(f"{k}={v}" for k, v in latency.items())
+    )
+    print(
+        "latência capturada (ms): "
+        + " ".join(f"{k}={v}" for k, v in captured.items())
+    )
+    print(f"cache hit ratio: {report['cache_hit_ratio']:.1%}")
+    print(f"atraso máximo na agenda: {report['schedule_lag_ms']}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("capture", help="Arquivo JSONL da captura")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument(
+        "--max", action="store_true", help="Vazão máxima (sem ritmo)"
+    )
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument(
+        "--json", action="store_true", help="Imprime o relatório em JSON"
+    )
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(
+        base_url=args.url,
+        timeout=args.timeout,
+        limits=httpx.Limits(max_connections=args.concurrency),
+    ) as client:
+        report = await replay(
+            read_capture(args.capture),
+            client,
+            speed=None if args.max else args.speed,
+            concurrency=args.concurrency,
+            limit=args.limit,
+        )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -17,10 +17,21 @@ st.set_page_config(
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
 
 
+def new_session():
+    """Pede ao backend um id de sessão (None: conversa sem contexto)."""
+    try:
+        response = requests.post(f"{BACKEND_URL}/v1/sessions", timeout=5)
+        return response.json()["session_id"]
+    except (requests.exceptions.RequestException, ValueError, KeyError):
+        return None
+
+
 if "messages" not in st.session_state:
     st.session_state.messages = []
 if "tools_used" not in st.session_state:
     st.session_state.tools_used = []
+if not st.session_state.get("session_id"):
+    st.session_state.session_id = new_session()
 
 
 st.title("🤖 AI Assistant - Desafio Técnico")
@@ -36,8 +47,18 @@ with st.sidebar:
     st.info("**Weather API**: Consulta clima de cidades")
 
     if st.button("🗑️ Limpar Conversa"):
+        try:
+            if st.session_state.session_id:
+                requests.delete(
+                    f"{BACKEND_URL}/v1/sessions/"
+                    f"{st.session_state.session_id}",
+                    timeout=5
+                )
+        except requests.exceptions.RequestException:
+            pass
         st.session_state.messages = []
         st.session_state.tools_used = []
+        st.session_state.session_id = new_session()
         st.rerun()
 
     st.divider()
@@ -71,7 +92,12 @@ if prompt := st.chat_input("Digite sua pergunta..."):
             try:
                 response = requests.post(
                     f"{BACKEND_URL}/v1/query",
-                    json={"query": prompt},
+                    json={
+                        "query": prompt,
+                        "session_id": st.session_state.session_id
+                    },
+                    # O backend cancela o trabalho quando o prazo acaba
+                    headers={"X-Request-Timeout": "30"},
                     timeout=30
                 )
 
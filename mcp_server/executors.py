@@ -0,0 +1,270 @@
+"""
+Executores das tools do MCP Server.
+
+As tools não rodam no event loop do FastMCP:
+- "process": pool de processos para trabalho CPU-bound (calculator), com
+  timeout por tarefa e reciclagem de workers
+- "thread": pool de threads para I/O bloqueante (clima, índices em mmap)
+
+Assim uma expressão cara não trava as demais tools e o servidor usa mais
+de um núcleo.
+"""
+import os
+import time
+import asyncio
+import functools
+import contextvars
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from fastmcp.server.dependencies import get_context
+
+from backend.utils.cache import cache
+from backend.utils.deadline import (
+    DEADLINE_META_KEY, deadline_scope, expired, remaining, timeout_for
+)
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+LATENCY_WINDOW = 1024
+
+
+def deadline_error() -> Dict[str, Any]:
+    """Resultado de uma tool cortada pelo prazo da requisição."""
+    return {"error": "Prazo da requisição esgotado", "transient": True}
+
+
+class PoolStats:
+    """Profundidade de fila e latência (envio até conclusão) de um pool."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.recycles = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def started(self) -> None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finished(self, elapsed_ms: float, ok: bool) -> None:
+        self.in_flight -= 1
+        self.latencies.append(elapsed_ms)
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = np.asarray(self.latencies, dtype=np.float64)
+        percentiles = (
+            np.percentile(latencies, [50, 95, 99]).round(2).tolist()
+            if len(latencies) else [0.0, 0.0, 0.0]
+        )
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "max_queue_depth": max(0, self.max_in_flight - self.workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "recycles": self.recycles,
+            "latency_ms": dict(zip(("p50", "p95", "p99"), percentiles)),
+        }
+
+
+class ToolExecutors:
+    """Pools de processos e threads compartilhados pelas tools."""
+
+    def __init__(
+        self,
+        process_workers: Optional[int] = None,
+        thread_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_tasks_per_child: Optional[int] = None,
+    ):
+        self.process_workers = process_workers or int(
+            os.getenv("MCP_PROCESS_WORKERS", os.cpu_count() or 1)
+        )
+        self.thread_workers = thread_workers or int(
+            os.getenv("MCP_THREAD_WORKERS", 16)
+        )
+        self.timeout = timeout or float(
+            os.getenv("MCP_TOOL_TIMEOUT_SECONDS", 10)
+        )
+        self.max_tasks_per_child = max_tasks_per_child or int(
+            os.getenv("MCP_PROCESS_MAX_TASKS_PER_CHILD", 200)
+        )
+
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self.stats = {
+            "process": PoolStats(self.process_workers),
+            "thread": PoolStats(self.thread_workers),
+        }
+
+    def _get_pool(self, pool: str):
+        """Cria os pools sob demanda (sem custo no import/testes)."""
+        if pool == "process":
+            if self._process_pool is None:
+                # Workers são substituídos a cada max_tasks_per_child
+                # tarefas, limitando vazamentos de memória
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+            return self._process_pool
+
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers,
+                thread_name_prefix="mcp-tool",
+            )
+        return self._thread_pool
+
+    def _recycle_process_pool(self) -> None:
+        """
+        Encerra os workers do pool de processos, inclusive o que estourou
+        o timeout (não há como cancelar uma tarefa em execução).
+        """
+        pool, self._process_pool = self._process_pool, None
+        if pool is None:
+            return
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+        self.stats["process"].recycles += 1
+        logger.warning("Pool de processos reciclado após timeout")
+
+    async def run(
+        self,
+        pool: str,
+        fn: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> Any:
+        """
+        Executa `fn` no pool indicado ("process" ou "thread").
+
+        Returns:
+            Retorno de `fn`, ou {"error": ..., "transient": True} em caso
+            de timeout. Se quem cortou a tarefa foi o prazo da requisição
+            (tempo restante menor que o timeout), o erro é o de prazo
+            esgotado, não o de timeout da tool
+
+        Raises:
+            Exceções levantadas por `fn`
+        """
+        # O prazo da requisição (ContextVar) também limita a tarefa
+        limit = timeout or self.timeout
+        left = remaining()
+        cut_by_deadline = left is not None and left <= limit
+        timeout = timeout_for(limit)
+        stats = self.stats[pool]
+        call = functools.partial(fn, *args, **kwargs)
+        if pool == "thread":
+            # Threads enxergam os ContextVars da chamada (ex: deadline)
+            call = functools.partial(contextvars.copy_context().run, call)
+        loop = asyncio.get_running_loop()
+
+        stats.started()
+        start = time.perf_counter()
+        outcome = "failed"
+        try:
+            executor = self._get_pool(pool)
+            try:
+                result = await asyncio.wait_for(
+                    loop.run_in_executor(executor, call), timeout
+                )
+            except BrokenProcessPool:
+                # Tarefa derrubada junto com um worker reciclado:
+                # tenta de novo uma vez no pool novo
+                if executor is self._process_pool:
+                    self._process_pool = None
+                result = await asyncio.wait_for(
+                    loop.run_in_executor(self._get_pool(pool), call),
+                    timeout
+                )
+            outcome = "completed"
+            return result
+        except asyncio.TimeoutError:
+            if pool == "process":
+                self._recycle_process_pool()
+            if cut_by_deadline:
+                outcome = "expired"
+                return deadline_error()
+            outcome = "timeout"
+            stats.timeouts += 1
+            logger.warning(
+                f"Timeout de {timeout:.3g}s na tool",
+                extra={"tool_name": getattr(fn, "__name__", str(fn))}
+            )
+            return {
+                "error": f"Tempo limite de {timeout:.3g}s excedido",
+                "transient": True,
+            }
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stats.finished(elapsed_ms, outcome == "completed")
+            cache.increment_metrics({
+                f"executor_tasks:{pool}": 1,
+                f"executor_task_ms:{pool}": int(elapsed_ms),
+                f"executor_{outcome}:{pool}": 1,
+            })
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {pool: stats.snapshot() for pool, stats in self.stats.items()}
+
+    def shutdown(self) -> None:
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+
+
+executors = ToolExecutors()
+
+
+def _request_deadline() -> Optional[float]:
+    """Prazo enviado pelo cliente no `_meta` da chamada MCP, se houver."""
+    try:
+        meta = get_context().request_context.meta
+    except (RuntimeError, LookupError, ValueError):
+        return None
+    value = getattr(meta, DEADLINE_META_KEY, None) if meta else None
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def offloaded(mcp, pool: str):
+    """
+    Registra uma função síncrona como tool do MCP executada em `pool`.
+
+    A tool registrada é uma corrotina com o mesmo nome, assinatura e
+    docstring; a função original é devolvida intacta (chamável
+    diretamente, como nos testes). O prazo recebido no `_meta` limita o
+    timeout da tarefa; com o prazo já esgotado a tool nem é executada.
+    """
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        async def tool(*args, **kwargs):
+            with deadline_scope(at=_request_deadline()):
+                if expired():
+                    cache.increment_metric(f"executor_expired:{pool}")
+                    return deadline_error()
+                return await executors.run(pool, fn, *args, **kwargs)
+
+        mcp.tool()(tool)
+        return fn
+    return decorator
@@ -1,10 +1,10 @@
-import ast
-import math
-import operator
 import os
 import sys
-import httpx
+import asyncio
+import threading
 from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
@@ -12,6 +12,19 @@ sys.path.append(parent_dir)
 
 
 from backend.utils.cache import cache
+from backend.utils.deadline import timeout_for
+from backend.utils.profiling import (
+    DEBUG_TOKEN_HEADER, AllocationTracker, ProfilerBusy, debug_status,
+    profile
+)
+from mcp_server.executors import executors, offloaded
+from mcp_server.tools.calculator import calculator
+from mcp_server.tools.index import DocumentIndex
+from mcp_server.tools.weather import (
+    WEATHER_CACHE_TTL, WEATHER_NEGATIVE_TTL, fetch_weather, is_not_found,
+    weather_cache_key
+)
+
 mcp = FastMCP(
     name="AI Assistant Calculator",
     host="0.0.0.0",
@@ -20,104 +33,85 @@ mcp = FastMCP(
     debug=False
 )
 
-OPERATORS = {
-    ast.Add: operator.add,
-    ast.Sub: operator.sub,
-    ast.Mult: operator.mul,
-    ast.Div: operator.truediv,
-    ast.Pow: operator.pow,
-    ast.USub: operator.neg,
-}
-
-
-def _eval_ast_node(node):
-    """Avalia um nó AST de forma segura (sem eval)."""
-    if isinstance(node, ast.Constant):
-        return node.value
-    elif isinstance(node, ast.BinOp):
-        op = OPERATORS.get(type(node.op))
-        if not op:
-            raise ValueError(
-                f"Operador não suportado: {type(node.op).__name__}")
-        return op(_eval_ast_node(node.left), _eval_ast_node(node.right))
-    elif isinstance(node, ast.UnaryOp):
-        op = OPERATORS.get(type(node.op))
-        if not op:
-            raise ValueError(
-                f"Operador unário não suportado: {type(node.op).__name__}")
-        return op(_eval_ast_node(node.operand))
-    else:
-        raise ValueError(
-            f"Tipo de expressão não suportado: {type(node).__name__}")
-
-
-@mcp.tool()
-def calculator(expression: str) -> dict:
-    """
-    Executa cálculos matemáticos de forma segura.
-
-    Args:
-        expression: Expressão matemática a ser calculada
+# calculator é CPU-bound: roda no pool de processos; as demais tools
+# fazem I/O bloqueante (HTTP, Redis, mmap) e rodam no pool de threads
+offloaded(mcp, "process")(calculator)
 
-    Returns:
-        Dicionário com a expressão, resultado e formatação
-    """
-    MAX_EXPRESSION_LENGTH = 500
-    if len(expression) > MAX_EXPRESSION_LENGTH:
-        return {
-            "expression": expression,
-            "error": (
-                f"Expressão muito longa (máximo "
-                f"{MAX_EXPRESSION_LENGTH} caracteres)"
-            )
-        }
 
-    ALLOWED_CHARS = set("0123456789+-*/(). ^")
-    if not all(c in ALLOWED_CHARS for c in expression.replace(" ", "")):
-        return {
-            "expression": expression,
-            "error": "Expressão contém caracteres não permitidos"
-        }
+@mcp.custom_route("/executors", methods=["GET"])
+async def executor_metrics(request: Request) -> JSONResponse:
+    """Fila e latência dos pools de execução das tools."""
+    return JSONResponse(executors.snapshot())
 
-    try:
-        expression = expression.strip().replace("^", "**")
 
-        if not expression:
-            raise ValueError("Expressão vazia")
+_allocations = AllocationTracker()
 
-        tree = ast.parse(expression, mode='eval')
-        result = _eval_ast_node(tree.body)
 
-        if math.isinf(result) or math.isnan(result):
-            return {
-                "expression": expression,
-                "error": "Resultado inválido (infinito ou NaN)"
-            }
+def _debug_denied(request: Request):
+    status = debug_status(request.headers.get(DEBUG_TOKEN_HEADER))
+    if status is not None:
+        return JSONResponse({"error": "Acesso negado"}, status_code=status)
+    return None
 
-        if abs(result) > sys.maxsize:
-            return {
-                "expression": expression,
-                "error": "Resultado muito grande"
-            }
 
-        return {
-            "expression": expression,
-            "result": result,
-            "formatted": f"{expression} = {result}"
-        }
-    except ZeroDivisionError:
-        return {
-            "expression": expression,
-            "error": "Divisão por zero"
-        }
-    except Exception as e:
-        return {
-            "expression": expression,
-            "error": f"Erro ao calcular: {str(e)}"
-        }
-
-
-@mcp.tool()
+@mcp.custom_route("/debug/profile", methods=["GET"])
+async def debug_profile(request: Request):
+    """
+    Profile por amostragem (formato collapsed) deste processo. Tools do
+    pool de processos (calculator) rodam em outros processos e não
+    aparecem aqui; só a espera por elas.
+    """
+    denied = _debug_denied(request)
+    if denied:
+        return denied
+    params = request.query_params
+    try:
+        seconds = float(params.get("seconds", 10))
+        interval = float(params.get("interval_ms", 10)) / 1000
+    except ValueError:
+        return JSONResponse({"error": "Parâmetro inválido"}, status_code=422)
+    idle = params.get("idle", "false").lower() in ("true", "1", "yes")
+    try:
+        profiler = await profile(seconds, interval, idle)
+    except ProfilerBusy as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"X-Profile-Samples": str(profiler.samples)},
+    )
+
+
+@mcp.custom_route("/debug/allocations", methods=["GET", "DELETE"])
+async def debug_allocations(request: Request) -> JSONResponse:
+    """Snapshot/diff do tracemalloc (DELETE desliga o rastreio)."""
+    denied = _debug_denied(request)
+    if denied:
+        return denied
+    if request.method == "DELETE":
+        _allocations.stop()
+        return JSONResponse({"tracing": False})
+    params = request.query_params
+    key_type = params.get("key_type", "lineno")
+    if key_type not in ("lineno", "filename", "traceback"):
+        return JSONResponse({"error": "key_type inválido"}, status_code=422)
+    try:
+        limit = max(1, min(int(params.get("limit", 20)), 500))
+    except ValueError:
+        return JSONResponse({"error": "Parâmetro inválido"}, status_code=422)
+    snapshot = await asyncio.to_thread(
+        _allocations.snapshot, limit, key_type, params.get("include")
+    )
+    return JSONResponse(snapshot)
+
+
+@offloaded(mcp, "thread")
+@cache.cached(
+    "weather",
+    key=weather_cache_key,
+    ttl=WEATHER_CACHE_TTL,
+    error_ttl=WEATHER_NEGATIVE_TTL,
+    negative=is_not_found,
+)
 def get_weather(city: str, country_code: str = "BR") -> dict:
     """
     Consulta clima atual de uma cidade.
@@ -133,55 +127,112 @@ def get_weather(city: str, country_code: str = "BR") -> dict:
     if not city or len(city) > MAX_CITY_LENGTH:
         return {"error": "Cidade inválida"}
 
-    cache_key = cache._make_key("weather", f"{city},{country_code}")
-    cached_weather = cache.get(cache_key)
+    # Limitado pelo prazo da requisição (executors.offloaded)
+    return fetch_weather(city, country_code, timeout=timeout_for(5.0))
 
-    if cached_weather:
-        cache.increment_metric("cache_hit_weather")
-        return cached_weather
 
-    cache.increment_metric("cache_miss_weather")
+INDEX_NOT_FOUND = (
+    "Índice de documentos não encontrado. Rode: "
+    "python -m mcp_server.tools.ingest"
+)
+
+_document_index = None
+_document_index_lock = threading.Lock()
 
-    api_key = os.getenv("OPENWEATHER_API_KEY")
-    if not api_key:
-        return {"error": "API key não configurada"}
 
-    url = "https://api.openweathermap.org/data/2.5/weather"
-    params = {
-        "q": f"{city},{country_code}",
-        "appid": api_key,
-        "units": "metric",
-        "lang": "pt_br"
+def _get_document_index() -> DocumentIndex:
+    """
+    Abre o índice de documentos (mmap) na primeira busca e recarrega os
+    segmentos quando uma nova ingestão atualiza o manifest.
+    """
+    global _document_index
+    with _document_index_lock:
+        if _document_index is None:
+            _document_index = DocumentIndex(
+                os.getenv("INDEX_DIR", "data/index")
+            )
+        else:
+            _document_index.reload_if_changed()
+        return _document_index
+
+
+@offloaded(mcp, "thread")
+def search_documents(query: str, top_k: int = 5) -> dict:
+    """
+    Busca trechos relevantes nos documentos locais (base de conhecimento).
+
+    Args:
+        query: Termos ou pergunta a buscar
+        top_k: Número máximo de trechos retornados (1 a 20)
+
+    Returns:
+        Dict com os trechos encontrados (fonte, score e texto)
+    """
+    if not query or not query.strip():
+        return {"error": "Consulta vazia"}
+
+    top_k = max(1, min(int(top_k), 20))
+
+    try:
+        index = _get_document_index()
+    except FileNotFoundError:
+        return {"error": INDEX_NOT_FOUND}
+
+    results = index.search_bm25(query, top_k)
+    if not results:
+        return {
+            "query": query,
+            "results": [],
+            "formatted": "Nenhum documento relevante encontrado."
+        }
+
+    return {
+        "query": query,
+        "results": results,
+        "formatted": "\n\n".join(
+            f"[{r['source']}] {r['text']}" for r in results
+        )
     }
 
+
+@offloaded(mcp, "thread")
+def semantic_search_documents(query: str, top_k: int = 5) -> dict:
+    """
+    Busca semântica nos documentos locais: encontra trechos com sentido
+    parecido com a pergunta, mesmo sem as mesmas palavras.
+
+    Args:
+        query: Pergunta ou descrição do que procurar
+        top_k: Número máximo de trechos retornados (1 a 20)
+
+    Returns:
+        Dict com os trechos encontrados (fonte, similaridade e texto)
+    """
+    if not query or not query.strip():
+        return {"error": "Consulta vazia"}
+
+    top_k = max(1, min(int(top_k), 20))
+
     try:
-        response = httpx.get(url, params=params, timeout=5.0)
-        response.raise_for_status()
-        data = response.json()
-
-        result = {
-            "city": data["name"],
-            "temperature": data["main"]["temp"],
-            "description": data["weather"][0]["description"],
-            "humidity": data["main"]["humidity"],
-            "wind_speed": data["wind"]["speed"],
-            "formatted": (
-                f"{data['name']}: {data['main']['temp']}°C, "
-                f"{data['weather'][0]['description']}"
-            )
+        index = _get_document_index()
+    except FileNotFoundError:
+        return {"error": INDEX_NOT_FOUND}
+
+    results = index.search_vectors(query, top_k)
+    if not results:
+        return {
+            "query": query,
+            "results": [],
+            "formatted": "Nenhum documento relevante encontrado."
         }
 
-        cache.set(cache_key, result, ttl=1800)
-
-        return result
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code == 404:
-            return {"error": f"Cidade '{city}' não encontrada"}
-        return {"error": f"Erro HTTP {e.response.status_code}"}
-    except httpx.RequestError as e:
-        return {"error": f"Erro ao consultar API: {str(e)}"}
-    except (KeyError, IndexError) as e:
-        return {"error": f"Resposta da API inválida: {str(e)}"}
+    return {
+        "query": query,
+        "results": results,
+        "formatted": "\n\n".join(
+            f"[{r['source']}] {r['text']}" for r in results
+        )
+    }
 
 
 if __name__ == "__main__":
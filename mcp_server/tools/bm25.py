@@ -0,0 +1,240 @@
+"""
+Índice invertido com ranking BM25, gravado em disco e lido via mmap.
+
+Arquivos de um índice:
+- meta.json: número de chunks, soma dos tamanhos, k1 e b
+- lexicon.bin / lexicon_offsets.npy: termos ordenados (utf-8 concatenado)
+- postings_offsets.npy: início das postings de cada termo (df = diferença)
+- postings_docs.npy (uint32) / postings_tfs.npy (uint16): postings
+- doc_lens.npy (uint32): tamanho de cada chunk em tokens
+- chunks.jsonl / chunk_offsets.npy: texto dos chunks (ver store.py)
+
+Só os offsets e postings dos termos da query são tocados na busca; o
+sistema operacional pagina o resto sob demanda.
+"""
+import os
+import json
+import math
+import mmap
+from array import array
+from collections import Counter
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+import numpy as np
+
+from mcp_server.tools.store import ChunkStore, write_chunks
+from mcp_server.tools.text import tokenize
+
+K1 = 1.2
+B = 0.75
+
+
+class BM25Builder:
+    """Acumula postings em memória e grava o índice no formato em disco."""
+
+    def __init__(self):
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_lens = array("I")
+
+    def add(self, terms: Dict[str, int]) -> int:
+        """Adiciona um chunk (termo -> frequência) e retorna seu id."""
+        doc_id = len(self.doc_lens)
+        self.doc_lens.append(sum(terms.values()))
+        for term, tf in terms.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array("I"), array("H"))
+            entry[0].append(doc_id)
+            entry[1].append(min(tf, 0xFFFF))
+        return doc_id
+
+    def write(self, out_dir: str, k1: float = K1, b: float = B):
+        os.makedirs(out_dir, exist_ok=True)
+        terms = sorted(self.postings, key=lambda t: t.encode())
+
+        lexicon_offsets = [0]
+        postings_offsets = [0]
+        with open(os.path.join(out_dir, "lexicon.bin"), "wb") as f:
+            for term in terms:
+                encoded = term.encode()
+                f.write(encoded)
+                lexicon_offsets.append(lexicon_offsets[-1] + len(encoded))
+                postings_offsets.append(
+                    postings_offsets[-1] + len(self.postings[term][0])
+                )
+
+        docs = np.empty(postings_offsets[-1], dtype=np.uint32)
+        tfs = np.empty(postings_offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(terms):
+            term_docs, term_tfs = self.postings[term]
+            start, end = postings_offsets[i], postings_offsets[i + 1]
+            docs[start:end] = np.frombuffer(term_docs, dtype=np.uint32)
+            tfs[start:end] = np.frombuffer(term_tfs, dtype=np.uint16)
+
+        np.save(
+            os.path.join(out_dir, "lexicon_offsets.npy"),
+            np.asarray(lexicon_offsets, dtype=np.uint64)
+        )
+        np.save(
+            os.path.join(out_dir, "postings_offsets.npy"),
+            np.asarray(postings_offsets, dtype=np.uint64)
+        )
+        np.save(os.path.join(out_dir, "postings_docs.npy"), docs)
+        np.save(os.path.join(out_dir, "postings_tfs.npy"), tfs)
+        np.save(
+            os.path.join(out_dir, "doc_lens.npy"),
+            np.frombuffer(self.doc_lens, dtype=np.uint32)
+        )
+
+        with open(os.path.join(out_dir, "meta.json"), "w") as f:
+            json.dump({
+                "num_docs": len(self.doc_lens),
+                "total_len": int(sum(self.doc_lens)),
+                "num_terms": len(terms),
+                "k1": k1,
+                "b": b,
+            }, f)
+
+
+def build_bm25_index(chunks: Iterable[Dict[str, Any]], out_dir: str) -> int:
+    """
+    Constrói o índice a partir de chunks ({"source", "chunk", "text"}).
+    Retorna o número de chunks indexados.
+    """
+    builder = BM25Builder()
+
+    def indexed(chunks):
+        for chunk in chunks:
+            builder.add(Counter(tokenize(chunk["text"])))
+            yield chunk
+
+    count = write_chunks(indexed(chunks), out_dir)
+    builder.write(out_dir)
+    return count
+
+
+class BM25Index:
+    """Busca BM25 sobre um índice em disco."""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode="r")
+
+        self.lexicon_offsets = load("lexicon_offsets.npy")
+        self.postings_offsets = load("postings_offsets.npy")
+        self.postings_docs = load("postings_docs.npy")
+        self.postings_tfs = load("postings_tfs.npy")
+        self.doc_lens = load("doc_lens.npy")
+        self.store = ChunkStore(index_dir)
+
+        lexicon_path = os.path.join(index_dir, "lexicon.bin")
+        self._lexicon_file = open(lexicon_path, "rb")
+        size = os.fstat(self._lexicon_file.fileno()).st_size
+        self._lexicon = (
+            mmap.mmap(
+                self._lexicon_file.fileno(), 0, access=mmap.ACCESS_READ
+            ) if size else b""
+        )
+
+        self.num_docs = self.meta["num_docs"]
+        self.avgdl = self.meta["total_len"] / max(1, self.num_docs)
+        self.k1 = self.meta["k1"]
+        self.b = self.meta["b"]
+
+    def _term_id(self, term: str) -> Optional[int]:
+        """Busca binária no léxico ordenado."""
+        target = term.encode()
+        lo, hi = 0, len(self.lexicon_offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = int(self.lexicon_offsets[mid])
+            current = self._lexicon[
+                start:int(self.lexicon_offsets[mid + 1])
+            ]
+            if current < target:
+                lo = mid + 1
+            elif current > target:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Postings (docs, tfs) de um termo; arrays vazios se não existir."""
+        term_id = self._term_id(term)
+        if term_id is None:
+            return (
+                np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint16)
+            )
+        start = int(self.postings_offsets[term_id])
+        end = int(self.postings_offsets[term_id + 1])
+        return self.postings_docs[start:end], self.postings_tfs[start:end]
+
+    def score(
+        self,
+        query: str,
+        num_docs: Optional[int] = None,
+        avgdl: Optional[float] = None,
+        df: Optional[Dict[str, int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcula os scores BM25 dos chunks que contêm algum termo da query.
+
+        Args:
+            num_docs, avgdl, df: Estatísticas globais, quando o índice é
+                um segmento de uma coleção maior (padrão: do próprio índice)
+
+        Returns:
+            Tupla (ids dos chunks candidatos, scores)
+        """
+        num_docs = num_docs or self.num_docs
+        avgdl = avgdl or self.avgdl
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        touched = []
+
+        for term, query_tf in Counter(tokenize(query)).items():
+            docs, tfs = self.postings(term)
+            if not len(docs):
+                continue
+
+            term_df = df[term] if df else len(docs)
+            idf = math.log(1 + (num_docs - term_df + 0.5) / (term_df + 0.5))
+            tf = tfs.astype(np.float32)
+            norm = self.k1 * (
+                1 - self.b + self.b * self.doc_lens[docs] / avgdl
+            )
+            scores[docs] += query_tf * idf * tf * (self.k1 + 1) / (tf + norm)
+            touched.append(docs)
+
+        if not touched:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        candidates = np.unique(np.concatenate(touched)).astype(np.int64)
+        return candidates, scores[candidates]
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Retorna os `top_k` chunks mais relevantes com score e texto."""
+        candidates, scores = self.score(query)
+        if not len(candidates):
+            return []
+
+        top_k = min(top_k, len(candidates))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+
+        results = []
+        for i in best:
+            chunk = self.store.get(int(candidates[i]))
+            chunk["score"] = round(float(scores[i]), 4)
+            results.append(chunk)
+        return results
+
+    def close(self):
+        if isinstance(self._lexicon, mmap.mmap):
+            self._lexicon.close()
+        self._lexicon_file.close()
+        self.store.close()
@@ -0,0 +1,106 @@
+"""
+Calculadora segura (avaliação de AST, sem eval).
+
+Fica fora de server.py para poder rodar no pool de processos do MCP
+Server: os workers importam só este módulo.
+"""
+import ast
+import math
+import operator
+import sys
+
+MAX_EXPRESSION_LENGTH = 500
+ALLOWED_CHARS = set("0123456789+-*/(). ^")
+
+OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.USub: operator.neg,
+}
+
+
+def _eval_ast_node(node):
+    """Avalia um nó AST de forma segura (sem eval)."""
+    if isinstance(node, ast.Constant):
+        return node.value
+    elif isinstance(node, ast.BinOp):
+        op = OPERATORS.get(type(node.op))
+        if not op:
+            raise ValueError(
+                f"Operador não suportado: {type(node.op).__name__}")
+        return op(_eval_ast_node(node.left), _eval_ast_node(node.right))
+    elif isinstance(node, ast.UnaryOp):
+        op = OPERATORS.get(type(node.op))
+        if not op:
+            raise ValueError(
+                f"Operador unário não suportado: {type(node.op).__name__}")
+        return op(_eval_ast_node(node.operand))
+    else:
+        raise ValueError(
+            f"Tipo de expressão não suportado: {type(node).__name__}")
+
+
+def calculator(expression: str) -> dict:
+    """
+    Executa cálculos matemáticos de forma segura.
+
+    Args:
+        expression: Expressão matemática a ser calculada
+
+    Returns:
+        Dicionário com a expressão, resultado e formatação
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        return {
+            "expression": expression,
+            "error": (
+                f"Expressão muito longa (máximo "
+                f"{MAX_EXPRESSION_LENGTH} caracteres)"
+            )
+        }
+
+    if not all(c in ALLOWED_CHARS for c in expression.replace(" ", "")):
+        return {
+            "expression": expression,
+            "error": "Expressão contém caracteres não permitidos"
+        }
+
+    try:
+        expression = expression.strip().replace("^", "**")
+
+        if not expression:
+            raise ValueError("Expressão vazia")
+
+        tree = ast.parse(expression, mode='eval')
+        result = _eval_ast_node(tree.body)
+
+        if math.isinf(result) or math.isnan(result):
+            return {
+                "expression": expression,
+                "error": "Resultado inválido (infinito ou NaN)"
+            }
+
+        if abs(result) > sys.maxsize:
+            return {
+                "expression": expression,
+                "error": "Resultado muito grande"
+            }
+
+        return {
+            "expression": expression,
+            "result": result,
+            "formatted": f"{expression} = {result}"
+        }
+    except ZeroDivisionError:
+        return {
+            "expression": expression,
+            "error": "Divisão por zero"
+        }
+    except Exception as e:
+        return {
+            "expression": expression,
+            "error": f"Erro ao calcular: {str(e)}"
+        }
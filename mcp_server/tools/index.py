@@ -0,0 +1,296 @@
+"""
+Coleção de documentos indexada em segmentos (ver ingest.py).
+
+Layout de INDEX_DIR:
+- manifest.json: segmentos ativos, chunks removidos de cada segmento e,
+  para cada arquivo, hash/mtime/tamanho e o intervalo de chunks que ocupa
+- segments/<nome>/: índice BM25 + vetorial + chunks de um lote de arquivos
+
+Arquivos alterados ou removidos não reescrevem segmentos: seus chunks
+antigos são marcados como removidos no manifest e filtrados na busca.
+"""
+import os
+import copy
+import json
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from mcp_server.tools.bm25 import BM25Index
+from mcp_server.tools.text import tokenize
+from mcp_server.tools.vectors import VectorIndex
+
+MANIFEST_FILE = "manifest.json"
+SEGMENTS_DIR = "segments"
+
+
+def empty_manifest() -> Dict[str, Any]:
+    return {"version": 1, "next_segment": 1, "segments": {}, "files": {}}
+
+
+def load_manifest(index_dir: str) -> Dict[str, Any]:
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return empty_manifest()
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(index_dir: str, manifest: Dict[str, Any]) -> None:
+    """Grava o manifest de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def segment_path(index_dir: str, name: str) -> str:
+    return os.path.join(index_dir, SEGMENTS_DIR, name)
+
+
+class Segment:
+    """
+    Índices BM25 e vetorial de um segmento, com máscara de removidos.
+
+    A máscara não muda depois de criada: uma nova lista de removidos gera
+    outro Segment (with_deleted) sobre os mesmos arquivos abertos, para
+    que buscas em andamento não vejam a troca pela metade.
+    """
+
+    def __init__(self, path: str, deleted: Optional[List[List[int]]] = None):
+        self.bm25 = BM25Index(path)
+        self.vectors = VectorIndex(path, with_store=False)
+        self.store = self.bm25.store
+        self.live = self._live_mask(deleted or [])
+
+    def _live_mask(self, ranges: List[List[int]]) -> np.ndarray:
+        live = np.ones(self.bm25.num_docs, dtype=bool)
+        for start, end in ranges:
+            live[start:end] = False
+        return live
+
+    def with_deleted(self, ranges: List[List[int]]) -> "Segment":
+        """Cópia com outra máscara, compartilhando os arquivos abertos."""
+        segment = copy.copy(self)
+        segment.live = self._live_mask(ranges)
+        return segment
+
+    @property
+    def deleted_count(self) -> int:
+        return int((~self.live).sum())
+
+    def close(self):
+        self.bm25.close()
+        self.vectors.close()
+
+
+class _Generation:
+    """Conjunto de segmentos de uma versão do manifest e suas buscas."""
+
+    def __init__(self, segments: Dict[str, Segment]):
+        self.segments = segments
+        self.readers = 0
+
+
+class DocumentIndex:
+    """
+    Busca BM25 e vetorial sobre todos os segmentos ativos.
+
+    Cada recarga publica uma nova geração de segmentos; buscas usam a
+    geração vigente no início e os arquivos de segmentos que saíram só
+    são fechados quando nenhuma busca em andamento os usa mais.
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self._current = _Generation({})
+        # Gerações com buscas em andamento (além da vigente)
+        self._retired: List[_Generation] = []
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._manifest_mtime: Optional[int] = None
+        if not os.path.exists(os.path.join(index_dir, MANIFEST_FILE)):
+            raise FileNotFoundError(f"Manifest não encontrado em {index_dir}")
+        self.reload_if_changed()
+
+    @property
+    def segments(self) -> Dict[str, Segment]:
+        return self._current.segments
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reabre os segmentos se o manifest mudou (nova ingestão).
+        Segmentos que continuam ativos reaproveitam os arquivos abertos.
+        """
+        with self._reload_lock:
+            path = os.path.join(self.index_dir, MANIFEST_FILE)
+            mtime = os.stat(path).st_mtime_ns
+            if mtime == self._manifest_mtime:
+                return False
+
+            manifest = load_manifest(self.index_dir)
+            current = self._current.segments
+            segments = {}
+            for name, info in manifest["segments"].items():
+                deleted = info.get("deleted", [])
+                if name in current:
+                    segments[name] = current[name].with_deleted(deleted)
+                else:
+                    segments[name] = Segment(
+                        segment_path(self.index_dir, name), deleted
+                    )
+
+            with self._lock:
+                old, self._current = self._current, _Generation(segments)
+                if old.readers:
+                    self._retired.append(old)
+                else:
+                    self._close_unused(old)
+            self._manifest_mtime = mtime
+            return True
+
+    def _close_unused(self, generation: _Generation) -> None:
+        """Fecha os arquivos da geração que nenhuma outra usa (com lock)."""
+        in_use = {
+            id(segment.bm25)
+            for other in [self._current, *self._retired]
+            for segment in other.segments.values()
+        }
+        for segment in generation.segments.values():
+            if id(segment.bm25) not in in_use:
+                segment.close()
+
+    @contextmanager
+    def _reading(self) -> Iterator[Dict[str, Segment]]:
+        """Segmentos da geração vigente, protegidos durante a busca."""
+        with self._lock:
+            generation = self._current
+            generation.readers += 1
+        try:
+            yield generation.segments
+        finally:
+            with self._lock:
+                generation.readers -= 1
+                if (
+                    not generation.readers
+                    and generation in self._retired
+                ):
+                    self._retired.remove(generation)
+                    self._close_unused(generation)
+
+    def __len__(self) -> int:
+        return sum(int(s.live.sum()) for s in self.segments.values())
+
+    def _collect(
+        self,
+        segments: Dict[str, Segment],
+        hits: List[Tuple[float, str, int]],
+        top_k: int,
+    ) -> List[Dict[str, Any]]:
+        hits.sort(key=lambda hit: -hit[0])
+        results = []
+        for score, name, chunk_id in hits[:top_k]:
+            chunk = segments[name].store.get(chunk_id)
+            chunk["score"] = round(score, 4)
+            results.append(chunk)
+        return results
+
+    def search_bm25(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        BM25 com estatísticas globais (número de chunks, tamanho médio e
+        df somados entre segmentos), para que os scores sejam comparáveis.
+        """
+        with self._reading() as segments:
+            return self._search_bm25(segments, query, top_k)
+
+    def _search_bm25(
+        self, segments: Dict[str, Segment], query: str, top_k: int
+    ) -> List[Dict[str, Any]]:
+        items = list(segments.items())
+        num_docs = sum(s.bm25.num_docs for _, s in items)
+        if not num_docs:
+            return []
+
+        total_len = sum(s.bm25.meta["total_len"] for _, s in items)
+        df = {
+            term: sum(len(s.bm25.postings(term)[0]) for _, s in items)
+            for term in set(tokenize(query))
+        }
+
+        hits = []
+        for name, segment in items:
+            candidates, scores = segment.bm25.score(
+                query, num_docs=num_docs, avgdl=total_len / num_docs, df=df
+            )
+            live = segment.live[candidates]
+            candidates, scores = candidates[live], scores[live]
+            if not len(candidates):
+                continue
+
+            k = min(top_k, len(candidates))
+            best = np.argpartition(-scores, k - 1)[:k]
+            hits.extend(
+                (float(scores[i]), name, int(candidates[i])) for i in best
+            )
+
+        return self._collect(segments, hits, top_k)
+
+    def search_vectors(
+        self,
+        query: str,
+        top_k: int = 5,
+        mode: Optional[str] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top-k por similaridade de cosseno em todos os segmentos."""
+        with self._reading() as segments:
+            return self._search_vectors(segments, query, top_k, mode, nprobe)
+
+    def _search_vectors(
+        self,
+        segments: Dict[str, Segment],
+        query: str,
+        top_k: int,
+        mode: Optional[str],
+        nprobe: Optional[int],
+    ) -> List[Dict[str, Any]]:
+        hits = []
+        for name, segment in segments.items():
+            index = segment.vectors
+            if not len(index):
+                continue
+
+            segment_mode = mode or os.getenv("VECTOR_SEARCH_MODE") or (
+                "ivf" if index.centroids is not None else "exact"
+            )
+            vector = index.embedder.embed(query)
+            # Pede mais resultados para compensar chunks removidos
+            k = top_k + segment.deleted_count
+            if segment_mode == "ivf":
+                ids, scores = index.ivf_search(
+                    vector, k,
+                    nprobe or int(os.getenv("VECTOR_IVF_NPROBE") or 8)
+                )
+            else:
+                ids, scores = index.exact_search(vector, k)
+
+            for chunk_id, score in zip(ids[0], scores[0]):
+                if chunk_id >= 0 and score > 0 and segment.live[chunk_id]:
+                    hits.append((float(score), name, int(chunk_id)))
+
+        return self._collect(segments, hits, top_k)
+
+    def close(self):
+        with self._lock:
+            closed = set()
+            for generation in [self._current, *self._retired]:
+                for segment in generation.segments.values():
+                    if id(segment.bm25) not in closed:
+                        closed.add(id(segment.bm25))
+                        segment.close()
+            self._current = _Generation({})
+            self._retired = []
@@ -0,0 +1,420 @@
+"""
+Ingestão incremental e paralela de data/documents nos índices de busca.
+
+Só arquivos novos, alterados (mtime/tamanho e hash do conteúdo) ou
+removidos são processados. Leitura, chunking, tokenização e embeddings
+rodam em um pool de processos; o processo principal consome os
+resultados em streaming e grava um novo segmento. Chunks de versões
+antigas são marcados como removidos no manifest, e segmentos pequenos ou
+com muitos removidos são mesclados (ver index.py).
+
+Uso:
+    python -m mcp_server.tools.ingest [--workers 4] [--watch]
+    python -m mcp_server.tools.ingest search "pergunta" [--semantic]
+"""
+import os
+import sys
+import time
+import shutil
+import hashlib
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Iterator, Optional, Tuple
+
+import numpy as np
+
+from mcp_server.tools.bm25 import BM25Builder
+from mcp_server.tools.index import (
+    DocumentIndex, Segment, load_manifest, save_manifest, segment_path
+)
+from mcp_server.tools.store import write_chunks
+from mcp_server.tools.text import chunk_text, iter_document_paths, tokenize
+from mcp_server.tools.vectors import HashingEmbedder, VectorBuilder
+
+DEFAULT_INDEX_DIR = "data/index"
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def iter_changed_paths(
+    root: str, manifest: Dict[str, Any]
+) -> Iterator[Tuple[str, str]]:
+    """
+    Gera (caminho, caminho relativo) dos arquivos novos ou com mtime ou
+    tamanho diferentes do manifest. Só faz stat, sem ler o conteúdo.
+    """
+    files = manifest["files"]
+    for path in iter_document_paths(root):
+        source = os.path.relpath(path, root)
+        stat = os.stat(path)
+        entry = files.get(source)
+        if (
+            entry is None
+            or entry["mtime"] != stat.st_mtime_ns
+            or entry["size"] != stat.st_size
+        ):
+            yield path, source
+
+
+def process_file(args: Tuple[str, str]) -> Dict[str, Any]:
+    """
+    Lê, normaliza, divide em chunks, tokeniza e gera embeddings de um
+    arquivo. Roda nos processos do pool.
+    """
+    path, source = args
+    with open(path, "rb") as f:
+        raw = f.read()
+    stat = os.stat(path)
+    text = raw.decode("utf-8", errors="replace")
+
+    embedder = HashingEmbedder()
+    chunks, terms, vectors = [], [], []
+    for index, chunk in enumerate(chunk_text(text)):
+        chunks.append({"source": source, "chunk": index, "text": chunk})
+        terms.append(dict(Counter(tokenize(chunk))))
+        vectors.append(embedder.embed(chunk))
+
+    return {
+        "source": source,
+        "sha256": hashlib.sha256(raw).hexdigest(),
+        "mtime": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "chunks": chunks,
+        "terms": terms,
+        "vectors": (
+            np.vstack(vectors) if vectors
+            else np.empty((0, embedder.dim), dtype=np.float32)
+        ),
+    }
+
+
+def _ivf_lists(num_chunks: int) -> int:
+    """Listas IVF para segmentos grandes; segmentos pequenos: só exata."""
+    if num_chunks < _env_int("INGEST_IVF_MIN_CHUNKS", 50000):
+        return 0
+    return int(4 * np.sqrt(num_chunks))
+
+
+def write_segment(
+    out_dir: str,
+    records: Iterator[Tuple[Dict[str, Any], Dict[str, int], np.ndarray]],
+    dtype: str = "float32",
+) -> int:
+    """
+    Grava um segmento a partir de (chunk, termos, embedding) em streaming.
+    Retorna o número de chunks.
+    """
+    bm25 = BM25Builder()
+    vectors = VectorBuilder()
+
+    def chunks():
+        for chunk, terms, vector in records:
+            bm25.add(terms)
+            vectors.add_vectors(vector[None, :])
+            yield chunk
+
+    count = write_chunks(chunks(), out_dir)
+    bm25.write(out_dir)
+    vectors.write(out_dir, dtype=dtype, ivf_lists=_ivf_lists(count))
+    return count
+
+
+def _mark_deleted(manifest: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    """Marca os chunks de uma versão antiga de arquivo como removidos."""
+    if entry["end"] > entry["start"]:
+        manifest["segments"][entry["segment"]]["deleted"].append(
+            [entry["start"], entry["end"]]
+        )
+
+
+class Progress:
+    """Reporta arquivos/s e MB/s durante a ingestão."""
+
+    def __init__(self, every: float = 2.0, stream=sys.stderr):
+        self.every = every
+        self.stream = stream
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.files = 0
+        self.bytes = 0
+        self.chunks = 0
+
+    def update(self, size: int, chunks: int) -> None:
+        self.files += 1
+        self.bytes += size
+        self.chunks += chunks
+        now = time.perf_counter()
+        if self.every and now - self.last >= self.every:
+            self.last = now
+            self.report()
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {
+            "files": self.files,
+            "chunks": self.chunks,
+            "megabytes": round(self.bytes / 1e6, 3),
+            "seconds": round(elapsed, 3),
+            "files_per_second": round(self.files / elapsed, 1),
+            "mb_per_second": round(self.bytes / 1e6 / elapsed, 2),
+        }
+
+    def report(self) -> None:
+        s = self.summary()
+        print(
+            f"{s['files']} arquivos, {s['chunks']} chunks, "
+            f"{s['megabytes']} MB em {s['seconds']}s "
+            f"({s['files_per_second']} arquivos/s, "
+            f"{s['mb_per_second']} MB/s)",
+            file=self.stream
+        )
+
+
+def ingest(
+    docs_dir: str,
+    index_dir: str,
+    workers: Optional[int] = None,
+    progress: Optional[Progress] = None,
+) -> Dict[str, Any]:
+    """
+    Atualiza o índice com as mudanças em `docs_dir`.
+
+    Returns:
+        Resumo: arquivos indexados, inalterados e removidos, throughput
+    """
+    manifest = load_manifest(index_dir)
+    progress = progress or Progress(every=0)
+    seen = {
+        os.path.relpath(path, docs_dir)
+        for path in iter_document_paths(docs_dir)
+    }
+    changed = list(iter_changed_paths(docs_dir, manifest))
+
+    stats = {"indexed": 0, "unchanged": 0, "deleted": 0, "segment": None}
+
+    for source in [s for s in manifest["files"] if s not in seen]:
+        _mark_deleted(manifest, manifest["files"].pop(source))
+        stats["deleted"] += 1
+
+    if changed:
+        name = f"seg_{manifest['next_segment']:06d}"
+        new_files: Dict[str, Dict[str, Any]] = {}
+
+        def records():
+            position = 0
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(process_file, changed, chunksize=4)
+                for result in results:
+                    source = result["source"]
+                    entry = manifest["files"].get(source)
+                    progress.update(result["size"], len(result["chunks"]))
+
+                    if entry and entry["sha256"] == result["sha256"]:
+                        entry["mtime"] = result["mtime"]
+                        entry["size"] = result["size"]
+                        stats["unchanged"] += 1
+                        continue
+
+                    count = len(result["chunks"])
+                    new_files[source] = {
+                        "sha256": result["sha256"],
+                        "mtime": result["mtime"],
+                        "size": result["size"],
+                        "segment": name,
+                        "start": position,
+                        "end": position + count,
+                    }
+                    position += count
+                    yield from zip(
+                        result["chunks"], result["terms"], result["vectors"]
+                    )
+
+        out_dir = segment_path(index_dir, name)
+        count = write_segment(out_dir, records())
+
+        if new_files:
+            for source, entry in new_files.items():
+                if source in manifest["files"]:
+                    _mark_deleted(manifest, manifest["files"][source])
+                manifest["files"][source] = entry
+            manifest["segments"][name] = {"chunks": count, "deleted": []}
+            manifest["next_segment"] += 1
+            stats["indexed"] = len(new_files)
+            stats["segment"] = name
+        else:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    removed = _drop_empty_segments(manifest)
+    merged = compact(index_dir, manifest)
+    save_manifest(index_dir, manifest)
+    _remove_segment_dirs(index_dir, removed + merged)
+
+    stats.update(progress.summary())
+    return stats
+
+
+def _live_chunks(info: Dict[str, Any]) -> int:
+    return info["chunks"] - sum(end - start for start, end in info["deleted"])
+
+
+def _drop_empty_segments(manifest: Dict[str, Any]) -> List[str]:
+    empty = [
+        name for name, info in manifest["segments"].items()
+        if _live_chunks(info) <= 0
+    ]
+    for name in empty:
+        del manifest["segments"][name]
+    return empty
+
+
+def _remove_segment_dirs(index_dir: str, names: List[str]) -> None:
+    for name in names:
+        shutil.rmtree(segment_path(index_dir, name), ignore_errors=True)
+
+
+def compact(index_dir: str, manifest: Dict[str, Any]) -> List[str]:
+    """
+    Mescla segmentos quando há mais que INGEST_MAX_SEGMENTS ou quando
+    algum tem mais da metade dos chunks removidos. Os chunks vivos são
+    copiados (texto relido do segmento, embeddings copiados) para um novo
+    segmento; o manifest é atualizado em memória.
+
+    Returns:
+        Nomes dos segmentos substituídos (a remover após salvar o manifest)
+    """
+    segments = manifest["segments"]
+    max_segments = _env_int("INGEST_MAX_SEGMENTS", 8)
+
+    sparse = {
+        name for name, info in segments.items()
+        if _live_chunks(info) < info["chunks"] / 2
+    }
+    by_size = sorted(segments, key=lambda name: _live_chunks(segments[name]))
+    excess = len(segments) - max_segments
+    selected = sparse | set(by_size[:excess + 1] if excess > 0 else [])
+    if len(selected) < 2 and not sparse:
+        return []
+
+    name = f"seg_{manifest['next_segment']:06d}"
+    opened = {
+        old: Segment(segment_path(index_dir, old)) for old in selected
+    }
+    moved = sorted(
+        (
+            (entry["segment"], entry["start"], source)
+            for source, entry in manifest["files"].items()
+            if entry["segment"] in selected
+        )
+    )
+    new_ranges = {}
+
+    def records():
+        position = 0
+        for old, _, source in moved:
+            entry = manifest["files"][source]
+            segment = opened[old]
+            for chunk_id in range(entry["start"], entry["end"]):
+                chunk = segment.store.get(chunk_id)
+                vector = np.asarray(
+                    segment.vectors.embeddings[chunk_id], np.float32
+                )
+                yield chunk, dict(Counter(tokenize(chunk["text"]))), vector
+            count = entry["end"] - entry["start"]
+            new_ranges[source] = (position, position + count)
+            position += count
+
+    try:
+        count = write_segment(segment_path(index_dir, name), records())
+    finally:
+        for segment in opened.values():
+            segment.close()
+
+    for source, (start, end) in new_ranges.items():
+        manifest["files"][source].update(
+            {"segment": name, "start": start, "end": end}
+        )
+    for old in selected:
+        del segments[old]
+    segments[name] = {"chunks": count, "deleted": []}
+    manifest["next_segment"] += 1
+    return sorted(selected)
+
+
+def _add_run_arguments(parser: argparse.ArgumentParser, defaults: bool):
+    def default(value):
+        return value if defaults else argparse.SUPPRESS
+
+    parser.add_argument("--workers", type=int, default=default(None))
+    parser.add_argument(
+        "--watch", action="store_true", default=default(False),
+        help="Continua observando a pasta e reindexando mudanças"
+    )
+    parser.add_argument("--interval", type=float, default=default(5.0))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Ingestão incremental de documentos"
+    )
+    parser.add_argument(
+        "--docs", default=os.getenv("DOCUMENTS_DIR", "data/documents")
+    )
+    parser.add_argument(
+        "--index", default=os.getenv("INDEX_DIR", DEFAULT_INDEX_DIR)
+    )
+    _add_run_arguments(parser, defaults=True)
+    sub = parser.add_subparsers(dest="command")
+
+    # Aceitas antes ou depois de "run"; sem padrões no subcomando para
+    # não sobrescrever valores dados antes dele
+    run = sub.add_parser("run", help="Indexa as mudanças (padrão)")
+    _add_run_arguments(run, defaults=False)
+
+    search = sub.add_parser("search", help="Busca no índice")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=5)
+    search.add_argument("--semantic", action="store_true")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "search":
+        index = DocumentIndex(args.index)
+        start = time.perf_counter()
+        if args.semantic:
+            results = index.search_vectors(args.query, args.k)
+        else:
+            results = index.search_bm25(args.query, args.k)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for result in results:
+            print(
+                f"[{result['score']:.3f}] "
+                f"{result['source']}#{result['chunk']}"
+            )
+            print(f"    {result['text'][:200]}")
+        print(
+            f"{len(results)} resultados em {elapsed_ms:.1f}ms",
+            file=sys.stderr
+        )
+        return
+
+    while True:
+        progress = Progress()
+        stats = ingest(args.docs, args.index, args.workers, progress)
+        if stats["indexed"] or stats["deleted"] or not args.watch:
+            progress.report()
+            print(
+                f"indexados={stats['indexed']} "
+                f"inalterados={stats['unchanged']} "
+                f"removidos={stats['deleted']}",
+                file=sys.stderr
+            )
+        if not args.watch:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Armazenamento dos chunks em disco (JSON lines + offsets), lido via mmap.
+"""
+import os
+import json
+import mmap
+from typing import Dict, Any, Iterable
+
+import numpy as np
+
+CHUNKS_FILE = "chunks.jsonl"
+OFFSETS_FILE = "chunk_offsets.npy"
+
+
+def write_chunks(chunks: Iterable[Dict[str, Any]], out_dir: str) -> int:
+    """
+    Grava os chunks em `out_dir` e retorna quantos foram gravados.
+    O id de cada chunk é sua posição no arquivo.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    offsets = [0]
+
+    with open(os.path.join(out_dir, CHUNKS_FILE), "wb") as f:
+        for chunk in chunks:
+            line = json.dumps(chunk, ensure_ascii=False).encode() + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+
+    np.save(
+        os.path.join(out_dir, OFFSETS_FILE),
+        np.asarray(offsets, dtype=np.uint64)
+    )
+    return len(offsets) - 1
+
+
+class ChunkStore:
+    """Leitura de chunks por id sem carregar o arquivo na memória."""
+
+    def __init__(self, index_dir: str):
+        self.offsets = np.load(
+            os.path.join(index_dir, OFFSETS_FILE), mmap_mode="r"
+        )
+        self._file = open(os.path.join(index_dir, CHUNKS_FILE), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if size else b""
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get(self, chunk_id: int) -> Dict[str, Any]:
+        start = int(self.offsets[chunk_id])
+        end = int(self.offsets[chunk_id + 1])
+        return json.loads(self._data[start:end])
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
@@ -0,0 +1,82 @@
+"""
+Normalização, tokenização e chunking de documentos para os índices de busca.
+"""
+import os
+import re
+import unicodedata
+from typing import Iterator, List, Dict, Any
+
+DOCUMENT_EXTENSIONS = (".txt", ".md", ".rst", ".csv", ".json", ".html")
+
+CHUNK_WORDS = int(os.getenv("CHUNK_WORDS", 200))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 40))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a ao aos as com como da das de do dos e em entre era essa esse esta este
+eu foi ha isso isto ja la lhe mais mas me mesmo meu minha muito na nas
+nao nem no nos num numa o os ou para pela pelas pelo pelos por qual quando
+que quem se sem ser seu sua suas seus so tambem te tem ter um uma umas
+uns voce
+an and are as at be by for from in is it of on or that the this to was
+with
+""".split())
+
+
+def normalize(text: str) -> str:
+    """Minúsculas e sem acentos ("São Paulo" -> "sao paulo")."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens normalizados, sem stopwords."""
+    return [
+        token for token in _TOKEN_RE.findall(normalize(text))
+        if token not in STOPWORDS
+    ]
+
+
+def chunk_text(
+    text: str,
+    size: int = CHUNK_WORDS,
+    overlap: int = CHUNK_OVERLAP
+) -> Iterator[str]:
+    """
+    Divide o texto em janelas de `size` palavras com `overlap` palavras
+    em comum entre janelas consecutivas.
+    """
+    words = text.split()
+    if not words:
+        return
+
+    step = max(1, size - overlap)
+    for start in range(0, len(words), step):
+        yield " ".join(words[start:start + size])
+        if start + size >= len(words):
+            break
+
+
+def iter_document_paths(root: str) -> Iterator[str]:
+    """Percorre `root` recursivamente retornando os documentos suportados."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for filename in sorted(filenames):
+            if filename.lower().endswith(DOCUMENT_EXTENSIONS):
+                yield os.path.join(dirpath, filename)
+
+
+def read_document(path: str) -> str:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def iter_chunks(root: str) -> Iterator[Dict[str, Any]]:
+    """Gera os chunks de todos os documentos de `root`, um por vez."""
+    for path in iter_document_paths(root):
+        source = os.path.relpath(path, root)
+        for index, text in enumerate(chunk_text(read_document(path))):
+            yield {"source": source, "chunk": index, "text": text}
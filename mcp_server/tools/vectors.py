@@ -0,0 +1,348 @@
+"""
+Busca semântica por vetores densos, gravados em .npy e lidos via mmap.
+
+Os embeddings vêm de um vetorizador por hashing (palavras + n-gramas de
+caracteres), local e offline: n-gramas aproximam variações morfológicas
+do português ("chuva", "chuvoso", "chuvas").
+
+Arquivos de um índice:
+- vector_meta.json: dimensão, dtype e parâmetros do embedder
+- embeddings.npy: matriz (chunks x dim) float32 ou float16, normalizada.
+  float16 ocupa metade do disco/page cache, mas cada bloco é convertido
+  para float32 na busca exata; para corpora grandes prefira float16 + IVF
+- ivf_centroids.npy / ivf_order.npy / ivf_offsets.npy: índice IVF
+  opcional (centróides, ids agrupados por lista e início de cada lista)
+- chunks.jsonl / chunk_offsets.npy: texto dos chunks (ver store.py)
+"""
+import os
+import json
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+import numpy as np
+
+from mcp_server.tools.store import ChunkStore, write_chunks
+from mcp_server.tools.text import tokenize
+
+DEFAULT_DIM = 512
+BLOCK_ROWS = 32768
+
+
+@lru_cache(maxsize=200_000)
+def _token_hashes(token: str, ngrams: Tuple[int, ...]) -> np.ndarray:
+    """Hashes da palavra e de seus n-gramas de caracteres (com cache)."""
+    padded = f"<{token}>"
+    features = ["w:" + token] + [
+        padded[i:i + n]
+        for n in ngrams
+        for i in range(len(padded) - n + 1)
+    ]
+    return np.fromiter(
+        (zlib.crc32(feature.encode()) for feature in features),
+        dtype=np.uint32, count=len(features)
+    )
+
+
+class HashingEmbedder:
+    """Vetorizador por hashing de palavras e n-gramas de caracteres."""
+
+    def __init__(
+        self, dim: int = DEFAULT_DIM, ngrams: Tuple[int, ...] = (3, 4)
+    ):
+        self.dim = dim
+        self.ngrams = tuple(ngrams)
+
+    def params(self) -> Dict[str, Any]:
+        return {"dim": self.dim, "ngrams": list(self.ngrams)}
+
+    def embed(self, text: str) -> np.ndarray:
+        tokens = Counter(tokenize(text))
+        if not tokens:
+            return np.zeros(self.dim, dtype=np.float32)
+
+        hashes = [_token_hashes(token, self.ngrams) for token in tokens]
+        counts = np.fromiter(
+            tokens.values(), dtype=np.float32, count=len(tokens)
+        )
+        weights = np.repeat(
+            1.0 + np.log(counts), [len(h) for h in hashes]
+        )
+        hashes = np.concatenate(hashes)
+        weights = np.where(hashes & 0x80000000, weights, -weights)
+        vector = np.bincount(
+            hashes % self.dim, weights=weights, minlength=self.dim
+        ).astype(np.float32)
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def embed_batch(self, texts: Iterable[str]) -> np.ndarray:
+        rows = [self.embed(text) for text in texts]
+        if not rows:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.vstack(rows)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices dos k maiores scores de cada linha, em ordem decrescente."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+def train_ivf(
+    vectors: np.ndarray,
+    num_lists: int,
+    iterations: int = 10,
+    sample_size: Optional[int] = None,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Treina o quantizador grosso (k-means esférico) e agrupa os vetores.
+
+    Returns:
+        Tupla (centróides, ids ordenados por lista, offsets das listas)
+    """
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    num_lists = max(1, min(num_lists, n))
+    sample_size = min(n, sample_size or 256 * num_lists)
+    sample = np.asarray(
+        vectors[np.sort(rng.choice(n, sample_size, replace=False))],
+        dtype=np.float32
+    )
+
+    centroids = sample[rng.choice(sample_size, num_lists, replace=False)]
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+
+    assign = np.empty(n, dtype=np.int64)
+    for start in range(0, n, BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + BLOCK_ROWS], np.float32)
+        assign[start:start + len(block)] = np.argmax(
+            block @ centroids.T, axis=1
+        )
+
+    order = np.argsort(assign, kind="stable").astype(np.uint32)
+    counts = np.bincount(assign, minlength=num_lists)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.uint64)
+    return centroids.astype(np.float32), order, offsets
+
+
+class VectorBuilder:
+    """Acumula embeddings e grava o índice vetorial."""
+
+    def __init__(self, embedder: Optional[HashingEmbedder] = None):
+        self.embedder = embedder or HashingEmbedder()
+        self.rows: List[np.ndarray] = []
+
+    def add(self, text: str) -> None:
+        self.rows.append(self.embedder.embed(text))
+
+    def add_vectors(self, vectors: np.ndarray) -> None:
+        self.rows.extend(vectors)
+
+    def write(
+        self,
+        out_dir: str,
+        dtype: str = "float32",
+        ivf_lists: int = 0,
+    ) -> None:
+        os.makedirs(out_dir, exist_ok=True)
+        if self.rows:
+            matrix = np.vstack(self.rows).astype(dtype)
+        else:
+            matrix = np.empty((0, self.embedder.dim), dtype=dtype)
+        np.save(os.path.join(out_dir, "embeddings.npy"), matrix)
+
+        has_ivf = bool(ivf_lists) and len(matrix) > 0
+        if has_ivf:
+            centroids, order, offsets = train_ivf(matrix, ivf_lists)
+            np.save(os.path.join(out_dir, "ivf_centroids.npy"), centroids)
+            np.save(os.path.join(out_dir, "ivf_order.npy"), order)
+            np.save(os.path.join(out_dir, "ivf_offsets.npy"), offsets)
+
+        with open(os.path.join(out_dir, "vector_meta.json"), "w") as f:
+            json.dump({
+                "num_vectors": len(matrix),
+                "dtype": dtype,
+                "ivf_lists": len(centroids) if has_ivf else 0,
+                "embedder": self.embedder.params(),
+            }, f)
+
+
+def build_vector_index(
+    chunks: Iterable[Dict[str, Any]],
+    out_dir: str,
+    dtype: str = "float32",
+    ivf_lists: int = 0,
+) -> int:
+    """
+    Constrói o índice vetorial a partir de chunks ({"source", "chunk",
+    "text"}). Retorna o número de chunks indexados.
+    """
+    builder = VectorBuilder()
+
+    def embedded(chunks):
+        for chunk in chunks:
+            builder.add(chunk["text"])
+            yield chunk
+
+    count = write_chunks(embedded(chunks), out_dir)
+    builder.write(out_dir, dtype=dtype, ivf_lists=ivf_lists)
+    return count
+
+
+class VectorIndex:
+    """Busca top-k por similaridade de cosseno (exata ou IVF)."""
+
+    def __init__(self, index_dir: str, with_store: bool = True):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "vector_meta.json")) as f:
+            self.meta = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode="r")
+
+        embedder = self.meta["embedder"]
+        self.embedder = HashingEmbedder(
+            embedder["dim"], tuple(embedder["ngrams"])
+        )
+        self.embeddings = load("embeddings.npy")
+
+        self.centroids = None
+        if self.meta.get("ivf_lists"):
+            self.centroids = np.asarray(load("ivf_centroids.npy"))
+            self.ivf_order = load("ivf_order.npy")
+            self.ivf_offsets = load("ivf_offsets.npy")
+
+        self.store = ChunkStore(index_dir) if with_store else None
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    def exact_search(
+        self, queries: np.ndarray, top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k exato: produto matricial em blocos sobre a matriz mapeada,
+        mantendo só os k melhores de cada bloco.
+
+        Args:
+            queries: Matriz (consultas x dim) normalizada
+
+        Returns:
+            Tupla (ids, scores), ambos (consultas x k)
+        """
+        queries = np.atleast_2d(queries).astype(np.float32)
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+
+        for start in range(0, len(self), BLOCK_ROWS):
+            block = np.asarray(
+                self.embeddings[start:start + BLOCK_ROWS], np.float32
+            )
+            scores = queries @ block.T
+            top = _top_k(scores, top_k)
+
+            best_ids = np.hstack([best_ids, top + start])
+            best_scores = np.hstack(
+                [best_scores, np.take_along_axis(scores, top, axis=1)]
+            )
+            keep = _top_k(best_scores, top_k)
+            best_ids = np.take_along_axis(best_ids, keep, axis=1)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+        return best_ids, best_scores
+
+    def ivf_search(
+        self, queries: np.ndarray, top_k: int, nprobe: int = 8
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k aproximado: compara só os vetores das `nprobe` listas cujos
+        centróides são mais próximos de cada consulta.
+        """
+        if self.centroids is None:
+            return self.exact_search(queries, top_k)
+
+        queries = np.atleast_2d(queries).astype(np.float32)
+        probes = _top_k(queries @ self.centroids.T, nprobe)
+
+        all_ids, all_scores = [], []
+        for query, lists in zip(queries, probes):
+            candidates = np.concatenate([
+                self.ivf_order[
+                    int(self.ivf_offsets[i]):int(self.ivf_offsets[i + 1])
+                ]
+                for i in lists
+            ]).astype(np.int64)
+            candidates.sort()
+
+            scores = np.asarray(
+                self.embeddings[candidates], np.float32
+            ) @ query
+            top = _top_k(scores[None, :], top_k)[0]
+
+            ids = np.full(top_k, -1, dtype=np.int64)
+            best = np.full(top_k, -np.inf, dtype=np.float32)
+            ids[:len(top)] = candidates[top]
+            best[:len(top)] = scores[top]
+            all_ids.append(ids)
+            all_scores.append(best)
+
+        return np.vstack(all_ids), np.vstack(all_scores)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        mode: Optional[str] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retorna os `top_k` chunks mais similares com score e texto.
+
+        Args:
+            mode: "exact" ou "ivf" (padrão: VECTOR_SEARCH_MODE, ou IVF
+                quando o índice tiver quantizador)
+            nprobe: Listas visitadas no modo IVF (VECTOR_IVF_NPROBE)
+        """
+        if not len(self):
+            return []
+
+        # Variáveis vazias no .env contam como não definidas
+        mode = mode or os.getenv("VECTOR_SEARCH_MODE") or (
+            "ivf" if self.centroids is not None else "exact"
+        )
+        nprobe = nprobe or int(os.getenv("VECTOR_IVF_NPROBE") or 8)
+
+        vector = self.embedder.embed(query)
+        if mode == "ivf":
+            ids, scores = self.ivf_search(vector, top_k, nprobe)
+        else:
+            ids, scores = self.exact_search(vector, top_k)
+
+        results = []
+        for chunk_id, score in zip(ids[0], scores[0]):
+            if chunk_id < 0 or score <= 0:
+                continue
+            chunk = self.store.get(int(chunk_id))
+            chunk["score"] = round(float(score), 4)
+            results.append(chunk)
+        return results
+
+    def close(self):
+        if self.store:
+            self.store.close()
@@ -0,0 +1,77 @@
+"""
+Consulta à API do OpenWeather.
+
+Separada de server.py para ser reutilizada fora da tool, pelo
+pré-aquecimento do cache no backend (backend/core/prewarm.py).
+"""
+import os
+
+import httpx
+
+from backend.utils.cache import cache
+
+WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL_SECONDS", 1800))
+# Cache negativo: cidade inexistente (404) não é consultada de novo
+# durante esse intervalo
+WEATHER_NEGATIVE_TTL = int(os.getenv("WEATHER_NEGATIVE_TTL_SECONDS", 300))
+
+
+def weather_cache_key(city: str, country_code: str = "BR") -> str:
+    return cache.make_namespaced_key("weather", f"{city},{country_code}")
+
+
+def is_not_found(result: dict) -> bool:
+    """Erro definitivo (cidade não encontrada), seguro para memoizar."""
+    return result.get("status") == 404
+
+
+def fetch_weather(
+    city: str, country_code: str = "BR", timeout: float = 5.0
+) -> dict:
+    """
+    Busca o clima atual na API, sem passar pelo cache.
+
+    Returns:
+        Dict com: city, temperature, description, humidity, wind_speed,
+        formatted; ou {"error": ...}
+    """
+    api_key = os.getenv("OPENWEATHER_API_KEY")
+    if not api_key:
+        return {"error": "API key não configurada"}
+
+    params = {
+        "q": f"{city},{country_code}",
+        "appid": api_key,
+        "units": "metric",
+        "lang": "pt_br"
+    }
+
+    try:
+        response = httpx.get(WEATHER_URL, params=params, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+
+        return {
+            "city": data["name"],
+            "temperature": data["main"]["temp"],
+            "description": data["weather"][0]["description"],
+            "humidity": data["main"]["humidity"],
+            "wind_speed": data["wind"]["speed"],
+            "formatted": (
+                f"{data['name']}: {data['main']['temp']}°C, "
+                f"{data['weather'][0]['description']}"
+            )
+        }
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            return {
+                "error": f"Cidade '{city}' não encontrada",
+                "status": 404,
+            }
+        return {"error": f"Erro HTTP {e.response.status_code}"}
+    except httpx.RequestError as e:
+        return {"error": f"Erro ao consultar API: {str(e)}"}
+    except (KeyError, IndexError) as e:
+        return {"error": f"Resposta da API inválida: {str(e)}"}